@@ -50,6 +50,7 @@ class UserAdmin(django.contrib.auth.admin.UserAdmin):
                 'fields': [
                     'last_login',
                     'created_at',
+                    'deactivate_at',
                     'deactivated_at',
                 ],
             },
@@ -4,9 +4,10 @@ import django.core.exceptions
 import django.core.validators
 from django.contrib.auth import get_user_model
 from django.contrib.auth.checks import check_user_model
-from django.contrib.auth.signals import user_logged_in
+from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.core import checks
 from django.db.models.query_utils import DeferredAttribute
+from django.db.models.signals import post_delete, post_save
 
 
 class AccountsAppConfig(AppConfig):
@@ -31,6 +32,61 @@ class AccountsAppConfig(AppConfig):
             user_logged_in.connect(update_last_login, dispatch_uid='update_last_login')
         #######################################################################
 
+        from . import session_snapshots
+        user_logged_in.connect(
+            session_snapshots.store_snapshot_on_login,
+            dispatch_uid='fd_dj_accounts_store_session_snapshot',
+        )
+        for signal in (post_save, post_delete):
+            signal.connect(
+                session_snapshots.invalidate_user_version_on_change,
+                sender=get_user_model(),
+                dispatch_uid='fd_dj_accounts_invalidate_user_version',
+            )
+
+        from . import stats
+        post_save.connect(
+            stats.update_counters_on_save,
+            sender=get_user_model(),
+            dispatch_uid='fd_dj_accounts_update_user_counters_on_save',
+        )
+        post_delete.connect(
+            stats.update_counters_on_delete,
+            sender=get_user_model(),
+            dispatch_uid='fd_dj_accounts_update_user_counters_on_delete',
+        )
+
+        from . import outbox
+        post_save.connect(
+            outbox.record_events_on_save,
+            sender=get_user_model(),
+            dispatch_uid='fd_dj_accounts_record_user_events_on_save',
+        )
+
+        from . import email_availability
+        post_save.connect(
+            email_availability.add_email_address_on_save,
+            sender=get_user_model(),
+            dispatch_uid='fd_dj_accounts_add_email_address_to_availability_filter',
+        )
+
+        from . import routers
+        for signal in (post_save, post_delete):
+            signal.connect(
+                routers.pin_to_primary_on_write,
+                dispatch_uid='fd_dj_accounts_pin_to_primary_on_write',
+            )
+
+        from . import user_sessions
+        user_logged_in.connect(
+            user_sessions.index_session_on_login,
+            dispatch_uid='fd_dj_accounts_index_user_session_on_login',
+        )
+        user_logged_out.connect(
+            user_sessions.unindex_session_on_logout,
+            dispatch_uid='fd_dj_accounts_unindex_user_session_on_logout',
+        )
+
         checks.register(check_user_model, checks.Tags.models)
 
 
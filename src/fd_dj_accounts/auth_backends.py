@@ -27,11 +27,14 @@ from __future__ import annotations
 
 from typing import Any, Optional, Set, TYPE_CHECKING, Union
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.http import HttpRequest
 
+from . import hashing, rehash, throttling, tracing
+
 if TYPE_CHECKING:
     import django.db.models
 
@@ -62,6 +65,7 @@ class AuthUserModelAuthBackend(ModelBackend):
 
     """
 
+    @tracing.traced('fd_dj_accounts.AuthUserModelAuthBackend.authenticate')
     def authenticate(
         self,
         request: Optional[HttpRequest],
@@ -69,9 +73,65 @@ class AuthUserModelAuthBackend(ModelBackend):
         password: Optional[str] = None,
         **kwargs: Any,
     ) -> Optional[AbstractBaseUser]:
+        if password is not None and throttling.is_enabled():
+            # note: this must happen before calling the parent's implementation, which always
+            #   hashes the password (even if the user does not exist).
+            identifier = username if username is not None else kwargs.get(UserModel.USERNAME_FIELD)
+            throttling.check_login_attempt(request, identifier, sender=self.__class__)
+
+        if password is not None and hashing.is_enabled():
+            # Same as the parent's implementation, but the password is hashed by the bounded
+            #   hashing executor (see 'hashing').
+            user = self._get_user_by_natural_key(username, **kwargs)
+            if user is None:
+                # Run the default password hasher once to reduce the timing difference between an
+                #   existing and a nonexistent user (same as the parent's implementation).
+                hashing.make_password(password)
+                return None
+            if not hashing.check_password(password, user.password):
+                return None
+            self._update_password_hash(user, password)
+            return user if self.user_can_authenticate(user) else None
+
         # Use implementation from :class`django.contrib.auth.backends.ModelBackend`.
         return super().authenticate(request, username, password, **kwargs)
 
+    async def aauthenticate(
+        self,
+        request: Optional[HttpRequest],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Optional[AbstractBaseUser]:
+        """
+        Async version of :meth:`authenticate`.
+
+        If the limit of the password hashing concurrency is enabled (see
+        :mod:`fd_dj_accounts.hashing`), the password is hashed without
+        blocking a thread while it waits for the hashing executor.
+
+        """
+        if password is None or not hashing.is_enabled():
+            return await sync_to_async(self.authenticate)(  # type: ignore[no-any-return]
+                request, username, password, **kwargs,
+            )
+
+        if throttling.is_enabled():
+            identifier = username if username is not None else kwargs.get(UserModel.USERNAME_FIELD)
+            await sync_to_async(throttling.check_login_attempt)(
+                request, identifier, sender=self.__class__,
+            )
+
+        user = await sync_to_async(self._get_user_by_natural_key)(username, **kwargs)
+        if user is None:
+            await hashing.amake_password(password)
+            return None
+        if not await hashing.acheck_password(password, user.password):
+            return None
+        if hashing.must_update(user.password):
+            await sync_to_async(self._update_password_hash)(user, password)
+        return user if self.user_can_authenticate(user) else None
+
     def user_can_authenticate(self, user: Union[AbstractBaseUser, AnonymousUser]) -> bool:
         # Use implementation from :class`django.contrib.auth.backends.ModelBackend`.
         return super().user_can_authenticate(user)  # type: ignore[no-any-return]
@@ -125,9 +185,66 @@ class AuthUserModelAuthBackend(ModelBackend):
 
     with_perm = None  # Unsupported operation
 
+    @tracing.traced('fd_dj_accounts.AuthUserModelAuthBackend.get_user')
     def get_user(self, user_id: Any) -> Optional[AbstractBaseUser]:
         try:
             user = UserModel._default_manager.get(pk=user_id)
         except UserModel.DoesNotExist:
             return None
         return user if self.user_can_authenticate(user) else None
+
+    def _get_user_by_natural_key(
+        self, username: Optional[str], **kwargs: Any,
+    ) -> Optional[AbstractBaseUser]:
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None:
+            return None
+        try:
+            return UserModel._default_manager.get_by_natural_key(username)  # type: ignore[no-any-return] # noqa: E501
+        except UserModel.DoesNotExist:
+            return None
+
+    def _update_password_hash(self, user: AbstractBaseUser, raw_password: str) -> None:
+        # Same as the "setter" of 'AbstractBaseUser.check_password()', with the password hashed by
+        #   the bounded hashing executor (or deferred, see 'rehash').
+        if not hashing.must_update(user.password):
+            return
+        if rehash.is_enabled():
+            rehash.enqueue_rehash(user, raw_password)
+        else:
+            user.password = hashing.make_password(raw_password)
+            user.save(update_fields=['password'])
+
+
+class ApiTokenAuthBackend(AuthUserModelAuthBackend):
+
+    """
+    Authenticate with an API token (see :class:`fd_dj_accounts.models.ApiToken`).
+
+    Credentials are a raw API token (argument ``api_token``), which is verified
+    with one indexed query and a constant-time comparison, instead of a slow
+    password hash.
+
+    Unlike :class:`AuthUserModelAuthBackend`, the auth user model must be
+    :class:`fd_dj_accounts.models.User`.
+
+    .. seealso:: :class:`fd_dj_accounts.middleware.ApiTokenMiddleware`.
+
+    """
+
+    @tracing.traced('fd_dj_accounts.ApiTokenAuthBackend.authenticate')
+    def authenticate(  # type: ignore[override]
+        self,
+        request: Optional[HttpRequest],
+        api_token: Optional[str] = None,
+    ) -> Optional[AbstractBaseUser]:
+        from .models import ApiToken
+
+        if not api_token:
+            return None
+        token = ApiToken.objects.get_for_raw_token(api_token)
+        if token is None:
+            return None
+        user = token.user
+        return user if self.user_can_authenticate(user) else None
@@ -1,22 +1,95 @@
 """
 Base implementation and abstract models.
 
-This module allows importing :class:`BaseUser`, :class:`UserManager` and
-:class:`AnonymousUser` even when ``fd_dj_accounts`` is not in setting
+This module allows importing :class:`BaseUser`, :class:`UserManager`,
+:class:`UserQuerySet` and :class:`AnonymousUser` even when ``fd_dj_accounts`` is not in setting
 ``INSTALLED_APPS`` (analogous to :mod:`django.contrib.auth.base_user`).
 
 """
 
 from __future__ import annotations
 
-from typing import Any, List, Optional, Tuple, Type
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
 
 import django.contrib.auth.base_user
 from django.db import models
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db.models.functions import Cast, Coalesce, Concat
 from django.utils import timezone
 
+from . import rehash, tracing
 
-class UserManager(django.contrib.auth.base_user.BaseUserManager):
+
+# Domain of the placeholder email addresses of anonymized users.
+#   note: the TLD 'invalid' is reserved (RFC 2606), so these addresses can not be real ones.
+ANONYMIZED_EMAIL_ADDRESS_DOMAIN = 'anonymized.invalid'
+
+
+class UserQuerySet(models.QuerySet):
+
+    """
+    Query set for a custom user (account) model.
+
+    .. seealso:: :class:`UserManager`.
+
+    """
+
+    @tracing.traced('fd_dj_accounts.UserQuerySet.deactivate')
+    def deactivate(self, **fields: Any) -> int:
+        """
+        Deactivate the active users of this query set, with a single UPDATE.
+
+        It is the set-based counterpart of :meth:`BaseUser.deactivate`:
+        field ``deactivated_at`` is set to the current time unless it is
+        already set. Other ``fields`` (e.g. ``deactivate_at=None``) are set
+        in the same UPDATE. Return the number of deactivated users.
+
+        .. warning::
+            Like any ``update()``, it does not call ``save()`` nor send the
+            ``pre_save``/``post_save`` signals.
+
+        """
+        return self.filter(is_active=True).update(  # type: ignore[no-any-return]
+            **fields,
+            is_active=False,
+            deactivated_at=Coalesce(
+                'deactivated_at', models.Value(timezone.now()),
+                output_field=models.DateTimeField(),
+            ),
+        )
+
+    @tracing.traced('fd_dj_accounts.UserQuerySet.anonymize')
+    def anonymize(self) -> int:
+        """
+        Anonymize the deactivated users of this query set, with a single UPDATE.
+
+        The email address is replaced by the placeholder
+        ``anonymized-<id>@anonymized.invalid``, which is deterministic and
+        unique (because the primary key is), and the password hash by an
+        unusable password. Users already anonymized are not updated again.
+        Return the number of anonymized users.
+
+        .. warning::
+            Like any ``update()``, it does not call ``save()`` nor send the
+            ``pre_save``/``post_save`` signals.
+
+        """
+        return self.filter(is_active=False).exclude(  # type: ignore[no-any-return]
+            email_address__endswith=f'@{ANONYMIZED_EMAIL_ADDRESS_DOMAIN}',
+        ).update(
+            email_address=Concat(
+                models.Value('anonymized-'),
+                Cast('pk', output_field=models.CharField()),
+                models.Value(f'@{ANONYMIZED_EMAIL_ADDRESS_DOMAIN}'),
+                output_field=models.CharField(),
+            ),
+            password=UNUSABLE_PASSWORD_PREFIX,
+        )
+
+
+class UserManager(
+    django.contrib.auth.base_user.BaseUserManager.from_queryset(UserQuerySet),  # type: ignore[misc]
+):
 
     """
     Model manager for a custom user (account) model.
@@ -26,6 +99,7 @@ class UserManager(django.contrib.auth.base_user.BaseUserManager):
     The changes are:
     - All those related to removing the field ``username``.
     - Add type annotations.
+    - Custom query set (:class:`UserQuerySet`).
 
     .. seealso:: :class:`BaseUser`.
 
@@ -52,6 +126,7 @@ class UserManager(django.contrib.auth.base_user.BaseUserManager):
         user.save(using=self._db)
         return user
 
+    @tracing.traced('fd_dj_accounts.UserManager.create_user')
     def create_user(
         self, email_address: str, password: Optional[str] = None,
         **extra_fields: Any,
@@ -66,6 +141,7 @@ class UserManager(django.contrib.auth.base_user.BaseUserManager):
         extra_fields.setdefault('is_superuser', False)
         return self._create_user(email_address, password, **extra_fields)
 
+    @tracing.traced('fd_dj_accounts.UserManager.create_superuser')
     def create_superuser(
         self, email_address: str, password: str,
         **extra_fields: Any,
@@ -84,6 +160,51 @@ class UserManager(django.contrib.auth.base_user.BaseUserManager):
 
         return self._create_user(email_address, password, **extra_fields)
 
+    @tracing.traced('fd_dj_accounts.UserManager.get_many_by_email')
+    def get_many_by_email(
+        self, email_addresses: Iterable[str], chunk_size: int = 1000,
+    ) -> Tuple[Dict[str, BaseUser], List[str]]:
+        """
+        Look up the users with the given email addresses.
+
+        Email addresses are normalized just like when a user is validated,
+        and deduplicated. The lookup is performed with one query per chunk of
+        ``chunk_size`` (normalized) email addresses.
+
+        Return a tuple of:
+        - a dict that maps each of the given email addresses to its user, for
+          those that exist;
+        - a list of the given email addresses that do not correspond to any
+          user (without duplicates, in the original order).
+
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer.')
+
+        normalized_email_addresses: Dict[str, str] = {}
+        for email_address in email_addresses:
+            if email_address not in normalized_email_addresses:
+                normalized_email_addresses[email_address] = self.normalize_email(
+                    self.model.normalize_username(email_address),
+                )
+
+        unique_normalized_email_addresses = list(dict.fromkeys(normalized_email_addresses.values()))
+        users_by_normalized_email_address: Dict[str, BaseUser] = {}
+        for i in range(0, len(unique_normalized_email_addresses), chunk_size):
+            chunk = unique_normalized_email_addresses[i:i + chunk_size]
+            for user in self.filter(email_address__in=chunk):
+                users_by_normalized_email_address[user.email_address] = user
+
+        users: Dict[str, BaseUser] = {}
+        missing_email_addresses: List[str] = []
+        for email_address, normalized_email_address in normalized_email_addresses.items():
+            user = users_by_normalized_email_address.get(normalized_email_address)
+            if user is None:
+                missing_email_addresses.append(email_address)
+            else:
+                users[email_address] = user
+        return users, missing_email_addresses
+
 
 class BaseUser(django.contrib.auth.base_user.AbstractBaseUser):
 
@@ -174,6 +295,24 @@ class BaseUser(django.contrib.auth.base_user.AbstractBaseUser):
         klass: Type[BaseUser] = self.__class__
         self.email_address = klass.objects.normalize_email(self.email_address)
 
+    @tracing.traced('fd_dj_accounts.User.set_password')
+    def set_password(self, raw_password: Optional[str]) -> None:
+        super().set_password(raw_password)
+
+    @tracing.traced('fd_dj_accounts.User.check_password')
+    def check_password(self, raw_password: str) -> bool:
+        if rehash.is_enabled():
+            # The rehash of an outdated password hash is not performed now (see 'rehash').
+            return rehash.check_password(self, raw_password)
+        return super().check_password(raw_password)  # type: ignore[no-any-return]
+
+    def get_session_auth_fallback_hash(self) -> Iterator[str]:
+        yield from super().get_session_auth_fallback_hash()
+        if rehash.is_enabled():
+            # Sessions authenticated before a deferred rehash of the password (see 'rehash').
+            yield from rehash.get_session_auth_fallback_hashes(self)
+
+    @tracing.traced('fd_dj_accounts.User.deactivate')
     def deactivate(self) -> None:
         if self.is_active:
             self.is_active = False
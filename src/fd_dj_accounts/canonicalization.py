@@ -0,0 +1,183 @@
+"""
+Canonical email addresses, for detecting duplicate users.
+
+:meth:`fd_dj_accounts.base_models.UserManager.normalize_email` lowercases only
+the domain part of email addresses, so e.g. ``Foo@example.com`` and
+``foo@example.com`` can be the addresses of different users. Field
+``canonical_email_address`` of :class:`fd_dj_accounts.models.User` stores the
+canonical form of the email address, computed by a pluggable
+"canonicalizer" (a function of an email address), and is indexed so that the
+users with the same canonical email address are found by the database (see
+:func:`find_duplicate_users`). The field is not unique.
+
+The field is set by ``save()``, and by ``bulk_create()`` and ``update()`` of
+:class:`fd_dj_accounts.models.UserQuerySet` (set to null by an ``update()``
+of the email address with a non-constant value, e.g. ``anonymize()``). Command
+``backfill_canonical_email_addresses`` sets it for existing users (and, with
+``--all``, recomputes it, e.g. after changing the canonicalizer).
+
+Canonicalizers:
+- :func:`canonicalize_email_address`: lowercase.
+- :func:`canonicalize_email_address_aliases`: lowercase, and remove aliases:
+  the sub-address (``+tag``) of the local part, and, for Gmail addresses,
+  the dots of the local part.
+
+Settings:
+- ``APP_ACCOUNTS_EMAIL_CANONICALIZER``: import path of the canonicalizer
+  (default: ``'fd_dj_accounts.canonicalization.canonicalize_email_address'``).
+
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, router, transaction
+from django.utils.module_loading import import_string
+
+
+GMAIL_DOMAINS = ('gmail.com', 'googlemail.com')
+
+
+def canonicalize_email_address(email_address: str) -> str:
+    return email_address.strip().lower()
+
+
+def canonicalize_email_address_aliases(email_address: str) -> str:
+    local_part, separator, domain = canonicalize_email_address(email_address).rpartition('@')
+    if not separator:
+        return domain
+    local_part = local_part.split('+', 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local_part = local_part.replace('.', '')
+        domain = GMAIL_DOMAINS[0]
+    return f'{local_part}@{domain}'
+
+
+def get_canonicalizer() -> Callable[[str], str]:
+    canonicalizer_path = getattr(
+        settings,
+        'APP_ACCOUNTS_EMAIL_CANONICALIZER',
+        'fd_dj_accounts.canonicalization.canonicalize_email_address',
+    )
+    return import_string(canonicalizer_path)  # type: ignore[no-any-return]
+
+
+def canonicalize(email_address: str) -> str:
+    """Return the canonical form of ``email_address``, by the configured canonicalizer."""
+    return get_canonicalizer()(email_address)
+
+
+def backfill_canonical_email_addresses(
+    chunk_size: int = 500,
+    recompute: bool = False,
+    using: Optional[str] = None,
+) -> Iterator[int]:
+    """
+    Set the canonical email address of the users that do not have it.
+
+    If ``recompute``, it is computed again for all the users. The users are
+    processed in chunks, in primary key order (keyset pagination), each chunk
+    in its own transaction. Yield the number of users updated in each chunk.
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive integer.')
+
+    user_model = _get_user_model()
+    using = using or router.db_for_write(user_model)
+    # note: the base manager is used so that the version of the users is not incremented (the
+    #   canonical email address is derived from the email address).
+    manager = user_model._base_manager.db_manager(using)
+    queryset = manager.order_by('pk')
+    if not recompute:
+        queryset = queryset.filter(canonical_email_address__isnull=True)
+
+    canonicalizer = get_canonicalizer()
+    last_pk: Any = None
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+        rows: List[Tuple[Any, str, Optional[str]]] = list(
+            chunk_queryset.values_list(
+                'pk', 'email_address', 'canonical_email_address',
+            )[:chunk_size],
+        )
+        if not rows:
+            break
+
+        users = []
+        for pk, email_address, canonical_email_address in rows:
+            new_canonical_email_address = canonicalizer(email_address)
+            if new_canonical_email_address != canonical_email_address:
+                users.append(user_model(pk=pk, canonical_email_address=new_canonical_email_address))
+        if users:
+            with transaction.atomic(using=using):
+                manager.bulk_update(users, ['canonical_email_address'])
+        last_pk = rows[-1][0]
+        yield len(users)
+
+
+def find_duplicate_users(
+    chunk_size: int = 500,
+    using: Optional[str] = None,
+) -> Iterator[Tuple[str, List[Any]]]:
+    """
+    Find the users with the same canonical email address.
+
+    Yield each canonical email address shared by several users, and its users
+    (ordered by creation time). The canonical email addresses are grouped by
+    the database (using the index of the field), and the users of each chunk
+    of ``chunk_size`` groups are fetched with a single query.
+
+    Users without a canonical email address (see
+    :func:`backfill_canonical_email_addresses`) are ignored.
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive integer.')
+
+    user_model = _get_user_model()
+    using = using or router.db_for_read(user_model)
+    queryset = user_model._default_manager.db_manager(using).filter(
+        canonical_email_address__isnull=False,
+    )
+    duplicate_canonical_email_addresses = (
+        queryset.values('canonical_email_address')
+        .annotate(user_count=models.Count('pk'))
+        .filter(user_count__gt=1)
+        .order_by('canonical_email_address')
+        .values_list('canonical_email_address', flat=True)
+    )
+
+    last_canonical_email_address: Optional[str] = None
+    while True:
+        chunk_queryset = duplicate_canonical_email_addresses
+        if last_canonical_email_address is not None:
+            chunk_queryset = chunk_queryset.filter(
+                canonical_email_address__gt=last_canonical_email_address,
+            )
+        canonical_email_addresses: List[str] = list(chunk_queryset[:chunk_size])
+        if not canonical_email_addresses:
+            break
+
+        users_by_canonical_email_address: Dict[str, List[Any]] = {
+            canonical_email_address: [] for canonical_email_address in canonical_email_addresses
+        }
+        for user in queryset.filter(
+            canonical_email_address__in=canonical_email_addresses,
+        ).order_by('canonical_email_address', 'created_at', 'pk'):
+            users_by_canonical_email_address[user.canonical_email_address].append(user)
+        yield from users_by_canonical_email_address.items()
+        last_canonical_email_address = canonical_email_addresses[-1]
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _get_user_model() -> Type[models.Model]:
+    return apps.get_model('fd_dj_accounts', 'User')  # type: ignore[no-any-return]
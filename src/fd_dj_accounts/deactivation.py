@@ -0,0 +1,103 @@
+"""
+Batch deactivation of users.
+
+Scheduled deactivations: the active users whose field ``deactivate_at`` is
+due are deactivated in batches. Each batch is claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED`` (on database backends that support it)
+and deactivated with a single UPDATE, in its own short transaction, so that
+several workers can process the due deactivations in parallel without
+processing the same user twice.
+
+Dormant users: the active users that have not logged in since a given time
+(field ``last_login``, see :func:`fd_dj_accounts.models.update_last_login`)
+are deactivated in batches, walking them in ``(last_login, id)`` order
+("keyset pagination", using an index), each batch with a single UPDATE.
+
+"""
+
+from __future__ import annotations
+
+import datetime
+from typing import Any, Iterator, List, Optional, Tuple
+
+from django.db import models, router, transaction
+from django.utils import timezone
+
+from .models import User
+
+
+def process_scheduled_deactivations(
+    now: Optional[datetime.datetime] = None,
+    batch_size: int = 500,
+    using: Optional[str] = None,
+) -> Iterator[int]:
+    """
+    Deactivate the active users whose ``deactivate_at`` is not after ``now``.
+
+    Yield the number of users deactivated in each batch. Field
+    ``deactivate_at`` of the deactivated users is cleared (so that a user
+    that is reactivated afterwards is not deactivated again).
+
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be a positive integer.')
+
+    now = now or timezone.now()
+    using = using or router.db_for_write(User)
+    queryset = User.objects.using(using)
+
+    while True:
+        with transaction.atomic(using=using):
+            pks: List[Any] = list(
+                queryset.filter(is_active=True, deactivate_at__lte=now)
+                .order_by('deactivate_at', 'pk')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size],
+            )
+            if not pks:
+                break
+
+            count = queryset.filter(pk__in=pks).deactivate(deactivate_at=None)
+        yield count
+
+
+def deactivate_dormant_users(
+    last_login_before: datetime.datetime,
+    batch_size: int = 500,
+    using: Optional[str] = None,
+) -> Iterator[int]:
+    """
+    Deactivate the active users whose last login was before ``last_login_before``.
+
+    Yield the number of users deactivated in each batch. Users that have
+    never logged in are not deactivated.
+
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be a positive integer.')
+
+    using = using or router.db_for_write(User)
+    queryset = User.objects.using(using)
+    candidates = queryset.filter(is_active=True, last_login__lt=last_login_before)
+
+    last_key: Optional[Tuple[datetime.datetime, Any]] = None
+    while True:
+        batch_candidates = candidates
+        if last_key is not None:
+            batch_candidates = batch_candidates.filter(
+                models.Q(last_login__gt=last_key[0])
+                | models.Q(last_login=last_key[0], pk__gt=last_key[1]),
+            )
+
+        with transaction.atomic(using=using):
+            keys: List[Tuple[datetime.datetime, Any]] = list(
+                batch_candidates.order_by('last_login', 'pk')
+                .select_for_update(skip_locked=True)
+                .values_list('last_login', 'pk')[:batch_size],
+            )
+            if not keys:
+                break
+
+            count = queryset.filter(pk__in=[pk for _, pk in keys]).deactivate()
+        last_key = keys[-1]
+        yield count
@@ -0,0 +1,231 @@
+"""
+Query-plan diagnostics of the queries of users.
+
+Diagnostics (see command ``accounts_diagnostics``):
+- The plans (``EXPLAIN``, optionally with ``ANALYZE``) of the canonical
+  queries issued by ``fd_dj_accounts`` (see :func:`get_canonical_queries`),
+  and the sequential scans of tables in them (on PostgreSQL and SQLite).
+  Sequential scans of the queries in :data:`INFORMATIONAL_QUERY_NAMES` are
+  expected.
+- The indexes of the user model that are missing in the database.
+- The size of the users table and of its indexes, the number of scans of each
+  index, and the number of dead rows (an estimate of the table's bloat); on
+  PostgreSQL only.
+
+Note that database planners prefer sequential scans of small tables, so
+plans should be checked with a realistic number of users (see command
+``seed_users``).
+
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import uuid
+
+from django.conf import settings
+from django.contrib import admin
+from django.db import connections, models, router
+from django.http import HttpRequest
+
+from .models import User
+from .snapshots import UserSnapshot
+
+
+# Patterns of the sequential scans of a table in the plans returned by 'QuerySet.explain()'.
+#   note: in SQLite, 'SCAN <table> USING [COVERING] INDEX <index>' is a scan of an index.
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'\bSeq Scan on (?P<table>\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?! USING)\b'),
+}
+
+
+# Canonical queries that scan the users table by design, so their sequential scans are reported
+#   but are not failures:
+#   - 'admin_changelist': the admin's search uses 'icontains', which can not use a B-tree index.
+#   - 'duplicate_users': it groups all the users with a canonical email address.
+INFORMATIONAL_QUERY_NAMES = frozenset({'admin_changelist', 'duplicate_users'})
+
+
+class IndexStats(NamedTuple):
+    name: str
+    size: int
+    scans: int
+
+
+class TableStats(NamedTuple):
+    table_size: int
+    indexes_size: int
+    live_rows: int
+    dead_rows: int
+    indexes: List[IndexStats]
+
+    @property
+    def dead_rows_ratio(self) -> float:
+        return self.dead_rows / max(self.live_rows + self.dead_rows, 1)
+
+
+def get_canonical_queries(using: Optional[str] = None) -> Dict[str, models.QuerySet]:
+    """
+    Return the canonical queries of users, by name.
+
+    The values of the lookups are those of the system user, if it exists.
+
+    """
+    using = using or router.db_for_read(User)
+    manager = User._default_manager.db_manager(using)
+
+    system_user_pk = manager.filter(
+        **{User.USERNAME_FIELD: settings.APP_ACCOUNTS_SYSTEM_USERNAME},
+    ).values_list('pk', flat=True).first() or uuid.uuid4()
+    system_user = User(pk=system_user_pk)
+
+    return {
+        # Authentication: 'ModelBackend.authenticate()' (see 'UserManager.get_by_natural_key()').
+        'login': manager.filter(
+            **{User.USERNAME_FIELD: settings.APP_ACCOUNTS_SYSTEM_USERNAME},
+        ),
+        # Session authentication: 'AuthUserModelAuthBackend.get_user()'.
+        'get_user': manager.filter(pk=system_user_pk),
+        'admin_changelist': _get_admin_changelist_queryset(using),
+        # E.g. for checking the protection of field 'created_by' when deleting a user.
+        'created_by': manager.filter(created_by=system_user_pk),
+        'created_by_descendants': manager.created_by_descendants(system_user, max_depth=2),
+        # Duplicate users: 'fd_dj_accounts.canonicalization.find_duplicate_users()'.
+        'duplicate_users': (
+            manager.filter(canonical_email_address__isnull=False)
+            .values('canonical_email_address')
+            .annotate(user_count=models.Count('pk'))
+            .filter(user_count__gt=1)
+            .order_by('canonical_email_address')[:500]
+        ),
+    }
+
+
+def explain_query(queryset: models.QuerySet, analyze: bool = False) -> str:
+    """
+    Return the plan of ``queryset``.
+
+    .. warning:: With ``analyze``, the query is executed (on PostgreSQL).
+
+    """
+    options: Dict[str, Any] = {}
+    if analyze and connections[queryset.db].vendor == 'postgresql':
+        options.update(analyze=True, buffers=True)
+    return queryset.explain(**options)  # type: ignore[no-any-return]
+
+
+def find_sequential_scans(plan: str, vendor: str) -> List[str]:
+    """Return the tables scanned sequentially in ``plan`` (empty if unknown for ``vendor``)."""
+    pattern = SEQUENTIAL_SCAN_PATTERNS.get(vendor)
+    if pattern is None:
+        return []
+    return sorted({match.group('table') for match in pattern.finditer(plan)})
+
+
+def get_missing_indexes(using: Optional[str] = None) -> List[str]:
+    """
+    Return the indexes of the user model that do not exist in the database.
+
+    Named indexes (``Meta.indexes``) are looked up by name, and the indexes of
+    fields (e.g. unique fields and foreign keys) by column.
+
+    """
+    using = using or router.db_for_read(User)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, User._meta.db_table)
+
+    indexed_columns = {
+        tuple(constraint['columns'])
+        for constraint in constraints.values()
+        if constraint['index'] or constraint['unique'] or constraint['primary_key']
+    }
+
+    missing_indexes = []
+    for index in User._meta.indexes:
+        if index.name not in constraints:
+            missing_indexes.append(index.name)
+    for field_name, column in _get_indexed_field_columns():
+        if (column,) not in indexed_columns:
+            missing_indexes.append(f'{field_name} ({column})')
+    return missing_indexes
+
+
+def get_table_stats(using: Optional[str] = None) -> Optional[TableStats]:
+    """Return the statistics of the users table (None if not supported by the database)."""
+    using = using or router.db_for_read(User)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+
+    table_name = connection.ops.quote_name(User._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                pg_relation_size(c.oid),
+                pg_indexes_size(c.oid),
+                COALESCE(s.n_live_tup, 0),
+                COALESCE(s.n_dead_tup, 0)
+            FROM pg_class c
+            LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+            WHERE c.oid = %s::regclass
+            """,
+            [table_name],
+        )
+        table_size, indexes_size, live_rows, dead_rows = cursor.fetchone()
+        cursor.execute(
+            """
+            SELECT indexrelname, pg_relation_size(indexrelid), idx_scan
+            FROM pg_stat_user_indexes
+            WHERE relid = %s::regclass
+            ORDER BY pg_relation_size(indexrelid) DESC, indexrelname
+            """,
+            [table_name],
+        )
+        indexes = [IndexStats(*row) for row in cursor.fetchall()]
+
+    return TableStats(table_size, indexes_size, live_rows, dead_rows, indexes)
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _get_admin_changelist_queryset(using: str) -> models.QuerySet:
+    # Same query as the admin's change list of users, filtered by all the 'list_filter' fields and
+    #   with a search (but without the count of the results), or a similar one if the user model is
+    #   not registered in the admin site.
+    model_admin = admin.site._registry.get(User)
+    if model_admin is None:
+        return User._default_manager.db_manager(using).order_by(User.USERNAME_FIELD, '-pk')[:100]
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = UserSnapshot(uuid.uuid4(), 'diagnostics@localhost', True, True, True)
+
+    queryset = model_admin.get_queryset(request).using(using)
+    queryset = queryset.filter(**{
+        field_name: True for field_name in model_admin.get_list_filter(request)
+        if field_name in _get_boolean_field_names()
+    })
+    queryset, _ = model_admin.get_search_results(request, queryset, 'example')
+    ordering = list(model_admin.get_ordering(request) or [])
+    return queryset.order_by(*ordering, '-pk')[:model_admin.list_per_page]
+
+
+def _get_boolean_field_names() -> List[str]:
+    return [
+        field.name for field in User._meta.concrete_fields
+        if isinstance(field, models.BooleanField)
+    ]
+
+
+def _get_indexed_field_columns() -> List[Tuple[str, str]]:
+    return [
+        (field.name, field.column)
+        for field in User._meta.concrete_fields
+        if field.db_index or field.unique or field.primary_key
+    ]
@@ -0,0 +1,247 @@
+"""
+Email address availability checks, backed by a Bloom filter.
+
+An email address is "taken" if a user has the same canonical email address
+(see :mod:`fd_dj_accounts.canonicalization`). Checks are frequent (e.g. a
+signup form checks the address on each pause of typing) and most checked
+addresses are not taken, so each process keeps a :class:`BloomFilter` of the
+canonical email addresses of the users:
+- an address not in the filter is not taken (no false negatives), and the
+  database is not queried;
+- an address that may be in the filter is checked with an indexed query
+  (users without a canonical email address, see command
+  ``backfill_canonical_email_addresses``, are matched by their email
+  address, case-insensitively).
+
+The filter is built on first use by streaming the email addresses of the
+users (``values_list(...).iterator()``), and is updated incrementally on the
+writes of users of this process: ``save()`` (using the ``post_save`` signal),
+and ``bulk_create()`` and ``update()`` of
+:class:`fd_dj_accounts.models.UserQuerySet`. Addresses are never removed
+(e.g. on delete), which only adds false positives. Users created by other
+processes are not in the filter until it is rebuilt, after
+``APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_MAX_AGE`` seconds (or when its
+capacity is exceeded) by the next check, while the checks of other threads
+use the stale filter; in the meantime, their addresses may be reported as
+available. Hence the result is a hint for forms, and the uniqueness of the
+email address must still be enforced when creating the user.
+
+The view is :class:`fd_dj_accounts.views.EmailAddressAvailabilityView`. Like
+any such endpoint, it reveals whether an email address has an account;
+projects should rate-limit it.
+
+Settings:
+- ``APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_ENABLED`` (default: ``False``; if
+  disabled, each check queries the database).
+- ``APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_FALSE_POSITIVE_RATE`` (default:
+  ``0.01``).
+- ``APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_MAX_AGE``: seconds (default: 600).
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from typing import Any, Iterable, Iterator, List, Optional, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, router
+
+from . import canonicalization
+
+
+# Minimum capacity of the filter, so that a filter built with few users does not need to be rebuilt
+#   when users are created.
+MIN_CAPACITY = 10000
+
+# Capacity of the filter relative to the number of users when it is built.
+CAPACITY_FACTOR = 2
+
+_filter: Optional[BloomFilter] = None
+_filter_built_at = 0.0
+# Filters being built; the addresses added while they are built are added to them too.
+_building_filters: List[BloomFilter] = []
+# Held while the filter is (re)built.
+_filter_lock = threading.Lock()
+
+
+class BloomFilter:
+
+    """
+    Set of strings with false positives but no false negatives.
+
+    The number of bits and of hash functions are chosen for a
+    ``false_positive_rate`` with ``capacity`` items. The bit positions are
+    derived from a single BLAKE2 digest of each item (double hashing).
+
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float) -> None:
+        if capacity < 1:
+            raise ValueError('capacity must be a positive integer.')
+        if not 0 < false_positive_rate < 1:
+            raise ValueError('false_positive_rate must be between 0 and 1.')
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.num_bits = max(
+            math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2), 8,
+        )
+        self.num_hashes = max(round(self.num_bits / capacity * math.log(2)), 1)
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        # note: setting a bit is not atomic (read-modify-write of a byte); reads need no lock.
+        self._lock = threading.Lock()
+
+    def add(self, item: str) -> None:
+        positions = list(self._get_positions(item))
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._get_positions(item)
+        )
+
+    def _get_positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        hash_1 = int.from_bytes(digest[:8], 'little')
+        hash_2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (hash_1 + i * hash_2) % self.num_bits
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_ENABLED', False))
+
+
+def is_email_address_available(email_address: str, using: Optional[str] = None) -> bool:
+    """Return whether no user has the canonical email address of ``email_address``."""
+    canonical_email_address = canonicalization.canonicalize(email_address)
+    if is_enabled() and canonical_email_address not in get_filter(using=using):
+        return True
+
+    user_model = _get_user_model()
+    return not user_model._default_manager.db_manager(
+        using or router.db_for_read(user_model),
+    ).filter(
+        models.Q(canonical_email_address=canonical_email_address)
+        # note: the canonical email address of users that were not backfilled is unknown.
+        | models.Q(canonical_email_address__isnull=True, email_address__iexact=email_address),
+    ).exists()
+
+
+def get_filter(using: Optional[str] = None) -> BloomFilter:
+    """
+    Return the filter of this process (it is built on first use, and when stale).
+
+    A single thread (re)builds the filter. While a stale filter is rebuilt,
+    the other threads use it instead of waiting; only the first build blocks
+    them.
+
+    """
+    global _filter, _filter_built_at
+
+    current_filter = _filter
+    if current_filter is not None and not _is_stale(current_filter):
+        return current_filter
+
+    if not _filter_lock.acquire(blocking=current_filter is None):
+        assert current_filter is not None
+        return current_filter
+    try:
+        # note: the filter may have been (re)built by another thread meanwhile.
+        if _filter is not None and not _is_stale(_filter):
+            return _filter
+        built_at = time.monotonic()
+        new_filter = build_filter(using=using)
+        _filter, _filter_built_at = new_filter, built_at
+        return new_filter
+    finally:
+        _filter_lock.release()
+
+
+def build_filter(chunk_size: int = 2000, using: Optional[str] = None) -> BloomFilter:
+    """
+    Build a filter of the canonical email addresses of all the users.
+
+    The addresses are streamed from the database in chunks of
+    ``chunk_size`` rows. Those of users without a canonical email address
+    (see command ``backfill_canonical_email_addresses``) are computed.
+
+    """
+    user_model = _get_user_model()
+    using = using or router.db_for_read(user_model)
+    queryset = user_model._base_manager.db_manager(using).order_by()
+
+    false_positive_rate = float(
+        getattr(settings, 'APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_FALSE_POSITIVE_RATE', 0.01),
+    )
+    capacity = max(queryset.count() * CAPACITY_FACTOR, MIN_CAPACITY)
+    new_filter = BloomFilter(capacity, false_positive_rate)
+
+    # note: the filter is registered before streaming so that the addresses of the users created
+    #   meanwhile (which might not be in the stream) are not missed.
+    _building_filters.append(new_filter)
+    try:
+        canonicalizer = canonicalization.get_canonicalizer()
+        for email_address, canonical_email_address in queryset.values_list(
+            'email_address', 'canonical_email_address',
+        ).iterator(chunk_size=chunk_size):
+            new_filter.add(canonical_email_address or canonicalizer(email_address))
+    finally:
+        _building_filters.remove(new_filter)
+    return new_filter
+
+
+def add_canonical_email_addresses(canonical_email_addresses: Iterable[str]) -> None:
+    """Add ``canonical_email_addresses`` to the filter of this process (if it exists)."""
+    filters = [_filter, *_building_filters]
+    for canonical_email_address in canonical_email_addresses:
+        for bloom_filter in filters:
+            if bloom_filter is not None:
+                bloom_filter.add(canonical_email_address)
+
+
+def clear_filter() -> None:
+    """Discard the filter of this process (it is built again on next use)."""
+    global _filter
+
+    with _filter_lock:
+        _filter = None
+
+
+###############################################################################
+# signal receivers
+###############################################################################
+
+def add_email_address_on_save(
+    sender: Type[models.Model], instance: Any, raw: bool, **kwargs: Any,
+) -> None:
+    # note: the address is added even if the transaction is rolled back later, which only adds a
+    #   false positive.
+    if not is_enabled() or raw or instance.canonical_email_address is None:
+        return
+    add_canonical_email_addresses([instance.canonical_email_address])
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _is_stale(bloom_filter: BloomFilter) -> bool:
+    max_age = float(getattr(settings, 'APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_MAX_AGE', 600))
+    return (
+        time.monotonic() - _filter_built_at >= max_age
+        or bloom_filter.count > bloom_filter.capacity
+    )
+
+
+def _get_user_model() -> Type[models.Model]:
+    return apps.get_model('fd_dj_accounts', 'User')  # type: ignore[no-any-return]
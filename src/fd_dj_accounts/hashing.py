@@ -0,0 +1,183 @@
+"""
+Bounded-concurrency password hashing.
+
+Password hashing is CPU-bound, by design. Without a limit, a burst of logins
+can occupy every worker thread of a server (or block its event loop) and
+delay unrelated requests.
+
+Optional mode to limit the number of passwords hashed at the same time by
+the authentication backends (see
+:meth:`fd_dj_accounts.auth_backends.AuthUserModelAuthBackend.authenticate`
+and :meth:`fd_dj_accounts.auth_backends.AuthUserModelAuthBackend.aauthenticate`):
+hashes are computed by a :class:`HashingExecutor`, a pool of at most
+``APP_ACCOUNTS_PASSWORD_HASHING_MAX_CONCURRENCY`` threads. A hash that has
+not started after waiting ``APP_ACCOUNTS_PASSWORD_HASHING_QUEUE_TIMEOUT``
+seconds in the queue is not computed and :class:`HashingCapacityExceeded` is
+raised, so that a server under a login burst rejects some logins quickly
+instead of slowing down every request.
+
+Since :class:`HashingCapacityExceeded` is not a
+:class:`django.core.exceptions.PermissionDenied`, it is not swallowed by
+:func:`django.contrib.auth.authenticate`; views can handle it like a
+temporary unavailability (e.g. with a response with status 503).
+
+Settings:
+- ``APP_ACCOUNTS_PASSWORD_HASHING_LIMIT_ENABLED`` (default: ``False``).
+- ``APP_ACCOUNTS_PASSWORD_HASHING_MAX_CONCURRENCY`` (default: the number of
+  CPUs).
+- ``APP_ACCOUNTS_PASSWORD_HASHING_QUEUE_TIMEOUT``: seconds (default: 1).
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+from typing import Any, Callable, Optional, TypeVar
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .signals import password_hashing_rejected
+
+
+T = TypeVar('T')
+
+_executor: Optional[HashingExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class HashingCapacityExceeded(Exception):
+
+    """
+    A password was not hashed because the hashing executor is saturated.
+
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float) -> None:
+        super().__init__(
+            f"Password hashing capacity exceeded"
+            f" (max concurrency: {max_concurrency}, queue timeout: {queue_timeout} s).",
+        )
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+
+
+class HashingExecutor:
+
+    """
+    Run functions in a pool of ``max_concurrency`` threads.
+
+    A function that has not started after ``queue_timeout`` seconds is
+    cancelled and :class:`HashingCapacityExceeded` is raised.
+
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float) -> None:
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be a positive integer.')
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix='fd_dj_accounts-hashing',
+        )
+
+    def run(self, func: Callable[..., T], *args: Any) -> T:
+        future = self._executor.submit(func, *args)
+        done, _ = concurrent.futures.wait([future], timeout=self.queue_timeout)
+        # note: a function that has already started can not be cancelled; then wait for it.
+        if not done and future.cancel():
+            self._reject()
+        return future.result()
+
+    async def arun(self, func: Callable[..., T], *args: Any) -> T:
+        future = self._executor.submit(func, *args)
+        async_future = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(async_future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.cancel():
+                self._reject()
+        return await async_future
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _reject(self) -> None:
+        password_hashing_rejected.send(
+            sender=self.__class__,
+            max_concurrency=self.max_concurrency,
+            queue_timeout=self.queue_timeout,
+        )
+        raise HashingCapacityExceeded(self.max_concurrency, self.queue_timeout)
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_PASSWORD_HASHING_LIMIT_ENABLED', False))
+
+
+def get_executor() -> HashingExecutor:
+    """Return the executor for the current settings (it is created on first use)."""
+    global _executor
+
+    max_concurrency = int(
+        getattr(settings, 'APP_ACCOUNTS_PASSWORD_HASHING_MAX_CONCURRENCY', None)
+        or os.cpu_count()
+        or 1,
+    )
+    queue_timeout = float(getattr(settings, 'APP_ACCOUNTS_PASSWORD_HASHING_QUEUE_TIMEOUT', 1))
+
+    with _executor_lock:
+        if (
+            _executor is None
+            or _executor.max_concurrency != max_concurrency
+            or _executor.queue_timeout != queue_timeout
+        ):
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = HashingExecutor(max_concurrency, queue_timeout)
+        return _executor
+
+
+def check_password(raw_password: str, password_hash: str) -> bool:
+    """Return whether ``raw_password`` matches ``password_hash``, hashing in the executor."""
+    return get_executor().run(  # type: ignore[no-any-return]
+        hashers.check_password, raw_password, password_hash,
+    )
+
+
+async def acheck_password(raw_password: str, password_hash: str) -> bool:
+    """Async version of :func:`check_password`."""
+    return await get_executor().arun(hashers.check_password, raw_password, password_hash)
+
+
+def make_password(raw_password: Optional[str]) -> str:
+    """Hash ``raw_password`` in the executor."""
+    return get_executor().run(hashers.make_password, raw_password)  # type: ignore[no-any-return]
+
+
+async def amake_password(raw_password: Optional[str]) -> str:
+    """Async version of :func:`make_password`."""
+    return await get_executor().arun(hashers.make_password, raw_password)
+
+
+def must_update(password_hash: str) -> bool:
+    """
+    Return whether ``password_hash`` must be updated (a cheap check, no hashing).
+
+    Same logic as :func:`django.contrib.auth.hashers.check_password`.
+
+    """
+    if not hashers.is_password_usable(password_hash):
+        return False
+    preferred_hasher = hashers.get_hasher('default')
+    try:
+        hasher = hashers.identify_hasher(password_hash)
+    except ValueError:
+        return False
+    if hasher.algorithm != preferred_hasher.algorithm:
+        return True
+    return preferred_hasher.must_update(password_hash)  # type: ignore[no-any-return]
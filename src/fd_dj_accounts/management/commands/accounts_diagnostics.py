@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connections, router
+
+from ...diagnostics import (
+    INFORMATIONAL_QUERY_NAMES, explain_query, find_sequential_scans, get_canonical_queries,
+    get_missing_indexes, get_table_stats,
+)
+from ...models import User
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Report the query plans of the canonical queries of users, the missing indexes and"
+        " statistics of the users table."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help="Execute the queries to report actual times and row counts (PostgreSQL only).",
+        )
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='query_names',
+            metavar='NAME',
+            help="Name of a query to explain (can be repeated; default: all).",
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help=(
+                "Fail if an index is missing or the users table is scanned sequentially (except by"
+                " the informational queries)."
+            ),
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        using = options['database'] or router.db_for_read(User)
+        vendor = connections[using].vendor
+        table_name = User._meta.db_table
+
+        queries = get_canonical_queries(using=using)
+        query_names = options['query_names'] or list(queries)
+        unknown_query_names = sorted(set(query_names) - set(queries))
+        if unknown_query_names:
+            raise CommandError(
+                f"Unknown queries: {', '.join(unknown_query_names)}."
+                f" Valid queries: {', '.join(queries)}.",
+            )
+
+        scanning_query_names = []
+        for query_name in query_names:
+            plan = explain_query(queries[query_name], analyze=options['analyze'])
+            self.stdout.write(f"Query {query_name!r}:")
+            self.stdout.write(plan)
+            scanned_tables = find_sequential_scans(plan, vendor)
+            if scanned_tables:
+                self.stdout.write(f"Sequential scans: {', '.join(scanned_tables)}.")
+            if query_name in INFORMATIONAL_QUERY_NAMES:
+                self.stdout.write("(Informational query: sequential scans are expected.)")
+            elif table_name in scanned_tables:
+                scanning_query_names.append(query_name)
+            self.stdout.write("")
+
+        missing_indexes = get_missing_indexes(using=using)
+        self.stdout.write(f"Missing indexes: {', '.join(missing_indexes) or 'none'}.")
+
+        table_stats = get_table_stats(using=using)
+        if table_stats is None:
+            self.stdout.write(f"Table statistics are not supported by database vendor {vendor!r}.")
+        else:
+            self.stdout.write(
+                f"Table {table_name!r}: {table_stats.table_size} bytes"
+                f" (indexes: {table_stats.indexes_size} bytes),"
+                f" {table_stats.live_rows} live rows, {table_stats.dead_rows} dead rows"
+                f" (estimated bloat: {table_stats.dead_rows_ratio:.1%}).",
+            )
+            for index_stats in table_stats.indexes:
+                self.stdout.write(
+                    f"Index {index_stats.name!r}: {index_stats.size} bytes,"
+                    f" {index_stats.scans} scans.",
+                )
+
+        self.stdout.write(
+            f"Queries with sequential scans of table {table_name!r}:"
+            f" {', '.join(scanning_query_names) or 'none'}.",
+        )
+        if options['check'] and (missing_indexes or scanning_query_names):
+            raise CommandError("Query plan diagnostics failed.")
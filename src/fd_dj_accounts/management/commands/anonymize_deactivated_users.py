@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import datetime
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from ...retention import anonymize_deactivated_users
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Anonymize (scrub the email address and password of) the users that were deactivated"
+        " more than a number of days ago."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            required=True,
+            metavar='DAYS',
+            help="Minimum number of days since the deactivation of the users to anonymize.",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help="Number of users anonymized per transaction.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['older_than'] < 0:
+            raise CommandError("'--older-than' must not be negative.")
+        deactivated_before = timezone.now() - datetime.timedelta(days=options['older_than'])
+
+        total_count = 0
+        start_time = time.monotonic()
+        try:
+            for count in anonymize_deactivated_users(
+                deactivated_before,
+                chunk_size=options['chunk_size'],
+                using=options['database'],
+            ):
+                total_count += count
+                elapsed_time = time.monotonic() - start_time
+                self.stdout.write(
+                    f"Anonymized {count} users ({total_count} in total,"
+                    f" {total_count / max(elapsed_time, 1e-6):.1f} users/s).",
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(f"Anonymized users: {total_count}.")
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...canonicalization import backfill_canonical_email_addresses
+
+
+class Command(BaseCommand):
+
+    help = "Set the canonical email address of the users that do not have it."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Compute it again for all the users (e.g. after changing the canonicalizer).",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help="Number of users processed per transaction.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        total_count = 0
+        try:
+            for count in backfill_canonical_email_addresses(
+                chunk_size=options['chunk_size'],
+                recompute=options['all'],
+                using=options['database'],
+            ):
+                total_count += count
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(f"Updated users: {total_count}.")
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...user_sessions import clear_stale_sessions
+
+
+class Command(BaseCommand):
+
+    help = "Remove the entries of the index of user sessions whose session no longer exists."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help="Number of entries checked per query.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        total_count = 0
+        try:
+            for count in clear_stale_sessions(
+                chunk_size=options['chunk_size'],
+                using=options['database'],
+            ):
+                total_count += count
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(f"Removed entries: {total_count}.")
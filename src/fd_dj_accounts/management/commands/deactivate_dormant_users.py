@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import datetime
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from ...deactivation import deactivate_dormant_users
+from ...models import User
+
+
+class Command(BaseCommand):
+
+    help = "Deactivate the users that have not logged in for more than a number of days."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--inactive-for',
+            type=int,
+            required=True,
+            metavar='DAYS',
+            help="Minimum number of days since the last login of the users to deactivate.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report the number of users to deactivate.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of users deactivated per transaction.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['inactive_for'] < 0:
+            raise CommandError("'--inactive-for' must not be negative.")
+        last_login_before = timezone.now() - datetime.timedelta(days=options['inactive_for'])
+
+        if options['dry_run']:
+            count = User.objects.db_manager(options['database']).filter(
+                is_active=True, last_login__lt=last_login_before,
+            ).count()
+            self.stdout.write(f"Dormant users to deactivate: {count}.")
+            return
+
+        total_count = 0
+        batch_count = 0
+        start_time = time.monotonic()
+        try:
+            for count in deactivate_dormant_users(
+                last_login_before,
+                batch_size=options['batch_size'],
+                using=options['database'],
+            ):
+                total_count += count
+                batch_count += 1
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed_time = time.monotonic() - start_time
+
+        self.stdout.write(
+            f"Deactivated dormant users: {total_count}"
+            f" (last login before {last_login_before.isoformat()};"
+            f" {batch_count} batches in {elapsed_time:.1f} s).",
+        )
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import router
+
+from ...canonicalization import find_duplicate_users
+from ...models import User
+
+
+class Command(BaseCommand):
+
+    help = "List the users with the same canonical email address."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help="Number of canonical email addresses processed per query.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        using = options['database'] or router.db_for_read(User)
+
+        missing_count = User._base_manager.using(using).filter(
+            canonical_email_address__isnull=True,
+        ).count()
+        if missing_count:
+            self.stderr.write(
+                f"Users without a canonical email address (ignored): {missing_count}"
+                f" (see command 'backfill_canonical_email_addresses').",
+            )
+
+        group_count = 0
+        user_count = 0
+        try:
+            for canonical_email_address, users in find_duplicate_users(
+                chunk_size=options['chunk_size'],
+                using=using,
+            ):
+                group_count += 1
+                user_count += len(users)
+                self.stdout.write(f"{canonical_email_address}:")
+                for user in users:
+                    self.stdout.write(
+                        f"  {user.pk} {user.email_address}"
+                        f" (created at {user.created_at.isoformat()},"
+                        f" {'active' if user.is_active else 'inactive'})",
+                    )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(f"Duplicate groups: {group_count} (users: {user_count}).")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...deactivation import process_scheduled_deactivations
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Deactivate the users whose scheduled deactivation is due. Several instances can run"
+        " concurrently."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of users deactivated per transaction.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        total_count = 0
+        try:
+            for count in process_scheduled_deactivations(
+                batch_size=options['batch_size'],
+                using=options['database'],
+            ):
+                total_count += count
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(f"Deactivated users: {total_count}.")
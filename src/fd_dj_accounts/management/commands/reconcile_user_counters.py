@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from ...stats import reconcile_user_counters
+
+
+class Command(BaseCommand):
+
+    help = "Set the user counters to the actual number of users (and create them if needed)."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        changes = reconcile_user_counters(using=options['database'])
+        for name, (old_value, new_value) in changes.items():
+            self.stdout.write(f"{name}: {old_value} -> {new_value}")
+        self.stdout.write(f"Changed counters: {len(changes)}.")
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import InterfaceError, OperationalError
+from django.utils.module_loading import import_string
+
+from ...outbox import relay_events
+
+
+class Command(BaseCommand):
+
+    help = "Deliver the recorded user events to a sink, until there are no more events."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--sink',
+            default=None,
+            help="Import path of the sink (default: setting 'APP_ACCOUNTS_OUTBOX_SINK').",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help="Number of events delivered per transaction.",
+        )
+        parser.add_argument(
+            '--sink-timeout',
+            type=float,
+            default=None,
+            help="Seconds (default: setting 'APP_ACCOUNTS_OUTBOX_SINK_TIMEOUT').",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            sink = import_string(options['sink']) if options['sink'] else None
+        except ImportError as exc:
+            raise CommandError(str(exc)) from exc
+
+        total_count = 0
+        start_time = time.monotonic()
+        try:
+            for count in relay_events(
+                sink,
+                batch_size=options['batch_size'],
+                using=options['database'],
+                sink_timeout=options['sink_timeout'],
+            ):
+                total_count += count
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        except (OperationalError, InterfaceError) as exc:
+            raise CommandError(
+                f"Database error after relaying {total_count} events"
+                f" (the undelivered events will be delivered by the next run): {exc}",
+            ) from exc
+        elapsed_time = time.monotonic() - start_time
+
+        self.stdout.write(
+            f"Relayed events: {total_count}"
+            f" ({total_count / max(elapsed_time, 1e-6):.1f} events/s).",
+        )
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...seeding import seed_users
+
+
+class Command(BaseCommand):
+
+    help = "Insert synthetic users, for load and scale testing (do not use in production)."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--count',
+            type=int,
+            required=True,
+            help="Number of users to insert.",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Seed of the generated data (use different seeds to insert more users).",
+        )
+        parser.add_argument(
+            '--password',
+            default=None,
+            help="Password of all the users (default: an unusable password).",
+        )
+        parser.add_argument(
+            '--inactive-ratio',
+            type=float,
+            default=0.1,
+        )
+        parser.add_argument(
+            '--staff-ratio',
+            type=float,
+            default=0.01,
+        )
+        parser.add_argument(
+            '--superuser-ratio',
+            type=float,
+            default=0.001,
+        )
+        parser.add_argument(
+            '--never-logged-in-ratio',
+            type=float,
+            default=0.2,
+        )
+        parser.add_argument(
+            '--system-created-ratio',
+            type=float,
+            default=0.5,
+            help="Ratio of users created by the system user (instead of another seeded user).",
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=5 * 365,
+            help="Number of days over which the users were created.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help="Number of users inserted per transaction.",
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        total_count = 0
+        start_time = time.monotonic()
+        try:
+            for count in seed_users(
+                count=options['count'],
+                seed=options['seed'],
+                password=options['password'],
+                inactive_ratio=options['inactive_ratio'],
+                staff_ratio=options['staff_ratio'],
+                superuser_ratio=options['superuser_ratio'],
+                never_logged_in_ratio=options['never_logged_in_ratio'],
+                system_created_ratio=options['system_created_ratio'],
+                days=options['days'],
+                batch_size=options['batch_size'],
+                using=options['database'],
+            ):
+                total_count += count
+                elapsed_time = time.monotonic() - start_time
+                self.stdout.write(
+                    f"Inserted {count} users ({total_count} in total,"
+                    f" {total_count / max(elapsed_time, 1e-6):.1f} users/s).",
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(f"Inserted users: {total_count}.")
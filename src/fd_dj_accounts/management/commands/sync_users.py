@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any, Dict, Iterator, TextIO
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...sync import (
+    CREATE, DEACTIVATE, UPDATE, DesiredUser, apply_user_sync_changes, iter_user_sync_changes,
+)
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Make the users match the desired accounts in a JSON Lines file (one object per line, with"
+        " key 'email_address' and optional keys 'is_active', 'is_staff', 'is_superuser'),"
+        " sorted by email address."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            'path',
+            help="Path of the JSON Lines file, or '-' for the standard input.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report the planned changes.",
+        )
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            help="Do not deactivate the users that are not in the file.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+        )
+        parser.add_argument(
+            '--database',
+            default=None,
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path = options['path']
+        try:
+            stream: TextIO = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f"Cannot open {path!r}: {exc}") from exc
+        try:
+            changes = iter_user_sync_changes(
+                _iter_desired_users(stream),
+                deactivate_missing=not options['keep_missing'],
+                using=options['database'],
+            )
+            if options['dry_run']:
+                counts = {CREATE: 0, UPDATE: 0, DEACTIVATE: 0}
+                for change in changes:
+                    counts[change.action] += 1
+                    self.stdout.write(f"{change.action} {change.email_address} {change.fields}")
+            else:
+                counts = apply_user_sync_changes(
+                    changes, batch_size=options['batch_size'], using=options['database'],
+                )
+        except (OSError, ValidationError, ValueError) as exc:
+            # note: includes errors reading the file (e.g. 'UnicodeDecodeError').
+            raise CommandError(str(exc)) from exc
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        summary = ', '.join(f"{action}: {count}" for action, count in counts.items())
+        prefix = "Planned changes" if options['dry_run'] else "Applied changes"
+        self.stdout.write(f"{prefix}: {summary}.")
+
+
+def _iter_desired_users(stream: TextIO) -> Iterator[DesiredUser]:
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data: Dict[str, Any] = json.loads(line)
+            yield DesiredUser(**data)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid desired user in line {line_number}: {exc}") from exc
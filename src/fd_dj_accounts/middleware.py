@@ -0,0 +1,130 @@
+"""
+Django middleware.
+
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Optional
+
+from django.contrib import auth
+from django.contrib.auth import authenticate
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.http import HttpRequest, HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from . import routers, session_snapshots
+
+
+class ApiTokenMiddleware:
+
+    """
+    Authenticate requests that have an API token in the header ``Authorization``.
+
+    The header value must be ``Token <raw token>`` or ``Bearer <raw token>``.
+    If the token is valid, ``request.user`` is set to the token's user
+    (without logging in, i.e. nothing is stored in the session); otherwise
+    the response is "401 Unauthorized".
+
+    It must be placed after
+    :class:`django.contrib.auth.middleware.AuthenticationMiddleware`, and
+    :class:`fd_dj_accounts.auth_backends.ApiTokenAuthBackend` must be in
+    setting ``AUTHENTICATION_BACKENDS``.
+
+    """
+
+    keywords = ('Token', 'Bearer')
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        raw_token = self.get_raw_token(request)
+        if raw_token is not None:
+            user = authenticate(request, api_token=raw_token)
+            if user is None:
+                response = HttpResponse('Invalid API token.', status=401)
+                response['WWW-Authenticate'] = self.keywords[0]
+                return response
+            request.user = user
+
+        return self.get_response(request)
+
+    def get_raw_token(self, request: HttpRequest) -> Optional[str]:
+        authorization: str = request.headers.get('Authorization', '')
+        keyword, _, raw_token = authorization.partition(' ')
+        if keyword not in self.keywords or not raw_token.strip():
+            return None
+        return raw_token.strip()
+
+
+class SessionSnapshotAuthenticationMiddleware(AuthenticationMiddleware):
+
+    """
+    Replacement of :class:`django.contrib.auth.middleware.AuthenticationMiddleware`
+    that builds ``request.user`` from the session's user snapshot, if any.
+
+    If setting ``APP_ACCOUNTS_SESSION_SNAPSHOTS_ENABLED`` is not set, it
+    behaves just like its parent class.
+
+    .. seealso:: :mod:`fd_dj_accounts.session_snapshots`.
+
+    """
+
+    def process_request(self, request: HttpRequest) -> None:
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _get_user(request))
+
+
+def _get_user(request: HttpRequest) -> Any:
+    if not hasattr(request, '_cached_user'):
+        user = None
+        if session_snapshots.is_enabled():
+            user = session_snapshots.load_user(request)
+        if user is None:
+            user = auth.get_user(request)
+            if session_snapshots.is_enabled() and user.is_authenticated:
+                session_snapshots.store_snapshot(request, user)
+        request._cached_user = user
+    return request._cached_user
+
+
+class ReplicaPinningMiddleware:
+
+    """
+    Keep reads pinned to the primary database across requests of a session.
+
+    If a request writes to the primary database (see
+    :class:`fd_dj_accounts.routers.ReplicaRouter`), the end of the sticky
+    window is stored in the session and restored in the session's following
+    requests.
+
+    It must be placed after
+    :class:`django.contrib.sessions.middleware.SessionMiddleware`.
+
+    """
+
+    session_key = '_fd_dj_accounts_replica_pinned_until'
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        session = getattr(request, 'session', None)
+        pinned_until = float(session.get(self.session_key, 0.0)) if session is not None else 0.0
+
+        token = routers.set_pinned_until(pinned_until)
+        try:
+            response = self.get_response(request)
+            new_pinned_until = routers.get_pinned_until()
+        finally:
+            routers.reset_pinned_until(token)
+
+        if session is not None:
+            if new_pinned_until > time.time():
+                if new_pinned_until != pinned_until:
+                    session[self.session_key] = new_pinned_until
+            elif self.session_key in session:
+                del session[self.session_key]
+        return response
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiToken',
+            fields=[
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False
+                    )
+                ),
+                (
+                    'name',
+                    models.CharField(
+                        blank=True,
+                        max_length=100
+                    )
+                ),
+                (
+                    'prefix',
+                    models.CharField(
+                        editable=False,
+                        max_length=12,
+                        unique=True
+                    )
+                ),
+                (
+                    'digest',
+                    models.CharField(
+                        editable=False,
+                        max_length=64
+                    )
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        editable=False
+                    )
+                ),
+                (
+                    'expires_at',
+                    models.DateTimeField(
+                        blank=True,
+                        null=True
+                    )
+                ),
+                (
+                    'revoked_at',
+                    models.DateTimeField(
+                        blank=True,
+                        null=True
+                    )
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='api_tokens',
+                        to='fd_dj_accounts.User'
+                    )
+                ),
+            ],
+            options={
+                'verbose_name': 'API token',
+                'verbose_name_plural': 'API tokens',
+            },
+        ),
+    ]
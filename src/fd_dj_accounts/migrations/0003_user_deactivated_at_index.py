@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0002_apitoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(
+                condition=models.Q(
+                    ('is_active', False),
+                    models.Q(
+                        ('email_address__endswith', '@anonymized.invalid'),
+                        _negated=True
+                    )
+                ),
+                fields=['deactivated_at'],
+                name='fd_dj_acc_user_deact_at_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0003_user_deactivated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deactivate_at',
+            field=models.DateTimeField(
+                blank=True,
+                help_text=(
+                    "When this user should be deactivated"
+                    " (see command 'process_scheduled_deactivations')."
+                ),
+                null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(
+                condition=models.Q(
+                    ('deactivate_at__isnull', False),
+                    ('is_active', True)
+                ),
+                fields=['deactivate_at'],
+                name='fd_dj_acc_user_deact_sched_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0004_user_deactivate_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(
+                condition=models.Q(
+                    ('is_active', True)
+                ),
+                fields=['last_login', 'id'],
+                name='fd_dj_acc_user_last_login_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0005_user_last_login_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                (
+                    'name',
+                    models.CharField(
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False
+                    )
+                ),
+                (
+                    'value',
+                    models.BigIntegerField(
+                        default=0
+                    )
+                ),
+            ],
+            options={
+                'verbose_name': 'user counter',
+                'verbose_name_plural': 'user counters',
+            },
+        ),
+    ]
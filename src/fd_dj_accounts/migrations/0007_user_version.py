@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0006_usercounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='version',
+            field=models.PositiveIntegerField(
+                default=1,
+                editable=False
+            ),
+        ),
+    ]
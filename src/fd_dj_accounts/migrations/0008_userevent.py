@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0007_user_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEvent',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        primary_key=True,
+                        serialize=False
+                    )
+                ),
+                (
+                    'event_type',
+                    models.CharField(
+                        max_length=50
+                    )
+                ),
+                (
+                    'user_id',
+                    models.UUIDField()
+                ),
+                (
+                    'payload',
+                    models.JSONField(
+                        default=dict
+                    )
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now
+                    )
+                ),
+            ],
+            options={
+                'verbose_name': 'user event',
+                'verbose_name_plural': 'user events',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0008_userevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                (
+                    'session_key',
+                    models.CharField(
+                        max_length=40,
+                        primary_key=True,
+                        serialize=False
+                    )
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now
+                    )
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='sessions',
+                        to='fd_dj_accounts.User'
+                    )
+                ),
+            ],
+            options={
+                'verbose_name': 'user session',
+                'verbose_name_plural': 'user sessions',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fd_dj_accounts', '0009_usersession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='canonical_email_address',
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text=(
+                    "Canonical form of the email address, for detecting duplicate users"
+                    " (see 'fd_dj_accounts.canonicalization')."
+                ),
+                max_length=254,
+                null=True
+            ),
+        ),
+    ]
@@ -5,14 +5,26 @@ Concrete models.
 
 from __future__ import annotations
 
-from typing import Any, Iterable, Optional
+import datetime
+import functools
+import secrets
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
 import uuid
 
 from django.conf import settings
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models.constants import OnConflict
+from django.db.models.expressions import RawSQL
+from django.db.models.sql import InsertQuery
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
 from django.utils.itercompat import is_iterable
 
-from . import base_models
+from . import (
+    base_models, canonicalization, email_availability, outbox, routers, session_snapshots, stats,
+    tracing, user_sessions,
+)
 
 import django.contrib.auth.models
 from django.contrib.auth.models import _user_has_perm, _user_has_module_perms
@@ -21,7 +33,8 @@ from django.contrib.auth.models import _user_has_perm, _user_has_module_perms
 update_last_login = django.contrib.auth.models.update_last_login
 
 
-def get_or_create_system_user() -> User:
+@tracing.traced('fd_dj_accounts.get_or_create_system_user')
+def get_or_create_system_user(using: Optional[str] = None) -> User:
     """Return the "system user", which is created by itself.
 
     The system user is created, by default:
@@ -32,10 +45,21 @@ def get_or_create_system_user() -> User:
     However, it is alright to modify any of this user's properties after its
     creation, just as if it were any other user, except the password.
 
+    If ``using`` is None, the database for writes is used (also for the
+    lookup, so that it is not affected by replication lag).
+
+    It is safe to call concurrently (e.g. by many workers starting at the same
+    time): the system user is inserted with a conflict-ignoring insert
+    (``INSERT ... ON CONFLICT DO NOTHING`` in PostgreSQL), so no integrity
+    error is raised and no transaction is rolled back; it is fetched only if
+    another process inserted it first.
+
     """
+    using = using or router.db_for_write(User)
+    manager = User.objects.db_manager(using)
     system_user_email_address = settings.APP_ACCOUNTS_SYSTEM_USERNAME
     try:
-        system_user: User = User.objects.get(email_address=system_user_email_address)
+        system_user: User = manager.get(email_address=system_user_email_address)
     except User.DoesNotExist:
         system_user_uuid = uuid.uuid4()
         system_user = User(
@@ -47,22 +71,223 @@ def get_or_create_system_user() -> User:
         )
         system_user.set_unusable_password()
 
-        # Before calling 'save()' we call the parent class' implementation as a trick to skip
-        #   validating field 'created_by' because it is a self reference. This only makes sense
-        #   when creating a system user.
-        super(User, system_user).save()
-        system_user.save()
+        # Field 'created_by' is excluded from validation because it is a self reference (only
+        #   makes sense when creating a system user), and the uniqueness of the email address is
+        #   guaranteed by the database.
+        system_user.full_clean(exclude=['created_by'], validate_unique=False)
+        system_user.canonical_email_address = canonicalization.canonicalize(
+            system_user.email_address,
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            inserted = _insert_ignoring_conflicts(system_user, using)
+            if inserted:
+                system_user._state.adding = False
+                system_user._state.db = using
+                manager.get_queryset()._record_created_users([system_user])
+
+        if not inserted:
+            # note: another process inserted the system user first.
+            system_user = manager.get(email_address=system_user.email_address)
 
     return system_user
 
 
-class UserManager(base_models.UserManager):
+class UserQuerySet(base_models.UserQuerySet):
+
+    """
+    Query set for model :class:`User`.
+
+    Extra customizations (besides those in the parent class):
+    - :meth:`update` increments field ``version`` (see :class:`User`).
+    - :meth:`update` invalidates the session snapshots of the users, if
+      enabled (see :mod:`fd_dj_accounts.session_snapshots`).
+    - :meth:`update`, :meth:`bulk_create` and :meth:`bulk_update` set field
+      ``canonical_email_address``.
+    - Update of the email availability filter, if enabled (see
+      :mod:`fd_dj_accounts.email_availability`).
+    - Maintenance of the user counters, if enabled (see :mod:`fd_dj_accounts.stats`).
+    - Recording of user events, if enabled (see :mod:`fd_dj_accounts.outbox`).
+    - :meth:`deactivate` can revoke the sessions of the users.
+    - Queries over the "creator tree", i.e. the tree of users formed by field
+      ``created_by``, rooted at the system user (which is created by itself).
+
+    The creator tree is walked by the database with a recursive common table
+    expression (``WITH RECURSIVE``), in a single query. On database backends
+    that do not support it, it is walked level by level (one query per level
+    of the tree).
+
+    """
+
+    def created_by_descendants(
+        self, user: User, max_depth: Optional[int] = None, include_self: bool = False,
+    ) -> UserQuerySet:
+        """
+        Filter the users created by ``user``, directly or indirectly.
+
+        If ``max_depth`` is not None, only the users up to that depth are
+        included (depth 1 is the users created directly by ``user``).
+
+        """
+        rows = _CreatorTreeQuery(self.db, user, _DESCENDANTS, max_depth, include_self)
+        return self.filter(pk__in=rows.get_pk_subquery())  # type: ignore[no-any-return]
+
+    def created_by_ancestors(self, user: User, include_self: bool = False) -> UserQuerySet:
+        """
+        Filter the creators of ``user``, directly or indirectly, i.e. the
+        users in the path from ``user`` to the root of the creator tree.
+
+        """
+        rows = _CreatorTreeQuery(self.db, user, _ANCESTORS, None, include_self)
+        return self.filter(pk__in=rows.get_pk_subquery())  # type: ignore[no-any-return]
+
+    def deactivate(self, revoke_sessions: bool = False, **fields: Any) -> int:
+        """
+        Customization: if ``revoke_sessions``, the indexed sessions of the
+        users of this query set are deleted too (see
+        :mod:`fd_dj_accounts.user_sessions`).
+
+        """
+        if not revoke_sessions:
+            return super().deactivate(**fields)  # type: ignore[no-any-return]
+
+        with transaction.atomic(using=self.db):
+            # note: the sessions are revoked first because deactivating the users may change
+            #   which users this query set matches (e.g. if it is filtered by 'is_active').
+            user_sessions.revoke_sessions(self)
+            return super().deactivate(**fields)  # type: ignore[no-any-return]
+
+    def update(self, **kwargs: Any) -> int:
+        routers.pin_to_primary()
+        kwargs.setdefault('version', models.F('version') + 1)
+        if 'email_address' in kwargs:
+            email_address = kwargs['email_address']
+            # note: the canonical form of a non-constant value (e.g. an expression) is unknown.
+            kwargs.setdefault(
+                'canonical_email_address',
+                canonicalization.canonicalize(email_address)
+                if isinstance(email_address, str) else None,
+            )
+            if email_availability.is_enabled() and kwargs['canonical_email_address'] is not None:
+                email_availability.add_canonical_email_addresses(
+                    [kwargs['canonical_email_address']],
+                )
+        if not session_snapshots.is_enabled():
+            return self._update_users(**kwargs)
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            # note: the users are fetched before updating them because the update may change which
+            #   users this query set matches (e.g. if it is filtered by 'is_active').
+            user_pks = list(self.order_by().values_list('pk', flat=True))
+            count = self._update_users(**kwargs)
+            # The session snapshots of the users are invalidated once the update is visible, so
+            #   that they are not refreshed with the previous values.
+            transaction.on_commit(
+                functools.partial(session_snapshots.invalidate_user_versions, user_pks),
+                using=self.db,
+            )
+        return count
+
+    def _update_users(self, **kwargs: Any) -> int:
+        if not stats.is_enabled() and not outbox.is_enabled():
+            return super().update(**kwargs)  # type: ignore[no-any-return]
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            deltas = {}
+            if stats.is_enabled():
+                # Lock the users, so that concurrent updates of the same users are not counted
+                #   twice (the deltas are computed before updating).
+                stats.lock_users(self)
+                deltas = stats.get_update_deltas(self, kwargs)
+            events = outbox.get_update_events(self, kwargs) if outbox.is_enabled() else []
+            count: int = super().update(**kwargs)
+            stats.update_counters(deltas, self.db)
+            outbox.record_events(events, self.db)
+        return count
+
+    def bulk_update(
+        self, objs: Iterable[User], fields: Sequence[str], batch_size: Optional[int] = None,
+    ) -> int:
+        fields = list(fields)
+        objs = list(objs)
+        if 'email_address' in fields and 'canonical_email_address' not in fields:
+            # note: otherwise 'update()' would set it to null (the values of the email address are
+            #   'Case' expressions).
+            canonicalizer = canonicalization.get_canonicalizer()
+            for obj in objs:
+                obj.canonical_email_address = canonicalizer(obj.email_address)
+            fields.append('canonical_email_address')
+            if email_availability.is_enabled():
+                email_availability.add_canonical_email_addresses(
+                    obj.canonical_email_address for obj in objs
+                )
+        count: int = super().bulk_update(objs, fields, batch_size=batch_size)
+        return count
+
+    def bulk_create(
+        self,
+        objs: Iterable[User],
+        batch_size: Optional[int] = None,
+        ignore_conflicts: bool = False,
+        update_conflicts: bool = False,
+        update_fields: Optional[Sequence[str]] = None,
+        unique_fields: Optional[Sequence[str]] = None,
+    ) -> List[User]:
+        kwargs = dict(
+            batch_size=batch_size,
+            ignore_conflicts=ignore_conflicts,
+            update_conflicts=update_conflicts,
+            update_fields=update_fields,
+            unique_fields=unique_fields,
+        )
+        objs = list(objs)
+        routers.pin_to_primary()
+        canonicalizer = canonicalization.get_canonicalizer()
+        for obj in objs:
+            obj.canonical_email_address = canonicalizer(obj.email_address)
+        if email_availability.is_enabled():
+            email_availability.add_canonical_email_addresses(
+                obj.canonical_email_address for obj in objs
+            )
+
+        if (not stats.is_enabled() and not outbox.is_enabled()) or update_conflicts:
+            return super().bulk_create(objs, **kwargs)  # type: ignore[no-any-return]
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            if ignore_conflicts:
+                existing_pks = set(
+                    self.filter(pk__in=[obj.pk for obj in objs]).values_list('pk', flat=True),
+                )
+            created_objs: List[User] = super().bulk_create(objs, **kwargs)
+            if ignore_conflicts:
+                # note: the database does not report which objects were inserted.
+                inserted_pks = set(
+                    self.filter(pk__in=[obj.pk for obj in objs]).values_list('pk', flat=True),
+                ) - existing_pks
+                created_objs = [obj for obj in created_objs if obj.pk in inserted_pks]
+
+            self._record_created_users(created_objs)
+        return created_objs
+
+    def _record_created_users(self, objs: List[User]) -> None:
+        """Update the counters and record the events of the inserted ``objs``, if enabled."""
+        for obj in objs:
+            stats.set_stored_flags(obj, obj.__dict__)
+        if stats.is_enabled():
+            stats.update_counters(
+                stats.get_insert_deltas(stats.get_stored_flags(obj) for obj in objs), self.db,
+            )
+        if outbox.is_enabled():
+            outbox.record_events((outbox.get_created_event(obj) for obj in objs), self.db)
+
+
+class UserManager(base_models.UserManager.from_queryset(UserQuerySet)):  # type: ignore[misc]
 
     """
     Manager for model :class:`User`.
 
     Extra customizations (besides those in the parent class):
     - Default value for field ``created_by`` is the system user.
+    - Custom query set (:class:`UserQuerySet`).
 
     """
 
@@ -90,11 +315,79 @@ class UserManager(base_models.UserManager):
         # warning: we can not just access foreign key field 'created_by' because if it has not
         #   been set the exception "User.created_by.RelatedObjectDoesNotExist" will be raised.
         if not hasattr(user, 'created_by') or user.created_by is None:
-            user.created_by = get_or_create_system_user()
+            user.created_by = get_or_create_system_user(using=self._db)
 
         user.save(using=self._db)
         return user
 
+    @tracing.traced('fd_dj_accounts.UserManager.get_or_create_user')
+    def get_or_create_user(
+        self,
+        email_address: str,
+        defaults: Optional[Dict[str, Any]] = None,
+    ) -> Tuple['User', bool]:
+        """
+        Return the user with the given email address, creating it if necessary.
+
+        Return a tuple ``(user, created)``. The email address is normalized.
+        ``defaults`` are the fields of the user if it is created (including
+        ``password``; if not set, the password is unusable).
+
+        The user is looked up first, so if it exists (the common case) a
+        single query is issued, and the new user is not built, validated nor
+        its password hashed. Otherwise, unlike ``get_or_create()``, the user
+        is inserted with a conflict-ignoring insert (``INSERT ... ON CONFLICT
+        DO NOTHING`` in PostgreSQL) and then fetched, which is correct under
+        concurrent calls for the same email address without raising integrity
+        errors or rolling back transactions. The email address uniqueness is
+        not validated beforehand (the database guarantees it).
+
+        """
+        if not email_address:
+            raise ValueError('The given email address must be set')
+        email_address = self.normalize_email(self.model.normalize_username(email_address))
+
+        db = self._db or router.db_for_write(self.model)
+        try:
+            return self.db_manager(db).get(email_address=email_address), False
+        except self.model.DoesNotExist:
+            pass
+
+        extra_fields = dict(defaults or {})
+        password = extra_fields.pop('password', None)
+        extra_fields.setdefault('is_staff', False)
+        extra_fields.setdefault('is_superuser', False)
+
+        user: User = self.model(email_address=email_address, **extra_fields)
+        user.set_password(password)
+        if user.created_by_id is None:
+            user.created_by = get_or_create_system_user(using=db)
+
+        # note: the existence of the user referenced by 'created_by' is guaranteed by the database.
+        user.full_clean(exclude=['created_by'], validate_unique=False)
+        self.db_manager(db).bulk_create([user], ignore_conflicts=True)
+
+        existing_user: User = self.db_manager(db).get(email_address=user.email_address)
+        return existing_user, existing_user.pk == user.pk
+
+    @tracing.traced('fd_dj_accounts.UserManager.get_created_by_tree')
+    def get_created_by_tree(self, user: User, max_depth: Optional[int] = None) -> List[User]:
+        """
+        Return ``user`` and the users created by it, directly or indirectly.
+
+        The users are ordered by depth (0 for ``user``) and then by email
+        address, and have these extra attributes:
+        - ``created_by_depth``: depth in the tree below ``user``.
+        - ``users_created_count``: number of users created directly by the
+          user (including those below ``max_depth``, if it is not None).
+
+        The whole (sub)tree is fetched with a single query on database
+        backends that support recursive common table expressions.
+
+        """
+        db = self._db or router.db_for_read(self.model)
+        return _CreatorTreeQuery(db, user, _DESCENDANTS, max_depth, include_self=True).get_users()
+
 
 class User(base_models.BaseUser):
 
@@ -103,12 +396,26 @@ class User(base_models.BaseUser):
 
     Extra customizations (besides those in the parent class):
     - New field ``created_by``.
+    - New field ``deactivate_at``, for scheduling a deactivation
+      (see :mod:`fd_dj_accounts.deactivation`).
+    - New field ``version``, incremented atomically by the database on each
+      update (including updates of query sets), for optimistic concurrency
+      control and for validating cached data (see :attr:`cache_key`).
+    - New field ``canonical_email_address``, set on each save, for detecting
+      duplicate users (see :mod:`fd_dj_accounts.canonicalization`).
+    - :meth:`deactivate` can revoke the sessions of the user.
     - Change field `id`: UUID instead of int.
     - Override :meth:`save` to make sure full validation is performed before
       each and every save (including creation).
     - Custom model manager.
     - Custom :meth:`__repr__` that includes the user’s ``id`` in addition to the username.
 
+    Optimistic concurrency control is enabled with setting
+    ``APP_ACCOUNTS_USER_VERSION_CHECK_ENABLED`` (default: ``False``): then
+    :meth:`save` updates the user only if its version in the database is the
+    one that was loaded, and raises :class:`UserVersionConflict` otherwise
+    (i.e. if the user has been updated concurrently).
+
     .. seealso:: :class:`AnonymousUser`.
 
     """
@@ -127,6 +434,28 @@ class User(base_models.BaseUser):
         blank=False,
         null=False,
     )
+    deactivate_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text=(
+            "When this user should be deactivated (see command 'process_scheduled_deactivations')."
+        ),
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+    )
+    canonical_email_address = models.CharField(
+        max_length=254,
+        blank=True,
+        null=True,
+        editable=False,
+        db_index=True,
+        help_text=(
+            "Canonical form of the email address, for detecting duplicate users"
+            " (see 'fd_dj_accounts.canonicalization')."
+        ),
+    )
 
     objects = UserManager()
 
@@ -136,6 +465,35 @@ class User(base_models.BaseUser):
         verbose_name = 'user'
         verbose_name_plural = 'users'
 
+        indexes = [
+            # For processing the deactivated users that are not anonymized yet
+            #   (see 'fd_dj_accounts.retention'), in time proportional to their number.
+            models.Index(
+                fields=['deactivated_at'],
+                name='fd_dj_acc_user_deact_at_idx',
+                condition=(
+                    models.Q(is_active=False)
+                    & ~models.Q(
+                        email_address__endswith=(
+                            f'@{base_models.ANONYMIZED_EMAIL_ADDRESS_DOMAIN}'
+                        ),
+                    )
+                ),
+            ),
+            # For claiming the due scheduled deactivations (see 'fd_dj_accounts.deactivation').
+            models.Index(
+                fields=['deactivate_at'],
+                name='fd_dj_acc_user_deact_sched_idx',
+                condition=models.Q(is_active=True, deactivate_at__isnull=False),
+            ),
+            # For finding the dormant users (see 'fd_dj_accounts.deactivation').
+            models.Index(
+                fields=['last_login', 'id'],
+                name='fd_dj_acc_user_last_login_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
     def __repr__(self) -> str:
         # fmt: off
         return (
@@ -146,10 +504,117 @@ class User(base_models.BaseUser):
         )
         # fmt: on
 
+    @property
+    def cache_key(self) -> str:
+        """Cache key that changes whenever the user is updated."""
+        return f'fd_dj_accounts:user:{self.pk}:{self.version}'
+
+    def deactivate(self, revoke_sessions: bool = False) -> None:
+        """
+        Customization: if ``revoke_sessions``, the indexed sessions of the
+        user are deleted too, atomically (see
+        :mod:`fd_dj_accounts.user_sessions`).
+
+        """
+        if not revoke_sessions:
+            super().deactivate()
+            return
+
+        using = router.db_for_write(User, instance=self)
+        with transaction.atomic(using=using):
+            super().deactivate()
+            user_sessions.revoke_sessions(User.objects.using(using).filter(pk=self.pk))
+
+    @tracing.traced('fd_dj_accounts.User.save')
     def save(self, *args: Any, **kwargs: Any) -> None:
-        """Call :meth:`full_clean` before saving."""
+        """Call :meth:`full_clean` before saving, and set the canonical email address."""
         self.full_clean()
-        super().save(*args, **kwargs)
+        self.canonical_email_address = canonicalization.canonicalize(self.email_address)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email_address' in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'canonical_email_address']
+        if outbox.is_enabled() or stats.is_enabled():
+            # The user and its events (see 'fd_dj_accounts.outbox') or the changes of the user
+            #   counters (see 'fd_dj_accounts.stats') are written atomically.
+            using = kwargs.get('using') or router.db_for_write(User, instance=self)
+            with transaction.atomic(using=using, savepoint=False):
+                if stats.is_enabled() and not self._state.adding and (
+                    update_fields is None
+                    or any(field_name in update_fields for field_name in stats.COUNTED_FIELD_NAMES)
+                ):
+                    stats.lock_user(self, using)
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        stats.refresh_stored_flags(self, kwargs.get('update_fields'))
+
+    @classmethod
+    def from_db(cls, db: Optional[str], field_names: Sequence[str], values: Sequence[Any]) -> User:
+        instance: User = super().from_db(db, field_names, values)
+        # note: deferred fields are not in the instance's '__dict__'.
+        stats.set_stored_flags(instance, instance.__dict__)
+        return instance
+
+    def refresh_from_db(
+        self, using: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+    ) -> None:
+        super().refresh_from_db(using=using, fields=fields)
+        stats.refresh_stored_flags(self, fields)
+
+    def _do_update(
+        self,
+        base_qs: models.QuerySet,
+        using: str,
+        pk_val: Any,
+        values: List[Tuple[models.Field, Optional[Type[models.Model]], Any]],
+        update_fields: Optional[Iterable[str]],
+        forced_update: bool,
+    ) -> bool:
+        """
+        Customization.
+
+        Increment field ``version`` in the UPDATE statement and, if enabled,
+        perform the UPDATE only if the version has not changed.
+
+        """
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, models.F('version') + 1))
+
+        if not _is_version_check_enabled():
+            # The UPDATE is conditional on the loaded version too, so that the new version is known
+            #   without another query, unless the user was updated concurrently; then it is
+            #   updated anyway, and the new version is fetched.
+            loaded_version = self.__dict__.get('version')
+            if loaded_version is not None and super()._do_update(
+                base_qs.filter(version=loaded_version),
+                using, pk_val, values, update_fields, forced_update,
+            ):
+                self.version = loaded_version + 1
+                return True
+            updated: bool = super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update,
+            )
+            if updated:
+                self.version = base_qs.filter(pk=pk_val).values_list('version', flat=True).get()
+            return updated
+
+        expected_version = self.version
+        updated = super()._do_update(
+            base_qs.filter(version=expected_version),
+            using, pk_val, values, update_fields, forced_update,
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise UserVersionConflict(
+                f"User {pk_val} was updated concurrently (expected version {expected_version}).",
+            )
+        if updated:
+            self.version = expected_version + 1
+        return updated
+
+    @tracing.traced('fd_dj_accounts.User.full_clean')
+    def full_clean(self, *args: Any, **kwargs: Any) -> None:
+        super().full_clean(*args, **kwargs)
 
     def has_perm(self, perm: str, obj: Optional[object] = None) -> bool:
         """
@@ -213,6 +678,14 @@ class User(base_models.BaseUser):
         return _user_has_module_perms(self, app_label)  # type: ignore[no-any-return]
 
 
+class UserVersionConflict(Exception):
+
+    """
+    The user was updated concurrently (see :class:`User`).
+
+    """
+
+
 class AnonymousUser(base_models.AnonymousUser):
 
     """
@@ -236,3 +709,385 @@ class AnonymousUser(base_models.AnonymousUser):
 
     def has_module_perms(self, module: str) -> bool:
         return _user_has_module_perms(self, module)  # type: ignore[no-any-return]
+
+
+class ApiTokenManager(models.Manager):
+
+    """
+    Manager for model :class:`ApiToken`.
+
+    """
+
+    def create_token(
+        self,
+        user: User,
+        name: str = '',
+        expires_at: Optional[datetime.datetime] = None,
+    ) -> Tuple[ApiToken, str]:
+        """
+        Create an API token for ``user``.
+
+        Return the token instance and the raw token, which is not stored and
+        thus can not be retrieved afterwards.
+
+        """
+        prefix = secrets.token_hex(ApiToken.PREFIX_LENGTH // 2)
+        raw_token = f'{prefix}{ApiToken.SEPARATOR}{secrets.token_urlsafe(32)}'
+        token: ApiToken = self.create(
+            user=user,
+            name=name,
+            prefix=prefix,
+            digest=ApiToken.compute_digest(raw_token),
+            expires_at=expires_at,
+        )
+        return token, raw_token
+
+    def get_for_raw_token(self, raw_token: str) -> Optional[ApiToken]:
+        """
+        Return the valid (not revoked nor expired) token for ``raw_token``.
+
+        The lookup is a single indexed query by the token's prefix, followed by
+        a constant-time comparison of the token digests.
+
+        """
+        prefix, separator, _ = raw_token.partition(ApiToken.SEPARATOR)
+        if not separator or len(prefix) != ApiToken.PREFIX_LENGTH:
+            return None
+
+        try:
+            token: ApiToken = self.select_related('user').get(prefix=prefix)
+        except ApiToken.DoesNotExist:
+            return None
+
+        if not constant_time_compare(token.digest, ApiToken.compute_digest(raw_token)):
+            return None
+        if not token.is_valid():
+            return None
+        return token
+
+
+class ApiToken(models.Model):
+
+    """
+    API token of a :class:`User`, for authenticating machine clients.
+
+    The raw token has the form ``<prefix>.<secret>``. Only the prefix (for
+    lookups) and a keyed digest (HMAC-SHA256, with the project's secret key)
+    of the whole raw token are stored, which is enough for authentication
+    because tokens have high entropy (unlike passwords, there is no need for a
+    slow hash).
+
+    .. warning::
+        Changing setting ``SECRET_KEY`` invalidates all tokens.
+
+    .. seealso:: :class:`fd_dj_accounts.auth_backends.ApiTokenAuthBackend`.
+
+    """
+
+    PREFIX_LENGTH = 12
+    SEPARATOR = '.'
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+    )
+    user = models.ForeignKey(
+        to='fd_dj_accounts.User',
+        on_delete=models.CASCADE,
+        related_name='api_tokens',
+    )
+    name = models.CharField(
+        max_length=100,
+        blank=True,
+    )
+    prefix = models.CharField(
+        max_length=PREFIX_LENGTH,
+        unique=True,
+        editable=False,
+    )
+    digest = models.CharField(
+        max_length=64,
+        editable=False,
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+    )
+    expires_at = models.DateTimeField(
+        blank=True,
+        null=True,
+    )
+    revoked_at = models.DateTimeField(
+        blank=True,
+        null=True,
+    )
+
+    objects = ApiTokenManager()
+
+    class Meta:
+        verbose_name = 'API token'
+        verbose_name_plural = 'API tokens'
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}(id={self.id!r}, prefix={self.prefix!r})>"
+
+    @staticmethod
+    def compute_digest(raw_token: str) -> str:
+        return salted_hmac(  # type: ignore[no-any-return]
+            'fd_dj_accounts.ApiToken', raw_token, algorithm='sha256',
+        ).hexdigest()
+
+    def is_valid(self) -> bool:
+        if self.revoked_at is not None:
+            return False
+        return self.expires_at is None or self.expires_at > timezone.now()
+
+    def revoke(self) -> None:
+        if self.revoked_at is None:
+            self.revoked_at = timezone.now()
+            self.save(update_fields=['revoked_at'])
+
+
+class UserCounter(models.Model):
+
+    """
+    Counter of users, maintained incrementally (see :mod:`fd_dj_accounts.stats`).
+
+    """
+
+    name = models.CharField(
+        primary_key=True,
+        max_length=32,
+    )
+    value = models.BigIntegerField(
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'user counter'
+        verbose_name_plural = 'user counters'
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}(name={self.name!r}, value={self.value!r})>"
+
+
+class UserEvent(models.Model):
+
+    """
+    Event of the lifecycle of a user, to be relayed (see :mod:`fd_dj_accounts.outbox`).
+
+    """
+
+    id = models.BigAutoField(
+        primary_key=True,
+    )
+    event_type = models.CharField(
+        max_length=50,
+    )
+    # note: not a foreign key because events must outlive the deletion of their user.
+    user_id = models.UUIDField()
+    payload = models.JSONField(
+        default=dict,
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'user event'
+        verbose_name_plural = 'user events'
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}("
+            f"id={self.id!r},"
+            f" event_type={self.event_type!r},"
+            f" user_id={self.user_id!r}"
+            f")>"
+        )
+
+
+class UserSession(models.Model):
+
+    """
+    Session in which a user logged in (see :mod:`fd_dj_accounts.user_sessions`).
+
+    """
+
+    session_key = models.CharField(
+        primary_key=True,
+        max_length=40,
+    )
+    user = models.ForeignKey(
+        to='fd_dj_accounts.User',
+        on_delete=models.CASCADE,
+        related_name='sessions',
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'user session'
+        verbose_name_plural = 'user sessions'
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}(session_key=..., user_id={self.user_id!r})>"
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _insert_ignoring_conflicts(user: User, using: str) -> bool:
+    """
+    Insert ``user`` unless it conflicts with an existing row; return whether it was inserted.
+
+    A single conflict-ignoring INSERT, without the side effects of
+    :meth:`UserQuerySet.bulk_create` (which also cannot report whether the
+    row was inserted).
+
+    """
+    query = InsertQuery(User, on_conflict=OnConflict.IGNORE)
+    query.insert_values(User._meta.local_concrete_fields, [user])
+    with connections[using].cursor() as cursor:
+        for sql, params in query.get_compiler(using=using).as_sql():
+            cursor.execute(sql, params)
+        return bool(cursor.rowcount == 1)
+
+
+def _is_version_check_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_USER_VERSION_CHECK_ENABLED', False))
+
+
+_DESCENDANTS = 'descendants'
+_ANCESTORS = 'ancestors'
+
+
+def _supports_recursive_cte(connection: BaseDatabaseWrapper) -> bool:
+    if connection.vendor in ('postgresql', 'sqlite'):
+        return True
+    if connection.vendor == 'mysql':
+        if getattr(connection, 'mysql_is_mariadb', False):
+            return getattr(connection, 'mysql_version', ()) >= (10, 2)
+        return getattr(connection, 'mysql_version', ()) >= (8,)
+    return False
+
+
+class _CreatorTreeQuery:
+
+    """
+    Walk of the creator tree (field ``created_by`` of :class:`User`) from a user.
+
+    Self references (i.e. the system user, which is created by itself) are not
+    followed.
+
+    """
+
+    def __init__(
+        self,
+        using: str,
+        user: User,
+        direction: str,
+        max_depth: Optional[int],
+        include_self: bool,
+    ) -> None:
+        if max_depth is not None and max_depth < 0:
+            raise ValueError('max_depth must be a non-negative integer.')
+        self.using = using
+        self.user = user
+        self.direction = direction
+        self.max_depth = max_depth
+        self.include_self = include_self
+        self.connection = connections[using]
+
+    def get_pk_subquery(self) -> Any:
+        if not _supports_recursive_cte(self.connection):
+            # note: the walk is performed now instead of when the query set is evaluated.
+            return [pk for pk, depth in self._walk_levels() if depth > 0 or self.include_self]
+
+        sql, params = self._get_cte_sql()
+        sql = f'{sql} SELECT tree.id FROM tree'
+        if not self.include_self:
+            sql = f'{sql} WHERE tree.depth > 0'
+        return RawSQL(sql, params)
+
+    def get_users(self) -> List[User]:
+        queryset = User.objects.db_manager(self.using)
+        if not _supports_recursive_cte(self.connection):
+            depths = dict(self._walk_levels())
+            users = list(
+                queryset.filter(pk__in=depths).annotate(
+                    users_created_count=models.Count(
+                        'users_created', filter=~models.Q(users_created=models.F('pk')),
+                    ),
+                ),
+            )
+            for user in users:
+                user.created_by_depth = depths[user.pk]
+            users.sort(key=lambda user: (user.created_by_depth, user.email_address))
+            return users
+
+        qn = self.connection.ops.quote_name
+        table = qn(User._meta.db_table)
+        pk_column = qn(User._meta.pk.column)
+        created_by_column = qn(User._meta.get_field('created_by').column)
+        email_address_column = qn(User._meta.get_field('email_address').column)
+
+        sql, params = self._get_cte_sql()
+        sql = (
+            f'{sql}'
+            f' SELECT u.*, tree.depth AS created_by_depth,'
+            f' (SELECT COUNT(*) FROM {table} c'
+            f' WHERE c.{created_by_column} = u.{pk_column} AND c.{pk_column} <> u.{pk_column})'
+            f' AS users_created_count'
+            f' FROM {table} u INNER JOIN tree ON u.{pk_column} = tree.id'
+            f' ORDER BY tree.depth, u.{email_address_column}'
+        )
+        return list(queryset.raw(sql, params))
+
+    def _get_cte_sql(self) -> Tuple[str, List[Any]]:
+        qn = self.connection.ops.quote_name
+        table = qn(User._meta.db_table)
+        pk_column = qn(User._meta.pk.column)
+        created_by_column = qn(User._meta.get_field('created_by').column)
+
+        if self.direction == _DESCENDANTS:
+            join_condition = f'u.{created_by_column} = tree.id'
+            where_condition = f'u.{pk_column} <> u.{created_by_column}'
+        else:
+            join_condition = f'u.{pk_column} = tree.created_by_id'
+            where_condition = 'tree.id <> tree.created_by_id'
+
+        params: List[Any] = [User._meta.pk.get_db_prep_value(self.user.pk, self.connection)]
+        depth_condition = ''
+        if self.max_depth is not None:
+            depth_condition = ' AND tree.depth < %s'
+            params.append(self.max_depth)
+
+        sql = (
+            f'WITH RECURSIVE tree (id, created_by_id, depth) AS ('
+            f'SELECT {pk_column}, {created_by_column}, 0 FROM {table} WHERE {pk_column} = %s'
+            f' UNION ALL'
+            f' SELECT u.{pk_column}, u.{created_by_column}, tree.depth + 1'
+            f' FROM {table} u INNER JOIN tree ON {join_condition}'
+            f' WHERE {where_condition}{depth_condition}'
+            f')'
+        )
+        return sql, params
+
+    def _walk_levels(self) -> List[Tuple[Any, int]]:
+        queryset = User.objects.db_manager(self.using).exclude(pk=models.F('created_by'))
+        pks_and_depths: List[Tuple[Any, int]] = [(self.user.pk, 0)]
+        level = [self.user.pk]
+        depth = 0
+        while level and (self.max_depth is None or depth < self.max_depth):
+            depth += 1
+            if self.direction == _DESCENDANTS:
+                level_queryset = queryset.filter(created_by__in=level).values_list('pk', flat=True)
+            else:
+                level_queryset = queryset.filter(pk__in=level).values_list('created_by', flat=True)
+            level = list(level_queryset)
+            pks_and_depths.extend((pk, depth) for pk in level)
+        return pks_and_depths
@@ -0,0 +1,250 @@
+"""
+Transactional outbox of user lifecycle events.
+
+Optional mode to notify other services of changes of users without calling
+them while the users are written: events are inserted in the table of model
+:class:`fd_dj_accounts.models.UserEvent` in the same transaction as the
+change of the user, and command ``relay_user_events`` (see
+:func:`relay_events`) delivers them later, in batches, to a "sink".
+
+Events:
+- :data:`USER_CREATED`: payload with the email address and the flags
+  (``is_active``, ``is_staff``, ``is_superuser``).
+- :data:`USER_DEACTIVATED`: empty payload.
+- :data:`USER_FLAGS_CHANGED`: payload with the new values of the flags that
+  changed (except deactivations, which are :data:`USER_DEACTIVATED` events).
+
+They are recorded for single-row writes (``save()``, e.g. by
+``UserManager.create_user()`` or ``User.deactivate()``) and for bulk writes
+(``bulk_create()`` and ``update()`` of
+:class:`fd_dj_accounts.models.UserQuerySet`, e.g. ``deactivate()``).
+
+Delivery is "at least once": a batch of events is deleted only after the sink
+has returned, in the transaction in which the events were claimed (with
+``SELECT ... FOR UPDATE SKIP LOCKED``, on database backends that support it),
+so the sink must be idempotent (e.g. using the event's ``id``). Events are
+delivered in best-effort ``id`` order: with concurrent writers, an event with
+a lower ``id`` may be committed after one with a higher ``id`` has been
+delivered, and several relays can run concurrently, delivering batches out of
+order. Consumers that need an order must not rely on the delivery order.
+
+A sink is a callable that takes a list of events; it must raise an exception
+if the events could not be delivered. It is called while the claimed events
+are locked, in an open transaction, so it should be fast (e.g. publishing to
+a message broker). The time of each call is bounded by
+``APP_ACCOUNTS_OUTBOX_SINK_TIMEOUT``: on PostgreSQL, if the transaction stays
+idle longer, the server terminates the session (not only the transaction), so
+the events are unlocked and delivered again later; :func:`relay_events` then
+closes the connection (the next call reconnects) and raises the database
+error. On other databases, slower calls are only logged.
+
+Settings:
+- ``APP_ACCOUNTS_OUTBOX_ENABLED`` (default: ``False``).
+- ``APP_ACCOUNTS_OUTBOX_SINK``: import path of the default sink (default:
+  ``'fd_dj_accounts.outbox.log_sink'``).
+- ``APP_ACCOUNTS_OUTBOX_SINK_TIMEOUT``: seconds (default: 30).
+
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import (
+    InterfaceError, OperationalError, connections, models, router, transaction,
+)
+from django.utils.module_loading import import_string
+
+from . import stats
+
+
+logger = logging.getLogger(__name__)
+
+USER_CREATED = 'user.created'
+USER_DEACTIVATED = 'user.deactivated'
+USER_FLAGS_CHANGED = 'user.flags_changed'
+
+Sink = Callable[[List[Any]], None]
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_OUTBOX_ENABLED', False))
+
+
+def get_sink() -> Sink:
+    sink_path = getattr(settings, 'APP_ACCOUNTS_OUTBOX_SINK', 'fd_dj_accounts.outbox.log_sink')
+    return import_string(sink_path)  # type: ignore[no-any-return]
+
+
+def log_sink(events: List[Any]) -> None:
+    """Sink that logs the events (with level INFO)."""
+    for event in events:
+        logger.info(
+            "User event %s: %s %s %s", event.id, event.event_type, event.user_id, event.payload,
+        )
+
+
+def get_sink_timeout() -> float:
+    return float(getattr(settings, 'APP_ACCOUNTS_OUTBOX_SINK_TIMEOUT', 30))
+
+
+def relay_events(
+    sink: Optional[Sink] = None,
+    batch_size: int = 100,
+    using: Optional[str] = None,
+    sink_timeout: Optional[float] = None,
+) -> Iterator[int]:
+    """
+    Deliver the recorded events to ``sink`` (default: the configured one).
+
+    Yield the number of events delivered in each batch, until there are no
+    more events to deliver (not counting those claimed by other relays).
+    Events are claimed in ``id`` order, which is not strictly the order in
+    which they were committed.
+
+    Each call of ``sink`` should take less than ``sink_timeout`` seconds
+    (default: :func:`get_sink_timeout`); see the module's docstring. If the
+    connection is lost (e.g. the session was terminated because of the
+    timeout), it is closed and the :class:`django.db.OperationalError` or
+    :class:`django.db.InterfaceError` is raised.
+
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be a positive integer.')
+    if sink_timeout is None:
+        sink_timeout = get_sink_timeout()
+    if sink_timeout <= 0:
+        raise ValueError('sink_timeout must be positive.')
+
+    sink = sink or get_sink()
+    event_model = _get_event_model()
+    using = using or router.db_for_write(event_model)
+    queryset = event_model.objects.using(using)
+    connection = connections[using]
+
+    while True:
+        try:
+            with transaction.atomic(using=using):
+                if connection.vendor == 'postgresql':
+                    # Bound the time the events stay locked if the sink is slow (or hangs).
+                    with connection.cursor() as cursor:
+                        # note: same as 'SET LOCAL', which does not support query parameters.
+                        cursor.execute(
+                            "SELECT set_config('idle_in_transaction_session_timeout', %s, true)",
+                            [str(int(sink_timeout * 1000))],
+                        )
+                events = list(
+                    queryset.order_by('id').select_for_update(skip_locked=True)[:batch_size],
+                )
+                if not events:
+                    break
+
+                start_time = time.monotonic()
+                sink(events)
+                elapsed_time = time.monotonic() - start_time
+                if elapsed_time > sink_timeout:
+                    logger.warning(
+                        "Delivery of %s user events took %.1f s (sink timeout: %s s).",
+                        len(events), elapsed_time, sink_timeout,
+                    )
+                queryset.filter(id__in=[event.id for event in events]).delete()
+        except (OperationalError, InterfaceError):
+            # note: the connection may be unusable (e.g. the session was terminated by the server),
+            #   so it is closed; it is opened again on next use.
+            connection.close()
+            raise
+        yield len(events)
+
+
+###############################################################################
+# recording
+###############################################################################
+
+def record_events(events: Iterable[models.Model], using: str) -> None:
+    events = list(events)
+    if events:
+        _get_event_model().objects.using(using).bulk_create(events)
+
+
+def get_created_event(user: Any) -> models.Model:
+    payload: Dict[str, Any] = {'email_address': user.email_address}
+    for field_name in stats.COUNTED_FIELD_NAMES:
+        payload[field_name] = bool(getattr(user, field_name))
+    return _get_event_model()(event_type=USER_CREATED, user_id=user.pk, payload=payload)
+
+
+def get_change_events(user_pk: Any, changed_flags: Dict[str, bool]) -> List[models.Model]:
+    event_model = _get_event_model()
+    events = []
+    changed_flags = dict(changed_flags)
+    if changed_flags.get('is_active') is False:
+        del changed_flags['is_active']
+        events.append(event_model(event_type=USER_DEACTIVATED, user_id=user_pk, payload={}))
+    if changed_flags:
+        events.append(
+            event_model(event_type=USER_FLAGS_CHANGED, user_id=user_pk, payload=changed_flags),
+        )
+    return events
+
+
+def get_update_events(
+    queryset: models.QuerySet, field_values: Dict[str, Any],
+) -> List[models.Model]:
+    """
+    Return the events for updating ``queryset`` with ``field_values``.
+
+    It is a single query, of the users whose flags change. Values of the flags
+    that are not booleans (e.g. expressions) are ignored.
+
+    """
+    changed_field_values = {
+        field_name: field_values[field_name]
+        for field_name in stats.COUNTED_FIELD_NAMES
+        if isinstance(field_values.get(field_name), bool)
+    }
+    if not changed_field_values:
+        return []
+
+    condition = models.Q()
+    for field_name, value in changed_field_values.items():
+        condition |= ~models.Q(**{field_name: value})
+    rows = queryset.order_by().filter(condition).values_list('pk', *changed_field_values)
+
+    events = []
+    for pk, *values in rows:
+        changed_flags = {
+            field_name: new_value
+            for (field_name, new_value), value in zip(changed_field_values.items(), values)
+            if value != new_value
+        }
+        events.extend(get_change_events(pk, changed_flags))
+    return events
+
+
+def record_events_on_save(
+    sender: Type[models.Model],
+    instance: models.Model,
+    created: bool,
+    raw: bool,
+    using: str,
+    update_fields: Optional[Iterable[str]] = None,
+    **kwargs: Any,
+) -> None:
+    if not is_enabled() or raw:
+        return
+
+    if created:
+        record_events([get_created_event(instance)], using)
+        return
+
+    changed_flags = stats.get_changed_flags(instance, update_fields)
+    if changed_flags:
+        record_events(get_change_events(instance.pk, changed_flags), using)
+
+
+def _get_event_model() -> Type[models.Model]:
+    return apps.get_model('fd_dj_accounts', 'UserEvent')  # type: ignore[no-any-return]
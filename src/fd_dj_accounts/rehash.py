@@ -0,0 +1,194 @@
+"""
+Deferred password rehash.
+
+When a password is checked against a hash that must be updated (e.g. after
+the number of iterations of the password hasher is increased),
+:meth:`django.contrib.auth.base_user.AbstractBaseUser.check_password` hashes
+the password again and saves the user, within the login request.
+
+Optional mode to defer the rehash: the task is enqueued instead, and it
+computes the new hash and applies it with a conditional UPDATE of the
+password that does nothing if the password was changed in the meantime. The
+hash of the user instance that was checked is not updated. The UPDATE does
+not increment the user's version (see :class:`fd_dj_accounts.models.User`),
+so a concurrent ``save()`` of the user (e.g. by ``update_last_login`` on the
+same login) does not fail with the version check enabled.
+
+The session auth hash is derived from the password hash, so sessions
+authenticated (e.g. by the same login) before the rehash would be flushed by
+:func:`django.contrib.auth.get_user`. To prevent that, the task stores the
+session auth hashes of the old and new password hashes in a cache, and
+:meth:`fd_dj_accounts.base_models.BaseUser.get_session_auth_fallback_hash`
+accepts the old one while the user's password hash is the new one (then
+Django updates the session's hash); the entry expires after
+``SESSION_COOKIE_AGE`` seconds.
+
+The default enqueue function runs the tasks in a thread pool of the current
+process; the raw password is kept in memory until the task runs, so an
+enqueue function must not serialize the task to an external queue.
+
+Settings:
+- ``APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENABLED`` (default: ``False``).
+- ``APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENQUEUE``: import path of a
+  callable that takes a task (a callable without arguments) and runs it
+  later (default: ``'fd_dj_accounts.rehash.thread_pool_enqueue'``).
+- ``APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_WORKERS``: number of threads of the
+  default enqueue function (default: 1).
+- ``APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_CACHE``: cache alias for the
+  session auth hashes of rehashed passwords (default: ``'default'``).
+
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
+import threading
+from typing import Any, Callable, List, Optional, Type
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password as _check_password, make_password
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections, models, router
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+
+from . import tracing
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'fd_dj_accounts:rehashed-password'
+
+Task = Callable[[], Any]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENABLED', False))
+
+
+def get_enqueue() -> Callable[[Task], Any]:
+    enqueue_path = getattr(
+        settings,
+        'APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENQUEUE',
+        'fd_dj_accounts.rehash.thread_pool_enqueue',
+    )
+    return import_string(enqueue_path)  # type: ignore[no-any-return]
+
+
+def thread_pool_enqueue(task: Task) -> None:
+    """Run ``task`` in a thread pool of the current process."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            workers = int(getattr(settings, 'APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_WORKERS', 1))
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='fd_dj_accounts-rehash',
+            )
+    _executor.submit(_run_task, task)
+
+
+def check_password(user: Any, raw_password: str) -> bool:
+    """
+    Check ``raw_password`` against the hash of ``user``.
+
+    If the password is correct and the hash must be updated, the rehash is
+    enqueued (see :func:`enqueue_rehash`).
+
+    """
+    def setter(raw_password: str) -> None:
+        enqueue_rehash(user, raw_password)
+
+    return _check_password(raw_password, user.password, setter)  # type: ignore[no-any-return]
+
+
+def enqueue_rehash(user: Any, raw_password: str) -> None:
+    using = user._state.db or router.db_for_write(type(user), instance=user)
+    get_enqueue()(
+        functools.partial(
+            rehash_password,
+            type(user),
+            user.pk,
+            raw_password,
+            user.password,
+            using,
+        ),
+    )
+
+
+@tracing.traced('fd_dj_accounts.rehash_password')
+def rehash_password(
+    user_model: Type[models.Model],
+    user_pk: Any,
+    raw_password: str,
+    old_password_hash: str,
+    using: str,
+) -> bool:
+    """
+    Hash ``raw_password`` and save it, if the hash is still ``old_password_hash``.
+
+    Return whether the user was updated.
+
+    """
+    password_hash = make_password(raw_password)
+    # note: the entry is stored before updating, so that there is no time in which the sessions
+    #   authenticated with the old hash are rejected. It is ignored if the update does nothing.
+    _get_cache().set(
+        _get_cache_key(user_pk),
+        (
+            user_model(password=old_password_hash).get_session_auth_hash(),
+            user_model(password=password_hash).get_session_auth_hash(),
+        ),
+        timeout=settings.SESSION_COOKIE_AGE,
+    )
+    # note: the base manager's 'update()' is not the one of 'UserQuerySet', which increments the
+    #   user's version (and the password is not tracked by the user counters nor by the events).
+    queryset = user_model._base_manager.using(using)
+    return bool(
+        queryset.filter(pk=user_pk, password=old_password_hash).update(password=password_hash),
+    )
+
+
+def get_session_auth_fallback_hashes(user: Any) -> List[str]:
+    """
+    Return the session auth hash of ``user`` before a deferred rehash of its password, if any.
+
+    It is returned only if the password hash of ``user`` is the one set by the rehash.
+
+    """
+    session_auth_hashes = _get_cache().get(_get_cache_key(user.pk))
+    if session_auth_hashes is None:
+        return []
+    old_session_auth_hash, new_session_auth_hash = session_auth_hashes
+    if not constant_time_compare(new_session_auth_hash, user.get_session_auth_hash()):
+        return []
+    return [old_session_auth_hash]
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _run_task(task: Task) -> None:
+    try:
+        task()
+    except Exception:
+        logger.exception("Deferred password rehash failed.")
+    finally:
+        # note: the connections of the pool's threads are not closed by Django's request handling.
+        connections.close_all()
+
+
+def _get_cache_key(user_pk: Any) -> str:
+    return f'{CACHE_KEY_PREFIX}:{user_pk}'
+
+
+def _get_cache() -> BaseCache:
+    return caches[getattr(settings, 'APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_CACHE', 'default')]
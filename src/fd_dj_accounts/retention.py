@@ -0,0 +1,102 @@
+"""
+Data retention of deactivated users.
+
+Deactivated users (see :meth:`fd_dj_accounts.base_models.BaseUser.deactivate`)
+are purged or anonymized in chunks, following an index ("keyset
+pagination"), each chunk in its own short transaction, so that locks are not
+held for long and the work can be interrupted and resumed at any time.
+
+The system user is never processed.
+
+"""
+
+from __future__ import annotations
+
+import datetime
+from typing import Any, Iterator, List, Optional
+
+from django.db import router, transaction
+
+from .base_models import ANONYMIZED_EMAIL_ADDRESS_DOMAIN
+from .models import User, get_or_create_system_user
+
+
+def purge_deactivated_users(
+    deactivated_before: datetime.datetime,
+    chunk_size: int = 500,
+    using: Optional[str] = None,
+) -> Iterator[int]:
+    """
+    Delete the users deactivated before ``deactivated_before``.
+
+    Yield the number of users deleted in each chunk.
+
+    Since field ``created_by`` is protected (``on_delete=PROTECT``), the
+    users created by the users to delete are reassigned to the system user
+    first, with a single UPDATE per chunk.
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive integer.')
+
+    using = using or router.db_for_write(User)
+    system_user = get_or_create_system_user(using=using)
+    queryset = User.objects.using(using).filter(
+        is_active=False,
+        deactivated_at__lt=deactivated_before,
+    ).exclude(pk=system_user.pk)
+
+    last_pk: Any = None
+    while True:
+        with transaction.atomic(using=using):
+            chunk_queryset = queryset.order_by('pk').select_for_update()
+            if last_pk is not None:
+                chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+            pks: List[Any] = list(chunk_queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+
+            User.objects.using(using).filter(created_by__in=pks).update(created_by=system_user)
+            User.objects.using(using).filter(pk__in=pks).delete()
+        last_pk = pks[-1]
+        yield len(pks)
+
+
+def anonymize_deactivated_users(
+    deactivated_before: datetime.datetime,
+    chunk_size: int = 500,
+    using: Optional[str] = None,
+) -> Iterator[int]:
+    """
+    Anonymize the users deactivated before ``deactivated_before``.
+
+    Yield the number of users anonymized in each chunk.
+
+    .. seealso:: :meth:`fd_dj_accounts.base_models.UserQuerySet.anonymize`.
+
+    Users already anonymized are skipped (using a partial index), so the
+    time is proportional to the number of users to anonymize, and it can be
+    resumed after an interruption.
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive integer.')
+
+    using = using or router.db_for_write(User)
+    system_user = get_or_create_system_user(using=using)
+    queryset = User.objects.using(using).filter(
+        is_active=False,
+        deactivated_at__lt=deactivated_before,
+    ).exclude(
+        email_address__endswith=f'@{ANONYMIZED_EMAIL_ADDRESS_DOMAIN}',
+    ).exclude(pk=system_user.pk)
+
+    while True:
+        with transaction.atomic(using=using):
+            chunk_queryset = queryset.order_by('deactivated_at', 'pk').select_for_update()
+            pks: List[Any] = list(chunk_queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+
+            count = User.objects.using(using).filter(pk__in=pks).anonymize()
+        yield count
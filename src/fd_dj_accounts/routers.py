@@ -0,0 +1,153 @@
+"""
+Database routers.
+
+:class:`ReplicaRouter` sends reads of the models of ``fd_dj_accounts`` to
+read replicas and writes to the primary database. After a write of a model of
+``fd_dj_accounts`` (``save()`` and ``delete()``, and ``update()`` and
+``bulk_create()`` of :class:`fd_dj_accounts.models.UserQuerySet`), reads are
+"pinned" to the primary for ``APP_ACCOUNTS_REPLICA_STICKY_SECONDS``, so that
+they are not affected by replication lag. Routing alone (e.g. a lookup that
+uses the database for writes) does not pin reads.
+
+The pinning is stored in a context variable, i.e. per thread (or asyncio
+task), and lasts until the end of the sticky window:
+- :class:`fd_dj_accounts.middleware.ReplicaPinningMiddleware` resets it at
+  the start of each request, and keeps it for the following requests of the
+  same session;
+- elsewhere (e.g. management commands or task workers), it is not reset
+  between units of work unless they are run in :func:`pinning_scope`.
+
+Settings:
+- ``APP_ACCOUNTS_PRIMARY_DATABASE``: database alias (default: ``'default'``).
+- ``APP_ACCOUNTS_REPLICA_DATABASES``: list of database aliases (default:
+  ``[]``, i.e. all reads go to the primary).
+- ``APP_ACCOUNTS_REPLICA_STICKY_SECONDS`` (default: 5).
+
+Usage:
+
+.. code-block:: python
+
+    DATABASE_ROUTERS = ['fd_dj_accounts.routers.ReplicaRouter']
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import random
+import time
+from typing import Any, Iterator, List, Optional, Type
+
+from django.conf import settings
+from django.db import models
+
+
+APP_LABEL = 'fd_dj_accounts'
+
+_pinned_until: contextvars.ContextVar[float] = contextvars.ContextVar(
+    'fd_dj_accounts_replica_pinned_until', default=0.0,
+)
+
+
+def get_primary_database() -> str:
+    return str(getattr(settings, 'APP_ACCOUNTS_PRIMARY_DATABASE', 'default'))
+
+
+def get_replica_databases() -> List[str]:
+    return list(getattr(settings, 'APP_ACCOUNTS_REPLICA_DATABASES', []))
+
+
+def get_pinned_until() -> float:
+    return _pinned_until.get()
+
+
+def set_pinned_until(value: float) -> contextvars.Token:
+    return _pinned_until.set(value)
+
+
+def reset_pinned_until(token: contextvars.Token) -> None:
+    _pinned_until.reset(token)
+
+
+def pin_to_primary() -> None:
+    """Send reads to the primary database for the sticky window (if replicas are configured)."""
+    if not get_replica_databases():
+        return
+    sticky_seconds = float(getattr(settings, 'APP_ACCOUNTS_REPLICA_STICKY_SECONDS', 5))
+    _pinned_until.set(max(_pinned_until.get(), time.time() + sticky_seconds))
+
+
+def is_pinned_to_primary() -> bool:
+    return _pinned_until.get() > time.time()
+
+
+@contextlib.contextmanager
+def pinning_scope() -> Iterator[None]:
+    """Run a unit of work (e.g. a task) unpinned, and discard its pinning at the end."""
+    token = _pinned_until.set(0.0)
+    try:
+        yield
+    finally:
+        _pinned_until.reset(token)
+
+
+def pin_to_primary_on_write(sender: Type[models.Model], **kwargs: Any) -> None:
+    """Receiver of ``post_save`` and ``post_delete``."""
+    if sender._meta.app_label == APP_LABEL:
+        pin_to_primary()
+
+
+class ReplicaRouter:
+
+    """
+    Route reads of ``fd_dj_accounts`` models to replicas and writes to the primary.
+
+    Models of other apps are not routed (i.e. ``None`` is returned), except
+    writes with an instance hint from a replica (e.g. of an object related to
+    a user read from a replica), which are sent to the primary.
+
+    """
+
+    def db_for_read(self, model: Type[models.Model], **hints: Any) -> Optional[str]:
+        if model._meta.app_label != APP_LABEL:
+            return None
+
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db  # type: ignore[no-any-return]
+
+        replicas = get_replica_databases()
+        if not replicas or is_pinned_to_primary():
+            return get_primary_database()
+        return random.choice(replicas)
+
+    def db_for_write(self, model: Type[models.Model], **hints: Any) -> Optional[str]:
+        if model._meta.app_label != APP_LABEL:
+            # note: otherwise Django would fall back to the database of the instance hint.
+            instance = hints.get('instance')
+            if instance is not None and instance._state.db in get_replica_databases():
+                return get_primary_database()
+            return None
+
+        # note: reads are pinned to the primary when a write is performed (see 'pin_to_primary'),
+        #   not here, since the database for writes is also used for some reads.
+        return get_primary_database()
+
+    def allow_relation(
+        self, obj1: models.Model, obj2: models.Model, **hints: Any,
+    ) -> Optional[bool]:
+        if obj1._meta.app_label == APP_LABEL and obj2._meta.app_label == APP_LABEL:
+            # Replicas contain the same data as the primary.
+            return True
+        databases = {get_primary_database(), *get_replica_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(
+        self, db: str, app_label: str, model_name: Optional[str] = None, **hints: Any,
+    ) -> Optional[bool]:
+        if app_label == APP_LABEL and db in get_replica_databases():
+            return False
+        return None
@@ -0,0 +1,239 @@
+"""
+Synthetic users, for load and scale testing.
+
+:func:`seed_users` inserts a large number of realistic users (see command
+``seed_users``), quickly:
+- rows are generated directly (no ``save()``, validation nor signals), and
+  the password is hashed only once (all the users have the same password
+  hash);
+- on PostgreSQL, each batch is loaded with ``COPY ... FROM STDIN``;
+  elsewhere, with ``bulk_create()``.
+
+The generated data is deterministic for a given ``seed`` (including the
+ids). Distributions:
+- ``created_by``: the system user, or a random previously generated user
+  (which forms a random tree of creators, of logarithmic depth);
+- ``created_at``: increasing with the users, over the last ``days`` days;
+- ``last_login``: none, or a random time after the creation (and before the
+  deactivation, for inactive users);
+- ``is_active``, ``is_staff`` and ``is_superuser`` (superusers are staff),
+  with the given ratios.
+
+No events are recorded (see :mod:`fd_dj_accounts.outbox`), and the user
+counters (see :mod:`fd_dj_accounts.stats`), if enabled, are reconciled after
+inserting the users.
+
+"""
+
+from __future__ import annotations
+
+import datetime
+import io
+import random
+from typing import Any, Dict, Iterator, List, Optional
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import canonicalization, stats
+from .models import User, get_or_create_system_user
+
+
+GIVEN_NAMES = (
+    'alejandra', 'ana', 'benjamin', 'camila', 'carlos', 'daniela', 'diego', 'fernanda',
+    'francisco', 'gabriel', 'isidora', 'javiera', 'jose', 'juan', 'lucas', 'maria',
+    'martina', 'matias', 'pedro', 'sofia', 'tomas', 'valentina', 'vicente', 'ximena',
+)
+FAMILY_NAMES = (
+    'castro', 'contreras', 'diaz', 'espinoza', 'fuentes', 'gonzalez', 'lopez', 'martinez',
+    'morales', 'munoz', 'perez', 'reyes', 'rodriguez', 'rojas', 'silva', 'soto', 'torres',
+)
+EMAIL_ADDRESS_DOMAINS = (
+    'example.com', 'example.net', 'example.org', 'mail.example.com', 'corp.example.com',
+)
+
+_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'fd_dj_accounts.seeding')
+
+
+def seed_users(
+    count: int,
+    seed: int = 0,
+    password: Optional[str] = None,
+    inactive_ratio: float = 0.1,
+    staff_ratio: float = 0.01,
+    superuser_ratio: float = 0.001,
+    never_logged_in_ratio: float = 0.2,
+    system_created_ratio: float = 0.5,
+    days: int = 5 * 365,
+    batch_size: int = 10000,
+    using: Optional[str] = None,
+) -> Iterator[int]:
+    """
+    Insert ``count`` synthetic users.
+
+    Yield the number of users inserted in each batch (each one in its own
+    transaction). If ``password`` is None, the users have an unusable
+    password.
+
+    """
+    if count < 0:
+        raise ValueError('count must not be negative.')
+    if batch_size < 1:
+        raise ValueError('batch_size must be a positive integer.')
+    if days < 0:
+        raise ValueError('days must not be negative.')
+    ratios = {
+        'inactive_ratio': inactive_ratio,
+        'staff_ratio': staff_ratio,
+        'superuser_ratio': superuser_ratio,
+        'never_logged_in_ratio': never_logged_in_ratio,
+        'system_created_ratio': system_created_ratio,
+    }
+    for name, ratio in ratios.items():
+        if not 0 <= ratio <= 1:
+            raise ValueError(f'{name} must be between 0 and 1.')
+
+    using = using or router.db_for_write(User)
+    rows = generate_user_rows(
+        count=count,
+        seed=seed,
+        password_hash=make_password(password),
+        system_user_id=get_or_create_system_user(using=using).pk,
+        now=timezone.now(),
+        days=days,
+        **ratios,
+    )
+
+    inserted_count = 0
+    while inserted_count < count:
+        batch_rows = [next(rows) for _ in range(min(batch_size, count - inserted_count))]
+        with transaction.atomic(using=using):
+            _insert_rows(batch_rows, using)
+        inserted_count += len(batch_rows)
+        yield len(batch_rows)
+
+    if count and stats.is_enabled():
+        stats.reconcile_user_counters(using=using)
+
+
+def generate_user_rows(
+    count: int,
+    seed: int,
+    password_hash: str,
+    system_user_id: uuid.UUID,
+    now: datetime.datetime,
+    days: int,
+    inactive_ratio: float,
+    staff_ratio: float,
+    superuser_ratio: float,
+    never_logged_in_ratio: float,
+    system_created_ratio: float,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generate the field values (by attribute name) of ``count`` synthetic users.
+
+    .. seealso:: :func:`seed_users`.
+
+    """
+    rng = random.Random(seed)
+    canonicalizer = canonicalization.get_canonicalizer()
+    id_namespace = uuid.uuid5(_ID_NAMESPACE, str(seed))
+    start_time = now - datetime.timedelta(days=days)
+    time_span = now - start_time
+
+    for index in range(count):
+        created_at = start_time + time_span * ((index + rng.random()) / max(count, 1))
+        if index == 0 or rng.random() < system_created_ratio:
+            created_by_id = system_user_id
+        else:
+            # note: ids are derived from the index, so there is no need to keep them in memory.
+            created_by_id = uuid.uuid5(id_namespace, str(rng.randrange(index)))
+
+        is_active = rng.random() >= inactive_ratio
+        deactivated_at = None
+        if not is_active:
+            deactivated_at = created_at + (now - created_at) * rng.random()
+
+        last_login = None
+        if rng.random() >= never_logged_in_ratio:
+            last_login = created_at + ((deactivated_at or now) - created_at) * rng.random()
+
+        is_superuser = rng.random() < superuser_ratio
+        is_staff = is_superuser or rng.random() < staff_ratio
+
+        email_address = (
+            f'{rng.choice(GIVEN_NAMES)}.{rng.choice(FAMILY_NAMES)}.{seed}-{index}'
+            f'@{rng.choice(EMAIL_ADDRESS_DOMAINS)}'
+        )
+        yield {
+            'id': uuid.uuid5(id_namespace, str(index)),
+            'email_address': email_address,
+            'canonical_email_address': canonicalizer(email_address),
+            'password': password_hash,
+            'last_login': last_login,
+            'is_active': is_active,
+            'is_staff': is_staff,
+            'is_superuser': is_superuser,
+            'created_at': created_at,
+            'deactivated_at': deactivated_at,
+            'created_by_id': created_by_id,
+        }
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _insert_rows(rows: List[Dict[str, Any]], using: str) -> None:
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        # note: the base manager's 'bulk_create()' is not the one of 'UserQuerySet', which
+        #   maintains the user counters and records events.
+        User._base_manager.db_manager(using).bulk_create([User(**row) for row in rows])
+        return
+
+    fields = User._meta.concrete_fields
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    sql = (
+        f'COPY {connection.ops.quote_name(User._meta.db_table)} ({columns}) FROM STDIN'
+    )
+    data = _get_copy_data(
+        [row[field.attname] if field.attname in row else field.get_default() for field in fields]
+        for row in rows
+    )
+
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            # psycopg2.
+            raw_cursor.copy_expert(sql, io.StringIO(data))
+        else:
+            # psycopg (3).
+            with raw_cursor.copy(sql) as copy:
+                copy.write(data)
+
+
+def _get_copy_data(rows: Iterator[List[Any]]) -> str:
+    """Encode ``rows`` in the text format of PostgreSQL's ``COPY``."""
+    lines = []
+    for row in rows:
+        values = []
+        for value in row:
+            if value is None:
+                values.append('\\N')
+            elif isinstance(value, bool):
+                values.append('t' if value else 'f')
+            elif isinstance(value, datetime.datetime):
+                values.append(value.isoformat())
+            else:
+                values.append(
+                    str(value)
+                    .replace('\\', '\\\\')
+                    .replace('\t', '\\t')
+                    .replace('\n', '\\n')
+                    .replace('\r', '\\r'),
+                )
+        lines.append('\t'.join(values))
+    return ''.join(f'{line}\n' for line in lines)
@@ -0,0 +1,175 @@
+"""
+Signed user snapshots stored in the session.
+
+Optional mode to build the user of session-authenticated requests without
+fetching it from the database on each request.
+
+On login, a signed snapshot of the user (id, email address, flags, a
+fingerprint of the password hash and the user's "cache version") is stored
+in the session. :class:`fd_dj_accounts.middleware.SessionSnapshotAuthenticationMiddleware`
+builds ``request.user`` from it, and falls back to the regular (database)
+lookup, refreshing the snapshot, when:
+- the snapshot is older than ``APP_ACCOUNTS_SESSION_SNAPSHOT_TTL`` seconds;
+- the user has been saved, updated (by ``update()`` of
+  :class:`fd_dj_accounts.models.UserQuerySet`, e.g. ``deactivate()``) or
+  deleted since the snapshot was taken (tracked with a per-user cache version
+  token);
+- the session's auth hash does not match the snapshot's fingerprint (e.g.
+  after a password change).
+
+The user built from a snapshot is a model instance whose other fields are
+deferred, i.e. they are loaded from the database only if accessed.
+
+Settings:
+- ``APP_ACCOUNTS_SESSION_SNAPSHOTS_ENABLED`` (default: ``False``).
+- ``APP_ACCOUNTS_SESSION_SNAPSHOT_TTL``: seconds (default: 300).
+- ``APP_ACCOUNTS_SESSION_SNAPSHOT_CACHE``: cache alias for the per-user
+  version tokens (default: ``'default'``).
+
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model,
+)
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.core import signing
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import router
+from django.db.models.base import DEFERRED
+from django.http import HttpRequest
+
+
+SNAPSHOT_SESSION_KEY = '_fd_dj_accounts_user_snapshot'
+SNAPSHOT_FORMAT_VERSION = 1
+SIGNING_SALT = 'fd_dj_accounts.session_snapshots'
+CACHE_KEY_PREFIX = 'fd_dj_accounts:user-version'
+FINGERPRINT_LENGTH = 16
+
+SNAPSHOT_FIELD_NAMES = ('email_address', 'is_active', 'is_staff', 'is_superuser')
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_SESSION_SNAPSHOTS_ENABLED', False))
+
+
+def store_snapshot(request: HttpRequest, user: AbstractBaseUser) -> None:
+    data: Dict[str, Any] = {
+        'v': SNAPSHOT_FORMAT_VERSION,
+        'id': str(user.pk),
+        'fp': _get_fingerprint(user.get_session_auth_hash()),
+        'uv': get_user_version(user.pk, create=True),
+    }
+    for field_name in SNAPSHOT_FIELD_NAMES:
+        data[field_name] = getattr(user, field_name)
+
+    request.session[SNAPSHOT_SESSION_KEY] = signing.dumps(data, salt=SIGNING_SALT, compress=True)
+
+
+def load_user(request: HttpRequest) -> Optional[AbstractBaseUser]:
+    """
+    Return the user built from the session's snapshot, if valid and fresh.
+
+    """
+    signed_data = request.session.get(SNAPSHOT_SESSION_KEY)
+    if signed_data is None:
+        return None
+
+    ttl = int(getattr(settings, 'APP_ACCOUNTS_SESSION_SNAPSHOT_TTL', 300))
+    try:
+        data = signing.loads(signed_data, salt=SIGNING_SALT, max_age=ttl)
+    except signing.BadSignature:
+        return None
+
+    if data.get('v') != SNAPSHOT_FORMAT_VERSION:
+        return None
+    if str(request.session.get(SESSION_KEY)) != data['id']:
+        return None
+    if request.session.get(BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return None
+    if _get_fingerprint(request.session.get(HASH_SESSION_KEY) or '') != data['fp']:
+        return None
+    if data['uv'] is None or get_user_version(data['id']) != data['uv']:
+        return None
+
+    UserModel = get_user_model()
+    field_values = {field_name: data[field_name] for field_name in SNAPSHOT_FIELD_NAMES}
+    field_values[UserModel._meta.pk.attname] = UserModel._meta.pk.to_python(data['id'])
+    return UserModel.from_db(  # type: ignore[no-any-return]
+        router.db_for_read(UserModel),
+        [field.attname for field in UserModel._meta.concrete_fields],
+        [
+            field_values.get(field.attname, DEFERRED)
+            for field in UserModel._meta.concrete_fields
+        ],
+    )
+
+
+def get_user_version(user_pk: Any, create: bool = False) -> Optional[str]:
+    """
+    Return the version token of the user, which changes whenever it is saved.
+
+    """
+    cache = _get_cache()
+    key = _get_cache_key(user_pk)
+    if create:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+    return cache.get(key)  # type: ignore[no-any-return]
+
+
+def invalidate_user_version(user_pk: Any) -> None:
+    _get_cache().set(_get_cache_key(user_pk), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_user_versions(user_pks: Iterable[Any], chunk_size: int = 1000) -> None:
+    """Invalidate the version tokens of several users (in chunks of ``chunk_size`` users)."""
+    cache = _get_cache()
+    user_pks = list(user_pks)
+    for i in range(0, len(user_pks), chunk_size):
+        cache.set_many(
+            {
+                _get_cache_key(user_pk): uuid.uuid4().hex
+                for user_pk in user_pks[i:i + chunk_size]
+            },
+            timeout=None,
+        )
+
+
+###############################################################################
+# signal receivers
+###############################################################################
+
+def store_snapshot_on_login(
+    sender: Any, request: Any, user: AbstractBaseUser, **kwargs: Any,
+) -> None:
+    if is_enabled() and request is not None and hasattr(request, 'session'):
+        store_snapshot(request, user)
+
+
+def invalidate_user_version_on_change(
+    sender: Any, instance: AbstractBaseUser, **kwargs: Any,
+) -> None:
+    if is_enabled():
+        invalidate_user_version(instance.pk)
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _get_fingerprint(session_auth_hash: str) -> str:
+    return session_auth_hash[:FINGERPRINT_LENGTH]
+
+
+def _get_cache_key(user_pk: Any) -> str:
+    return f'{CACHE_KEY_PREFIX}:{user_pk}'
+
+
+def _get_cache() -> BaseCache:
+    return caches[getattr(settings, 'APP_ACCOUNTS_SESSION_SNAPSHOT_CACHE', 'default')]
@@ -0,0 +1,15 @@
+"""
+Signals sent by ``fd_dj_accounts``.
+
+"""
+
+from django.dispatch import Signal
+
+
+# Sent when a login attempt is rejected by the login throttle, before any password hashing.
+# Arguments: 'request', 'identifier', 'scope' ("identifier" or "ip"), 'attempts', 'limit'.
+login_throttled = Signal()
+
+# Sent when a password is not hashed because the hashing executor is saturated (see 'hashing').
+# Arguments: 'max_concurrency', 'queue_timeout'.
+password_hashing_rejected = Signal()
@@ -0,0 +1,229 @@
+"""
+Compact read-only snapshots of users.
+
+A :class:`UserSnapshot` holds only the identity and flags of a user, in a
+slotted object (no model state, field caches or related objects), and has a
+compact versioned encoding, either binary (:meth:`UserSnapshot.to_bytes`) or
+JSON-compatible (:meth:`UserSnapshot.to_json`). It is intended for caching
+and serializing users (pickling a snapshot uses the binary encoding).
+
+A snapshot implements the part of the user interface used by middleware and
+views for authorization: ``is_authenticated``, ``is_anonymous``,
+``is_active``, ``is_staff``, ``is_superuser``, ``get_username()``,
+``has_perm()``, ``has_perms()`` and ``has_module_perms()``.
+
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple
+import uuid
+
+from django.contrib.auth.models import _user_has_module_perms, _user_has_perm
+from django.utils.itercompat import is_iterable
+
+
+FORMAT_VERSION = 1
+
+_ACTIVE = 0b001
+_STAFF = 0b010
+_SUPERUSER = 0b100
+
+# Format version (1 byte), flags (1 byte), id (16 bytes), then the UTF-8 encoded email address.
+_HEADER = struct.Struct('>BB16s')
+
+
+class UserSnapshot:
+
+    """
+    Read-only snapshot of a user (see :mod:`fd_dj_accounts.snapshots`).
+
+    """
+
+    FIELD_NAMES = ('id', 'email_address', 'is_active', 'is_staff', 'is_superuser')
+
+    # note: '_perm_cache' is set by the authentication backends.
+    __slots__ = FIELD_NAMES + ('_perm_cache',)
+
+    id: uuid.UUID
+    email_address: str
+    is_active: bool
+    is_staff: bool
+    is_superuser: bool
+
+    def __init__(
+        self,
+        id: uuid.UUID,
+        email_address: str,
+        is_active: bool,
+        is_staff: bool,
+        is_superuser: bool,
+    ) -> None:
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'email_address', email_address)
+        object.__setattr__(self, 'is_active', bool(is_active))
+        object.__setattr__(self, 'is_staff', bool(is_staff))
+        object.__setattr__(self, 'is_superuser', bool(is_superuser))
+
+    @classmethod
+    def from_user(cls, user: Any) -> UserSnapshot:
+        return cls(*(getattr(user, field_name) for field_name in cls.FIELD_NAMES))
+
+    @classmethod
+    def from_values(cls, values: Mapping[str, Any]) -> UserSnapshot:
+        """
+        Create a snapshot from a row of ``values(*UserSnapshot.FIELD_NAMES)``.
+
+        """
+        return cls(*(values[field_name] for field_name in cls.FIELD_NAMES))
+
+    ###########################################################################
+    # encoding
+    ###########################################################################
+
+    def to_bytes(self) -> bytes:
+        flags = (
+            (_ACTIVE if self.is_active else 0)
+            | (_STAFF if self.is_staff else 0)
+            | (_SUPERUSER if self.is_superuser else 0)
+        )
+        header = _HEADER.pack(FORMAT_VERSION, flags, self.id.bytes)
+        return header + self.email_address.encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> UserSnapshot:
+        """
+        Decode a snapshot encoded by :meth:`to_bytes`.
+
+        Raise :class:`ValueError` if the data is invalid or its format
+        version is not supported.
+
+        """
+        try:
+            version, flags, id_bytes = _HEADER.unpack_from(data)
+            email_address = data[_HEADER.size:].decode('utf-8')
+        except (struct.error, UnicodeDecodeError) as exc:
+            raise ValueError("Invalid user snapshot data.") from exc
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported user snapshot format version: {version}.")
+
+        return cls(
+            id=uuid.UUID(bytes=id_bytes),
+            email_address=email_address,
+            is_active=bool(flags & _ACTIVE),
+            is_staff=bool(flags & _STAFF),
+            is_superuser=bool(flags & _SUPERUSER),
+        )
+
+    def to_json(self) -> List[Any]:
+        """Return a JSON-serializable representation (a compact list)."""
+        return [
+            FORMAT_VERSION,
+            self.id.hex,
+            self.email_address,
+            self.is_active,
+            self.is_staff,
+            self.is_superuser,
+        ]
+
+    @classmethod
+    def from_json(cls, data: Any) -> UserSnapshot:
+        """
+        Decode a snapshot encoded by :meth:`to_json`.
+
+        Raise :class:`ValueError` if the data is invalid or its format
+        version is not supported.
+
+        """
+        if not isinstance(data, list) or not data:
+            raise ValueError("Invalid user snapshot data.")
+        if data[0] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported user snapshot format version: {data[0]}.")
+        try:
+            _, id_hex, email_address, is_active, is_staff, is_superuser = data
+            return cls(uuid.UUID(hex=id_hex), email_address, is_active, is_staff, is_superuser)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid user snapshot data.") from exc
+
+    def __reduce__(self) -> Tuple[Callable[[bytes], UserSnapshot], Tuple[bytes]]:
+        return self.__class__.from_bytes, (self.to_bytes(),)
+
+    ###########################################################################
+    # user interface
+    ###########################################################################
+
+    @property
+    def pk(self) -> uuid.UUID:
+        return self.id
+
+    @property
+    def is_anonymous(self) -> bool:
+        return False
+
+    @property
+    def is_authenticated(self) -> bool:
+        return True
+
+    def get_username(self) -> str:
+        return self.email_address
+
+    @property
+    def username(self) -> str:
+        return self.email_address
+
+    def has_perm(self, perm: str, obj: Optional[object] = None) -> bool:
+        # Active superusers have all permissions.
+        if self.is_active and self.is_superuser:
+            return True
+
+        # Otherwise we need to check the backends.
+        return _user_has_perm(self, perm, obj)  # type: ignore[no-any-return]
+
+    def has_perms(self, perm_list: Iterable[str], obj: Optional[object] = None) -> bool:
+        if not is_iterable(perm_list) or isinstance(perm_list, str):
+            raise ValueError("perm_list must be an iterable of permissions.")
+        return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    def has_module_perms(self, app_label: str) -> bool:
+        # Active superusers have all permissions.
+        if self.is_active and self.is_superuser:
+            return True
+
+        return _user_has_module_perms(self, app_label)  # type: ignore[no-any-return]
+
+    ###########################################################################
+    # other
+    ###########################################################################
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in self.FIELD_NAMES:
+            raise AttributeError(f"{self.__class__.__name__} is read-only.")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        if name in self.FIELD_NAMES:
+            raise AttributeError(f"{self.__class__.__name__} is read-only.")
+        object.__delattr__(self, name)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}("
+            f"id={self.id!r},"
+            f" email_address={self.email_address!r}"
+            f")>"
+        )
+
+    def __str__(self) -> str:
+        return self.email_address
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, UserSnapshot):
+            return NotImplemented
+        return all(
+            getattr(self, field_name) == getattr(other, field_name)
+            for field_name in self.FIELD_NAMES
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.id)
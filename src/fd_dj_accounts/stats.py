@@ -0,0 +1,319 @@
+"""
+Incrementally maintained user counters.
+
+Optional mode to get the number of users (total, active, staff and
+superusers) without counting the rows of the users table: the counters are
+stored in the table of model :class:`fd_dj_accounts.models.UserCounter` and
+updated, in the same transaction, on each write of users:
+- single-row writes: ``save()`` and ``delete()`` (using the ``post_save``
+  and ``post_delete`` signals); ``save()`` locks the user and takes the
+  previous values from the locked row;
+- bulk writes: ``bulk_create()`` and ``update()`` (including
+  ``deactivate()`` and ``anonymize()``) of
+  :class:`fd_dj_accounts.models.UserQuerySet`, and ``delete()`` of query sets
+  (which sends ``post_delete`` for each user); the users are locked while the
+  changes of the counters are computed.
+
+The counters are initialized (and fixed, if needed) by command
+``reconcile_user_counters``, which must be run after enabling this mode.
+Until then, and while the mode is disabled, :func:`get_user_stats` counts the
+rows. Writes that bypass the ORM (and ``update()`` with non-constant values of
+the counted fields) are not tracked; run the command again to fix the
+counters.
+
+Settings:
+- ``APP_ACCOUNTS_USER_COUNTERS_ENABLED`` (default: ``False``).
+
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, router, transaction
+
+
+TOTAL = 'total'
+ACTIVE = 'active'
+STAFF = 'staff'
+SUPERUSER = 'superuser'
+
+COUNTER_NAMES = (TOTAL, ACTIVE, STAFF, SUPERUSER)
+
+# Counted boolean fields of the user model, and their counter.
+COUNTED_FIELD_NAMES = {
+    'is_active': ACTIVE,
+    'is_staff': STAFF,
+    'is_superuser': SUPERUSER,
+}
+
+# Name of the attribute of user instances with the values of the counted fields, as stored in the
+#   database (see 'fd_dj_accounts.models.User.from_db()').
+STORED_FLAGS_ATTRIBUTE_NAME = '_fd_dj_accounts_stored_flags'
+
+
+class UserStats(NamedTuple):
+    total: int
+    active: int
+    staff: int
+    superuser: int
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_USER_COUNTERS_ENABLED', False))
+
+
+def get_user_stats(using: Optional[str] = None) -> UserStats:
+    """
+    Return the number of users: total, active, staff and superusers.
+
+    If the counters are enabled and initialized, they are read with a single
+    query that does not depend on the number of users.
+
+    """
+    counter_model = _get_counter_model()
+    if is_enabled():
+        using = using or router.db_for_read(counter_model)
+        values = dict(counter_model.objects.using(using).values_list('name', 'value'))
+        if all(name in values for name in COUNTER_NAMES):
+            return UserStats(**{name: values[name] for name in COUNTER_NAMES})
+
+    return count_users(using)
+
+
+def count_users(using: Optional[str] = None) -> UserStats:
+    """Count the users (a scan of the users table)."""
+    user_model = _get_user_model()
+    using = using or router.db_for_read(user_model)
+    return UserStats(**user_model.objects.using(using).aggregate(**_get_count_aggregates()))
+
+
+def reconcile_user_counters(using: Optional[str] = None) -> Dict[str, Tuple[Optional[int], int]]:
+    """
+    Set the counters to the actual number of users.
+
+    Return the counters that were changed (or created), mapped to their
+    old value (None if it did not exist) and new value.
+
+    """
+    counter_model = _get_counter_model()
+    using = using or router.db_for_write(counter_model)
+    changes: Dict[str, Tuple[Optional[int], int]] = {}
+
+    with transaction.atomic(using=using):
+        # Lock the counters so that they are not updated while the users are counted.
+        counters = {
+            counter.name: counter
+            for counter in counter_model.objects.using(using).select_for_update()
+        }
+        stats = count_users(using)
+        for name in COUNTER_NAMES:
+            value = getattr(stats, name)
+            counter = counters.get(name)
+            if counter is None:
+                counter_model.objects.using(using).create(name=name, value=value)
+                changes[name] = (None, value)
+            elif counter.value != value:
+                changes[name] = (counter.value, value)
+                counter.value = value
+                counter.save(using=using, update_fields=['value'])
+
+    return changes
+
+
+def update_counters(deltas: Dict[str, int], using: str) -> None:
+    """Add ``deltas`` to the counters, with one UPDATE per changed counter."""
+    counter_model = _get_counter_model()
+    for name, delta in deltas.items():
+        if delta:
+            counter_model.objects.using(using).filter(name=name).update(
+                value=models.F('value') + delta,
+            )
+
+
+def get_stored_flags(instance: models.Model) -> Optional[Dict[str, bool]]:
+    return getattr(instance, STORED_FLAGS_ATTRIBUTE_NAME, None)
+
+
+def set_stored_flags(instance: models.Model, field_values: Dict[str, Any]) -> None:
+    if all(field_name in field_values for field_name in COUNTED_FIELD_NAMES):
+        setattr(
+            instance,
+            STORED_FLAGS_ATTRIBUTE_NAME,
+            {field_name: bool(field_values[field_name]) for field_name in COUNTED_FIELD_NAMES},
+        )
+
+
+def refresh_stored_flags(instance: models.Model, field_names: Optional[Iterable[str]]) -> None:
+    """Update the stored values of the counted fields, after ``save()`` or ``refresh_from_db()``."""
+    stored_flags = get_stored_flags(instance)
+    if stored_flags is None:
+        if field_names is None:
+            set_stored_flags(instance, instance.__dict__)
+        return
+    for field_name in COUNTED_FIELD_NAMES if field_names is None else field_names:
+        if field_name in COUNTED_FIELD_NAMES and field_name in instance.__dict__:
+            stored_flags[field_name] = bool(instance.__dict__[field_name])
+
+
+def get_changed_flags(
+    instance: models.Model, update_fields: Optional[Iterable[str]] = None,
+) -> Optional[Dict[str, bool]]:
+    """
+    Return the counted fields of ``instance`` whose value differs from the stored one.
+
+    Only fields in ``update_fields`` are considered, if it is not None. Return
+    None if the stored values are unknown (e.g. the instance was not loaded
+    from the database).
+
+    """
+    stored_flags = get_stored_flags(instance)
+    if stored_flags is None:
+        return None
+
+    changed_flags = {}
+    for field_name in COUNTED_FIELD_NAMES:
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        value = bool(getattr(instance, field_name))
+        if value != stored_flags[field_name]:
+            changed_flags[field_name] = value
+    return changed_flags
+
+
+def get_insert_deltas(flags: Iterable[Optional[Dict[str, bool]]]) -> Dict[str, int]:
+    deltas = dict.fromkeys(COUNTER_NAMES, 0)
+    for user_flags in flags:
+        assert user_flags is not None
+        deltas[TOTAL] += 1
+        for field_name, counter_name in COUNTED_FIELD_NAMES.items():
+            deltas[counter_name] += int(user_flags[field_name])
+    return deltas
+
+
+def lock_users(queryset: models.QuerySet) -> None:
+    """
+    Lock the users of ``queryset`` until the end of the current transaction.
+
+    The users are locked in primary key order, to prevent deadlocks between
+    concurrent updates.
+
+    """
+    # note: the rows are locked as they are fetched (their values are not needed).
+    for _ in queryset.select_for_update().order_by('pk').values_list('pk', flat=True).iterator():
+        pass
+
+
+def lock_user(instance: models.Model, using: str) -> None:
+    """
+    Lock the user ``instance`` (until the end of the transaction) and refresh its stored flags.
+
+    So that the changes of the counters computed when saving ``instance`` are
+    relative to the values that it overwrites, even if the user was changed
+    concurrently since it was loaded.
+
+    """
+    stored_flags = (
+        type(instance)._base_manager.using(using).select_for_update()
+        .filter(pk=instance.pk).values(*COUNTED_FIELD_NAMES).first()
+    )
+    if stored_flags is not None:
+        set_stored_flags(instance, stored_flags)
+
+
+def get_update_deltas(queryset: models.QuerySet, field_values: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Return the deltas of the counters for updating ``queryset`` with ``field_values``.
+
+    It is a single aggregate query. Values of counted fields that are not
+    booleans (e.g. expressions) are ignored. The users must be locked (see
+    :func:`lock_users`), in the same transaction as the update.
+
+    """
+    changed_field_names = [
+        field_name
+        for field_name in COUNTED_FIELD_NAMES
+        if isinstance(field_values.get(field_name), bool)
+    ]
+    if not changed_field_names:
+        return {}
+
+    # Count the users whose value of each field changes.
+    aggregates = {
+        f'{field_name}_changed': models.Count(
+            'pk', filter=~models.Q(**{field_name: field_values[field_name]}),
+        )
+        for field_name in changed_field_names
+    }
+    changed_counts = queryset.order_by().aggregate(**aggregates)
+    return {
+        COUNTED_FIELD_NAMES[field_name]: (
+            changed_counts[f'{field_name}_changed']
+            if field_values[field_name]
+            else -changed_counts[f'{field_name}_changed']
+        )
+        for field_name in changed_field_names
+    }
+
+
+def update_counters_on_save(
+    sender: Type[models.Model],
+    instance: models.Model,
+    created: bool,
+    raw: bool,
+    using: str,
+    update_fields: Optional[Iterable[str]] = None,
+    **kwargs: Any,
+) -> None:
+    if not is_enabled() or raw:
+        return
+
+    if created:
+        flags = {
+            field_name: bool(getattr(instance, field_name)) for field_name in COUNTED_FIELD_NAMES
+        }
+        update_counters(get_insert_deltas([flags]), using)
+        return
+
+    changed_flags = get_changed_flags(instance, update_fields)
+    if changed_flags:
+        update_counters(
+            {
+                COUNTED_FIELD_NAMES[field_name]: 1 if value else -1
+                for field_name, value in changed_flags.items()
+            },
+            using,
+        )
+
+
+def update_counters_on_delete(
+    sender: Type[models.Model],
+    instance: models.Model,
+    using: str,
+    **kwargs: Any,
+) -> None:
+    if not is_enabled():
+        return
+
+    flags = get_stored_flags(instance) or {
+        field_name: bool(getattr(instance, field_name)) for field_name in COUNTED_FIELD_NAMES
+    }
+    deltas = get_insert_deltas([flags])
+    update_counters({name: -delta for name, delta in deltas.items()}, using)
+
+
+def _get_count_aggregates() -> Dict[str, models.Aggregate]:
+    aggregates: Dict[str, models.Aggregate] = {TOTAL: models.Count('pk')}
+    for field_name, counter_name in COUNTED_FIELD_NAMES.items():
+        aggregates[counter_name] = models.Count('pk', filter=models.Q(**{field_name: True}))
+    return aggregates
+
+
+def _get_user_model() -> Type[models.Model]:
+    return apps.get_model('fd_dj_accounts', 'User')  # type: ignore[no-any-return]
+
+
+def _get_counter_model() -> Type[models.Model]:
+    return apps.get_model('fd_dj_accounts', 'UserCounter')  # type: ignore[no-any-return]
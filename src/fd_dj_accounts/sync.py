@@ -0,0 +1,250 @@
+"""
+Reconciliation of users with an external directory.
+
+The desired accounts (e.g. exported from an external directory) are merged
+with the users in the database in a single pass, with bounded memory: both
+are streams sorted by email address. Only the differences are applied, in
+batches:
+- users that do not exist are created (with an unusable password);
+- users whose flags differ are updated;
+- users that are not desired (or desired as inactive) are deactivated.
+
+The system user is never changed.
+
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.validators import validate_email
+from django.db import connections, router, transaction
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .models import User, get_or_create_system_user
+
+
+CREATE = 'create'
+UPDATE = 'update'
+DEACTIVATE = 'deactivate'
+
+# Collations in which strings sort like Python strings (i.e. by code point).
+BINARY_COLLATIONS = {
+    'postgresql': 'C',
+    'sqlite': 'BINARY',
+    'mysql': 'utf8mb4_bin',
+}
+
+FLAG_FIELD_NAMES = ('is_active', 'is_staff', 'is_superuser')
+
+
+class DesiredUser(NamedTuple):
+    email_address: str
+    is_active: bool = True
+    is_staff: bool = False
+    is_superuser: bool = False
+
+
+class UserSyncChange(NamedTuple):
+    action: str
+    email_address: str
+    fields: Dict[str, Any]
+
+
+def iter_user_sync_changes(
+    desired_users: Iterable[DesiredUser],
+    deactivate_missing: bool = True,
+    chunk_size: int = 2000,
+    using: Optional[str] = None,
+) -> Iterator[UserSyncChange]:
+    """
+    Yield the changes needed for the users to match ``desired_users``.
+
+    ``desired_users`` must be sorted by (normalized) email address, without
+    duplicates; otherwise :class:`ValueError` is raised.
+
+    If ``deactivate_missing``, users that are not in ``desired_users`` are
+    deactivated.
+
+    By default, the users are read from the database for writes (not a read
+    replica, whose lag could produce changes that were already applied, e.g.
+    duplicate creations).
+
+    """
+    using = using or router.db_for_write(User)
+    system_user_email_address = settings.APP_ACCOUNTS_SYSTEM_USERNAME
+
+    existing_rows = _iter_existing_rows(chunk_size, using)
+    try:
+        desired_iter = _iter_normalized(desired_users)
+        existing_row = next(existing_rows, None)
+        desired_user = next(desired_iter, None)
+
+        while existing_row is not None or desired_user is not None:
+            if desired_user is None or (
+                existing_row is not None and existing_row[0] < desired_user.email_address
+            ):
+                assert existing_row is not None
+                email_address, is_active = existing_row[0], existing_row[1]
+                if deactivate_missing and is_active and email_address != system_user_email_address:
+                    yield UserSyncChange(DEACTIVATE, email_address, {})
+                existing_row = next(existing_rows, None)
+
+            elif existing_row is None or desired_user.email_address < existing_row[0]:
+                if desired_user.email_address != system_user_email_address:
+                    yield UserSyncChange(
+                        CREATE, desired_user.email_address, _get_flags(desired_user),
+                    )
+                desired_user = next(desired_iter, None)
+
+            else:
+                if desired_user.email_address != system_user_email_address:
+                    yield from _get_changes(existing_row, desired_user)
+                existing_row = next(existing_rows, None)
+                desired_user = next(desired_iter, None)
+    finally:
+        # Release the database cursor if the merge does not run to completion.
+        existing_rows.close()
+
+
+def apply_user_sync_changes(
+    changes: Iterable[UserSyncChange],
+    batch_size: int = 500,
+    using: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Apply ``changes`` in batches (one transaction per batch).
+
+    Return the number of changes applied, per action.
+
+    """
+    using = using or router.db_for_write(User)
+    created_by = get_or_create_system_user(using=using)
+    counts = {CREATE: 0, UPDATE: 0, DEACTIVATE: 0}
+
+    changes_iter = iter(changes)
+    while True:
+        batch = list(itertools.islice(changes_iter, batch_size))
+        if not batch:
+            break
+        with transaction.atomic(using=using):
+            _apply_batch(batch, created_by, counts, using)
+
+    return counts
+
+
+def sync_users(
+    desired_users: Iterable[DesiredUser],
+    deactivate_missing: bool = True,
+    batch_size: int = 500,
+    using: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Make the users match ``desired_users`` (sorted by email address).
+
+    .. seealso:: :func:`iter_user_sync_changes`, :func:`apply_user_sync_changes`.
+
+    """
+    using = using or router.db_for_write(User)
+    changes = iter_user_sync_changes(desired_users, deactivate_missing, using=using)
+    return apply_user_sync_changes(changes, batch_size=batch_size, using=using)
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _iter_existing_rows(
+    chunk_size: int, using: str,
+) -> Generator[Tuple[str, bool, bool, bool], None, None]:
+    collation = BINARY_COLLATIONS.get(connections[using].vendor)
+    ordering = Collate('email_address', collation) if collation else 'email_address'
+    yield from (
+        User.objects.using(using)
+        .order_by(ordering)
+        .values_list('email_address', *FLAG_FIELD_NAMES)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _iter_normalized(desired_users: Iterable[DesiredUser]) -> Iterator[DesiredUser]:
+    previous_email_address: Optional[str] = None
+    for desired_user in desired_users:
+        email_address = User.objects.normalize_email(
+            User.normalize_username(desired_user.email_address),
+        )
+        if previous_email_address is not None and email_address <= previous_email_address:
+            raise ValueError(
+                "Desired users must be sorted by email address, without duplicates:"
+                f" {email_address!r} after {previous_email_address!r}.",
+            )
+        validate_email(email_address)
+        previous_email_address = email_address
+        yield desired_user._replace(email_address=email_address)
+
+
+def _get_flags(desired_user: DesiredUser) -> Dict[str, Any]:
+    return {field_name: getattr(desired_user, field_name) for field_name in FLAG_FIELD_NAMES}
+
+
+def _get_changes(
+    existing_row: Tuple[str, bool, bool, bool], desired_user: DesiredUser,
+) -> List[UserSyncChange]:
+    changes = []
+    existing_flags = dict(zip(FLAG_FIELD_NAMES, existing_row[1:]))
+
+    fields = {
+        field_name: value
+        for field_name, value in _get_flags(desired_user).items()
+        if value != existing_flags[field_name] and field_name != 'is_active'
+    }
+    if desired_user.is_active and not existing_flags['is_active']:
+        fields['is_active'] = True
+        fields['deactivated_at'] = None
+    if fields:
+        changes.append(UserSyncChange(UPDATE, desired_user.email_address, fields))
+
+    if existing_flags['is_active'] and not desired_user.is_active:
+        changes.append(UserSyncChange(DEACTIVATE, desired_user.email_address, {}))
+    return changes
+
+
+def _apply_batch(
+    batch: List[UserSyncChange], created_by: User, counts: Dict[str, int], using: str,
+) -> None:
+    queryset = User.objects.using(using)
+
+    now = timezone.now()
+    new_users = [
+        User(
+            email_address=change.email_address,
+            password=make_password(None),
+            created_by=created_by,
+            deactivated_at=None if change.fields['is_active'] else now,
+            **change.fields,
+        )
+        for change in batch
+        if change.action == CREATE
+    ]
+    if new_users:
+        counts[CREATE] += len(queryset.bulk_create(new_users))
+
+    email_addresses_by_update: Dict[Tuple[Tuple[str, Any], ...], List[str]] = {}
+    for change in batch:
+        if change.action == UPDATE:
+            key = tuple(sorted(change.fields.items()))
+            email_addresses_by_update.setdefault(key, []).append(change.email_address)
+    for fields, email_addresses in email_addresses_by_update.items():
+        counts[UPDATE] += queryset.filter(email_address__in=email_addresses).update(**dict(fields))
+
+    deactivated_email_addresses = [
+        change.email_address for change in batch if change.action == DEACTIVATE
+    ]
+    if deactivated_email_addresses:
+        counts[DEACTIVATE] += queryset.filter(
+            email_address__in=deactivated_email_addresses,
+        ).deactivate()
@@ -0,0 +1,132 @@
+"""
+Login throttling.
+
+Limit the rate of login attempts per identifier (the submitted username) and
+per client IP address, so that bursts of attempts (e.g. credential stuffing)
+are rejected before any password is hashed.
+
+Attempts are counted with a sliding window counter: one counter per fixed
+window, stored in a Django cache, where the count for the sliding window is
+estimated as the count of the current window plus the count of the previous
+one weighted by how much of it overlaps the sliding window. Each attempt costs
+a constant number of cache operations.
+
+Settings:
+- ``APP_ACCOUNTS_LOGIN_THROTTLE_ENABLED`` (default: ``False``).
+- ``APP_ACCOUNTS_LOGIN_THROTTLE_WINDOW``: seconds (default: 300).
+- ``APP_ACCOUNTS_LOGIN_THROTTLE_IDENTIFIER_LIMIT``: max attempts per identifier
+  in a window (default: 10).
+- ``APP_ACCOUNTS_LOGIN_THROTTLE_IP_LIMIT``: max attempts per IP address in a
+  window (default: 100).
+- ``APP_ACCOUNTS_LOGIN_THROTTLE_CACHE``: cache alias (default: ``'default'``).
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.core.exceptions import PermissionDenied
+from django.http import HttpRequest
+
+from .signals import login_throttled
+
+
+CACHE_KEY_PREFIX = 'fd_dj_accounts:login-throttle'
+
+
+class LoginThrottled(PermissionDenied):
+
+    """
+    A login attempt was rejected by the login throttle.
+
+    It is a subclass of :class:`django.core.exceptions.PermissionDenied` so
+    that :func:`django.contrib.auth.authenticate` stops trying other backends.
+
+    """
+
+    def __init__(self, scope: str) -> None:
+        super().__init__(f"Too many login attempts ({scope}).")
+        self.scope = scope
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_LOGIN_THROTTLE_ENABLED', False))
+
+
+def check_login_attempt(
+    request: Optional[HttpRequest], identifier: Optional[str], sender: type,
+) -> None:
+    """
+    Count a login attempt and raise :class:`LoginThrottled` if over the limit.
+
+    Signal :data:`fd_dj_accounts.signals.login_throttled` is sent before
+    raising.
+
+    """
+    window = int(getattr(settings, 'APP_ACCOUNTS_LOGIN_THROTTLE_WINDOW', 300))
+
+    if identifier:
+        limit = int(getattr(settings, 'APP_ACCOUNTS_LOGIN_THROTTLE_IDENTIFIER_LIMIT', 10))
+        _check('identifier', identifier.strip().lower(), limit, window, request, identifier, sender)
+
+    ip_address = request.META.get('REMOTE_ADDR') if request is not None else None
+    if ip_address:
+        limit = int(getattr(settings, 'APP_ACCOUNTS_LOGIN_THROTTLE_IP_LIMIT', 100))
+        _check('ip', ip_address, limit, window, request, identifier, sender)
+
+
+def reset(scope: str, value: str) -> None:
+    """Clear the counters of ``value`` (an identifier or IP address) in ``scope``."""
+    window = int(getattr(settings, 'APP_ACCOUNTS_LOGIN_THROTTLE_WINDOW', 300))
+    if scope == 'identifier':
+        value = value.strip().lower()
+    window_index = int(time.time() // window)
+    _get_cache().delete_many([
+        _get_cache_key(scope, value, window_index),
+        _get_cache_key(scope, value, window_index - 1),
+    ])
+
+
+def _check(
+    scope: str, value: str, limit: int, window: int,
+    request: Optional[HttpRequest], identifier: Optional[str], sender: type,
+) -> None:
+    cache = _get_cache()
+    now = time.time()
+    window_index = int(now // window)
+    key = _get_cache_key(scope, value, window_index)
+
+    # note: 'add()' is a no-op if the key exists, and 'incr()' is atomic in the cache backends
+    #   that matter (Redis, Memcached).
+    cache.add(key, 0, timeout=2 * window)
+    current_count = cache.incr(key)
+    previous_count = cache.get(_get_cache_key(scope, value, window_index - 1), 0)
+
+    elapsed_fraction = (now % window) / window
+    attempts = current_count + previous_count * (1 - elapsed_fraction)
+
+    if attempts > limit:
+        login_throttled.send(
+            sender=sender,
+            request=request,
+            identifier=identifier,
+            scope=scope,
+            attempts=attempts,
+            limit=limit,
+        )
+        raise LoginThrottled(scope)
+
+
+def _get_cache_key(scope: str, value: str, window_index: int) -> str:
+    value_digest = hashlib.sha256(value.encode()).hexdigest()
+    return f'{CACHE_KEY_PREFIX}:{scope}:{value_digest}:{window_index}'
+
+
+def _get_cache() -> BaseCache:
+    return caches[getattr(settings, 'APP_ACCOUNTS_LOGIN_THROTTLE_CACHE', 'default')]
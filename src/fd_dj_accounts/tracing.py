@@ -0,0 +1,158 @@
+"""
+Tracing hooks.
+
+Optional instrumentation of the operations performed by ``fd_dj_accounts``
+(model manager methods, authentication backend calls, user model methods,
+etc.). Each instrumented operation runs inside a named :class:`Span` that
+records its duration and the number of SQL queries executed.
+
+Spans are reported to the registered tracers; to plug in any tracing or
+profiling tool, subclass :class:`Tracer` and register an instance with
+:func:`add_tracer` (e.g. in the ``ready()`` method of a project's app config).
+
+When no tracer is registered, instrumented operations are called directly:
+no span is created and no database execute wrapper is installed.
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, cast
+
+from django.db import connections
+
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+class Span:
+
+    """
+    A named, timed operation.
+
+    Durations are in seconds. ``sql_count`` includes the queries executed by
+    nested spans.
+
+    """
+
+    __slots__ = ('name', 'parent', 'attributes', 'start_time', 'end_time', 'sql_count', 'error')
+
+    def __init__(
+        self, name: str, parent: Optional[Span] = None, attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.start_time = 0.0
+        self.end_time: Optional[float] = None
+        self.sql_count = 0
+        self.error: Optional[BaseException] = None
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}(name={self.name!r}, duration={self.duration!r})>"
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+
+class Tracer:
+
+    """
+    Receiver of spans.
+
+    Subclasses override any of the callbacks; both are no-ops by default.
+    Exceptions raised by a tracer are not caught.
+
+    """
+
+    def on_start(self, span: Span) -> None:
+        """Called when ``span`` starts."""
+
+    def on_end(self, span: Span) -> None:
+        """Called when ``span`` ends (successfully or not)."""
+
+
+_tracers: List[Tracer] = []
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    'fd_dj_accounts_tracing_current_span', default=None,
+)
+
+
+def add_tracer(tracer: Tracer) -> None:
+    if tracer not in _tracers:
+        _tracers.append(tracer)
+
+
+def remove_tracer(tracer: Tracer) -> None:
+    if tracer in _tracers:
+        _tracers.remove(tracer)
+
+
+def is_enabled() -> bool:
+    return bool(_tracers)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Run the enclosed block in a span named ``name``.
+
+    Yield ``None`` (and do nothing else) if tracing is disabled.
+
+    """
+    if not _tracers:
+        yield None
+        return
+
+    span_ = Span(name, parent=_current_span.get(), attributes=attributes)
+
+    def count_queries(execute: Callable, sql: str, params: Any, many: bool, context: Any) -> Any:
+        span_.sql_count += 1
+        return execute(sql, params, many, context)
+
+    token = _current_span.set(span_)
+    try:
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_queries))
+
+            span_.start_time = time.perf_counter()
+            for tracer in _tracers:
+                tracer.on_start(span_)
+            try:
+                yield span_
+            except BaseException as exc:
+                span_.error = exc
+                raise
+            finally:
+                span_.end_time = time.perf_counter()
+                for tracer in _tracers:
+                    tracer.on_end(span_)
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorator that runs the decorated function in a span named ``name``.
+
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _tracers:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
@@ -1,14 +1,19 @@
 from typing import List
 
 import django.urls.resolvers
-# from django.urls import path
+from django.urls import path
 
-# from . import views
+from . import views
 
 
 app_name = 'fd_dj_accounts'
 
 urlpatterns: List[django.urls.resolvers.CheckURLMixin] = [
+    path(
+        "email-address-availability/",
+        views.EmailAddressAvailabilityView.as_view(),
+        name='email_address_availability',
+    ),
     # path(
     #     "User/create/",
     #     views.UserCreateView.as_view(),
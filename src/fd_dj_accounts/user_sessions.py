@@ -0,0 +1,191 @@
+"""
+Index of the sessions of each user.
+
+Optional mode to revoke the sessions of a user ("log out everywhere") without
+decoding every session in the session store: the key of each session in
+which a user logs in is stored, with the user, in the table of model
+:class:`fd_dj_accounts.models.UserSession` (on ``user_logged_in``), and
+removed on ``user_logged_out``.
+
+:func:`revoke_sessions` deletes exactly the indexed sessions of the given
+users, with a cost proportional to their number; it is used by
+``deactivate(revoke_sessions=True)`` of :class:`fd_dj_accounts.models.User`
+and of :class:`fd_dj_accounts.models.UserQuerySet`.
+
+The sessions must be stored server-side: with a cookie-based session engine
+(``django.contrib.sessions.backends.signed_cookies``), sessions cannot be
+deleted, so :func:`revoke_sessions` raises
+:class:`django.core.exceptions.ImproperlyConfigured`.
+
+Only sessions created by a login while this mode is enabled are indexed.
+A session whose key changes without a login (e.g. by
+:func:`django.contrib.auth.update_session_auth_hash`) is no longer indexed;
+anyway, the sessions of deactivated users are rejected by the authentication
+backends. Entries of sessions that expired (or were deleted without a
+logout) are removed by command ``clear_user_sessions``.
+
+Settings:
+- ``APP_ACCOUNTS_USER_SESSIONS_ENABLED`` (default: ``False``).
+
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any, Iterator, List, Optional, Type
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, router, transaction
+from django.http import HttpRequest
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'APP_ACCOUNTS_USER_SESSIONS_ENABLED', False))
+
+
+def revoke_sessions(user_queryset: models.QuerySet) -> int:
+    """
+    Delete the indexed sessions of the users of ``user_queryset``.
+
+    Return the number of sessions deleted. The index is looked up with a
+    single query (by the users' primary keys, using an index), and each
+    session is deleted from the session store.
+
+    Raise :class:`django.core.exceptions.ImproperlyConfigured` if the session
+    engine stores the sessions in cookies.
+
+    """
+    from django.contrib.sessions.backends import signed_cookies
+
+    if issubclass(_get_session_store_class(), signed_cookies.SessionStore):
+        raise ImproperlyConfigured(
+            "Sessions cannot be revoked with a cookie-based session engine"
+            f" ({settings.SESSION_ENGINE!r}).",
+        )
+
+    session_model = _get_session_model()
+    using = user_queryset.db
+    index_queryset = session_model.objects.using(using).filter(
+        user__in=user_queryset.order_by().values('pk'),
+    )
+
+    with transaction.atomic(using=using):
+        session_keys: List[str] = list(
+            index_queryset.select_for_update().values_list('session_key', flat=True),
+        )
+        if not session_keys:
+            return 0
+        _delete_sessions(session_keys)
+        session_model.objects.using(using).filter(session_key__in=session_keys).delete()
+    return len(session_keys)
+
+
+def clear_stale_sessions(chunk_size: int = 500, using: Optional[str] = None) -> Iterator[int]:
+    """
+    Remove the entries of sessions that no longer exist in the session store.
+
+    Yield the number of entries removed in each chunk (of ``chunk_size``
+    entries checked).
+
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive integer.')
+
+    session_model = _get_session_model()
+    using = using or router.db_for_write(session_model)
+    queryset = session_model.objects.using(using).order_by('session_key')
+    session_store = _get_session_store_class()()
+
+    last_session_key: Optional[str] = None
+    while True:
+        chunk_queryset = queryset
+        if last_session_key is not None:
+            chunk_queryset = chunk_queryset.filter(session_key__gt=last_session_key)
+        session_keys: List[str] = list(
+            chunk_queryset.values_list('session_key', flat=True)[:chunk_size],
+        )
+        if not session_keys:
+            break
+
+        stale_session_keys = [
+            session_key for session_key in session_keys
+            if not session_store.exists(session_key)
+        ]
+        if stale_session_keys:
+            queryset.filter(session_key__in=stale_session_keys).delete()
+        last_session_key = session_keys[-1]
+        yield len(stale_session_keys)
+
+
+###############################################################################
+# signal receivers
+###############################################################################
+
+def index_session_on_login(
+    sender: Type[models.Model], request: Optional[HttpRequest], user: Any, **kwargs: Any,
+) -> None:
+    if not is_enabled() or request is None or not hasattr(request, 'session'):
+        return
+    session_key = request.session.session_key
+    if session_key is None:
+        return
+
+    session_model = _get_session_model()
+    # note: 'login()' always cycles the session key, so the key is new unless the session store
+    #   reuses keys; in that case the existing entry is kept.
+    session_model.objects.using(router.db_for_write(session_model, instance=user)).bulk_create(
+        [session_model(session_key=session_key, user=user)],
+        ignore_conflicts=True,
+    )
+
+
+def unindex_session_on_logout(
+    sender: Optional[Type[models.Model]],
+    request: Optional[HttpRequest],
+    user: Any,
+    **kwargs: Any,
+) -> None:
+    if not is_enabled() or request is None or not hasattr(request, 'session'):
+        return
+    session_key = request.session.session_key
+    if session_key is None:
+        return
+
+    session_model = _get_session_model()
+    session_model.objects.using(router.db_for_write(session_model)).filter(
+        session_key=session_key,
+    ).delete()
+
+
+###############################################################################
+# helpers
+###############################################################################
+
+def _delete_sessions(session_keys: List[str]) -> None:
+    session_store_class = _get_session_store_class()
+    from django.contrib.sessions.backends import cached_db, db
+
+    if issubclass(session_store_class, db.SessionStore) and not issubclass(
+        session_store_class, cached_db.SessionStore,
+    ):
+        # Delete with a single query (the sessions are not cached).
+        store_model = session_store_class.get_model_class()
+        store_model.objects.using(router.db_for_write(store_model)).filter(
+            session_key__in=session_keys,
+        ).delete()
+        return
+
+    session_store = session_store_class()
+    for session_key in session_keys:
+        session_store.delete(session_key)
+
+
+def _get_session_store_class() -> Type[SessionBase]:
+    return import_module(settings.SESSION_ENGINE).SessionStore  # type: ignore[no-any-return]
+
+
+def _get_session_model() -> Type[models.Model]:
+    return apps.get_model('fd_dj_accounts', 'UserSession')  # type: ignore[no-any-return]
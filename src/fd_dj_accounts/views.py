@@ -1,3 +1,9 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.http import HttpRequest, JsonResponse
+from django.views import View
+
+from . import email_availability
 # from django.views.generic import (
 #     CreateView,
 #     DeleteView,
@@ -34,3 +40,30 @@
 # class UserListView(ListView):
 #
 #     model = User
+
+
+class EmailAddressAvailabilityView(View):
+
+    """
+    Whether an email address is available for a new user.
+
+    ``GET ?email_address=<email address>`` returns
+    ``{"email_address": ..., "available": true|false}``, or a response with
+    status 400 if the email address is not valid. See
+    :mod:`fd_dj_accounts.email_availability`.
+
+    """
+
+    http_method_names = ['get']
+
+    def get(self, request: HttpRequest) -> JsonResponse:
+        email_address = request.GET.get('email_address', '').strip()
+        try:
+            validate_email(email_address)
+        except ValidationError as exc:
+            return JsonResponse({'error': exc.messages[0]}, status=400)
+
+        return JsonResponse({
+            'email_address': email_address,
+            'available': email_availability.is_email_address_available(email_address),
+        })
@@ -1,11 +1,12 @@
-import time
 from typing import Any
+import uuid
 
 from fd_dj_accounts import models
 
 
 def generate_email_address() -> str:
-    return 'user-{}@example.com'.format(time.process_time())
+    # note: unlike a timestamp, a random UUID does not collide across processes.
+    return 'user-{}@example.com'.format(uuid.uuid4().int)
 
 
 def create_user(**kwargs: Any) -> models.User:
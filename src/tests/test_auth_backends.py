@@ -7,7 +7,8 @@ from django.contrib.auth.hashers import MD5PasswordHasher
 from django.core.signals import setting_changed
 from django.test import TestCase, override_settings
 
-from fd_dj_accounts.auth_backends import AuthUserModelAuthBackend
+from fd_dj_accounts.auth_backends import ApiTokenAuthBackend, AuthUserModelAuthBackend
+from fd_dj_accounts.models import ApiToken
 from . import utils
 
 
@@ -137,6 +138,41 @@ class FdDjAccountsAuthUserModelAuthBackendTest(AuthUserModelAuthBackendTestMixin
         )
 
 
+@override_settings(
+    AUTHENTICATION_BACKENDS=[
+        'fd_dj_accounts.auth_backends.AuthUserModelAuthBackend',
+        'fd_dj_accounts.auth_backends.ApiTokenAuthBackend',
+    ],
+    AUTH_USER_MODEL='fd_dj_accounts.User',
+    PASSWORD_HASHERS=['tests.test_auth_backends.CountingMD5PasswordHasher'],
+)
+class ApiTokenAuthBackendTest(TestCase):
+
+    def setUp(self):  # type: ignore
+        self.user = get_user_model().objects.create_user(email_address='test@example.com')
+        self.token, self.raw_token = ApiToken.objects.create_token(self.user)
+
+    def test_authenticate(self):  # type: ignore
+        CountingMD5PasswordHasher.calls = 0
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate(api_token=self.raw_token), self.user)
+        self.assertEqual(CountingMD5PasswordHasher.calls, 0)
+
+    def test_authenticate_invalid(self):  # type: ignore
+        self.assertIsNone(authenticate(api_token=self.raw_token[:-1]))
+        self.assertIsNone(authenticate(api_token=''))
+
+    def test_authenticate_inactive(self):  # type: ignore
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(api_token=self.raw_token))
+
+    def test_authenticate_does_not_accept_password(self):  # type: ignore
+        backend = ApiTokenAuthBackend()
+        self.assertIsNone(backend.authenticate(None))
+        self.assertIsNone(authenticate(username='test@example.com', password='test'))
+
+
 # TODO: test the backend with the default auth user model 'django.contrib.auth.models.User'.
 #   This is not terribly complicated by itself, but the test setup needs to be different, something
 #   more similar to how a 3rd-party package is tested, not how a Django project is tested.
@@ -0,0 +1,178 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from fd_dj_accounts import canonicalization
+from fd_dj_accounts.models import User, get_or_create_system_user
+
+
+class CanonicalizersTestCase(TestCase):
+
+    def test_canonicalize_email_address(self) -> None:
+        self.assertEqual(
+            canonicalization.canonicalize_email_address(' Foo.Bar+Tag@Example.COM '),
+            'foo.bar+tag@example.com',
+        )
+
+    def test_canonicalize_email_address_aliases(self) -> None:
+        canonicalize = canonicalization.canonicalize_email_address_aliases
+
+        self.assertEqual(canonicalize('Foo.Bar+Tag@Example.com'), 'foo.bar@example.com')
+        self.assertEqual(canonicalize('Foo.Bar+Tag@gmail.com'), 'foobar@gmail.com')
+        self.assertEqual(canonicalize('f.o.o.bar@GoogleMail.com'), 'foobar@gmail.com')
+        self.assertEqual(canonicalize('no-domain'), 'no-domain')
+
+    @override_settings(
+        APP_ACCOUNTS_EMAIL_CANONICALIZER=(
+            'fd_dj_accounts.canonicalization.canonicalize_email_address_aliases'
+        ),
+    )
+    def test_canonicalize_setting(self) -> None:
+        self.assertEqual(canonicalization.canonicalize('Foo+Tag@example.com'), 'foo@example.com')
+
+
+class CanonicalEmailAddressTestCase(TestCase):
+
+    def test_save(self) -> None:
+        user = User.objects.create_user('Foo@example.com')
+        self.assertEqual(user.canonical_email_address, 'foo@example.com')
+
+        user.email_address = 'Bar@example.com'
+        user.save(update_fields=['email_address'])
+        user.refresh_from_db()
+        self.assertEqual(user.canonical_email_address, 'bar@example.com')
+
+    def test_update(self) -> None:
+        user = User.objects.create_user('foo@example.com')
+
+        User.objects.filter(pk=user.pk).update(email_address='Bar@example.com')
+
+        user.refresh_from_db()
+        self.assertEqual(user.canonical_email_address, 'bar@example.com')
+
+    def test_update_expression(self) -> None:
+        user = User.objects.create_user('foo@example.com')
+        user.deactivate()
+
+        User.objects.filter(pk=user.pk).anonymize()
+
+        user.refresh_from_db()
+        self.assertIsNone(user.canonical_email_address)
+
+    def test_bulk_update(self) -> None:
+        users = [User.objects.create_user(f'user{i}@example.com') for i in range(2)]
+        for i, user in enumerate(users):
+            user.email_address = f'Other{i}@example.com'
+
+        User.objects.bulk_update(users, ['email_address'])
+
+        self.assertEqual(
+            [User.objects.get(pk=user.pk).canonical_email_address for user in users],
+            ['other0@example.com', 'other1@example.com'],
+        )
+
+    def test_bulk_create(self) -> None:
+        system_user = get_or_create_system_user()
+
+        User.objects.bulk_create([User(email_address='Foo@example.com', created_by=system_user)])
+
+        self.assertEqual(
+            User.objects.get(email_address='Foo@example.com').canonical_email_address,
+            'foo@example.com',
+        )
+
+
+class BackfillCanonicalEmailAddressesTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.users = [
+            User.objects.create_user(email_address)
+            for email_address in ('Foo+1@example.com', 'Bar@example.com', 'baz@example.com')
+        ]
+        User._base_manager.filter(pk__in=[user.pk for user in self.users[:2]]).update(
+            canonical_email_address=None,
+        )
+
+    def _get_canonical_email_addresses(self) -> list:
+        return [
+            User.objects.get(pk=user.pk).canonical_email_address for user in self.users
+        ]
+
+    def test_backfill(self) -> None:
+        counts = list(canonicalization.backfill_canonical_email_addresses(chunk_size=1))
+
+        self.assertEqual(counts, [1, 1])
+        self.assertEqual(
+            self._get_canonical_email_addresses(),
+            ['foo+1@example.com', 'bar@example.com', 'baz@example.com'],
+        )
+        self.assertEqual(
+            [User.objects.get(pk=user.pk).version for user in self.users],
+            [user.version for user in self.users],
+        )
+
+    @override_settings(
+        APP_ACCOUNTS_EMAIL_CANONICALIZER=(
+            'fd_dj_accounts.canonicalization.canonicalize_email_address_aliases'
+        ),
+    )
+    def test_backfill_recompute(self) -> None:
+        counts = list(canonicalization.backfill_canonical_email_addresses(recompute=True))
+
+        self.assertEqual(sum(counts), 2)
+        self.assertEqual(
+            self._get_canonical_email_addresses(),
+            ['foo@example.com', 'bar@example.com', 'baz@example.com'],
+        )
+
+    def test_backfill_invalid_chunk_size(self) -> None:
+        with self.assertRaises(ValueError):
+            list(canonicalization.backfill_canonical_email_addresses(chunk_size=0))
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command('backfill_canonical_email_addresses', '--all', stdout=stdout)
+
+        self.assertIn("Updated users: 2.", stdout.getvalue())
+        self.assertNotIn(None, self._get_canonical_email_addresses())
+
+
+class FindDuplicateUsersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.foo_users = [
+            User.objects.create_user(email_address)
+            for email_address in ('foo@example.com', 'Foo@example.com', 'FOO@example.com')
+        ]
+        self.bar_users = [
+            User.objects.create_user(email_address)
+            for email_address in ('bar@example.com', 'Bar@example.com')
+        ]
+        User.objects.create_user('baz@example.com')
+
+    def test_find_duplicate_users(self) -> None:
+        duplicate_users = list(canonicalization.find_duplicate_users(chunk_size=1))
+
+        self.assertEqual(
+            duplicate_users,
+            [('bar@example.com', self.bar_users), ('foo@example.com', self.foo_users)],
+        )
+
+    def test_find_duplicate_users_ignores_missing(self) -> None:
+        User._base_manager.filter(pk=self.bar_users[0].pk).update(canonical_email_address=None)
+
+        duplicate_users = list(canonicalization.find_duplicate_users())
+
+        self.assertEqual(duplicate_users, [('foo@example.com', self.foo_users)])
+
+    def test_command(self) -> None:
+        User._base_manager.filter(pk=self.bar_users[0].pk).update(canonical_email_address=None)
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+
+        call_command('find_duplicate_users', stdout=stdout, stderr=stderr)
+
+        self.assertIn(str(self.foo_users[1].pk), stdout.getvalue())
+        self.assertIn("Duplicate groups: 1 (users: 3).", stdout.getvalue())
+        self.assertIn("Users without a canonical email address (ignored): 1", stderr.getvalue())
@@ -0,0 +1,123 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from fd_dj_accounts.deactivation import deactivate_dormant_users, process_scheduled_deactivations
+from fd_dj_accounts.models import User
+
+
+class ProcessScheduledDeactivationsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.now = timezone.now()
+        past = self.now - datetime.timedelta(days=1)
+        future = self.now + datetime.timedelta(days=1)
+
+        self.due_users = [
+            User.objects.create_user(f'due{i}@example.com', deactivate_at=past) for i in range(3)
+        ]
+        self.future_user = User.objects.create_user('future@example.com', deactivate_at=future)
+        self.unscheduled_user = User.objects.create_user('unscheduled@example.com')
+
+        self.deactivated_user = User.objects.create_user('deactivated@example.com')
+        self.deactivated_user.deactivate()
+        self.deactivated_at = self.deactivated_user.deactivated_at
+        User.objects.filter(pk=self.deactivated_user.pk).update(deactivate_at=past)
+
+    def test_process_scheduled_deactivations(self) -> None:
+        counts = list(process_scheduled_deactivations(now=self.now, batch_size=2))
+        self.assertEqual(counts, [2, 1])
+
+        for user in self.due_users:
+            user.refresh_from_db()
+            self.assertFalse(user.is_active)
+            self.assertIsNotNone(user.deactivated_at)
+            self.assertIsNone(user.deactivate_at)
+
+        self.future_user.refresh_from_db()
+        self.assertTrue(self.future_user.is_active)
+        self.unscheduled_user.refresh_from_db()
+        self.assertTrue(self.unscheduled_user.is_active)
+        self.deactivated_user.refresh_from_db()
+        self.assertEqual(self.deactivated_user.deactivated_at, self.deactivated_at)
+
+        self.assertEqual(list(process_scheduled_deactivations(now=self.now)), [])
+
+    def test_process_scheduled_deactivations_queries(self) -> None:
+        # Each batch: SELECT ... FOR UPDATE, and a single UPDATE (including 'deactivate_at'), in a
+        #   savepoint (in tests).
+        batches = process_scheduled_deactivations(now=self.now)
+        with self.assertNumQueries(4):
+            self.assertEqual(next(batches), 3)
+
+    def test_invalid_batch_size(self) -> None:
+        with self.assertRaisesMessage(ValueError, 'batch_size must be a positive integer.'):
+            list(process_scheduled_deactivations(batch_size=0))
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command('process_scheduled_deactivations', stdout=stdout)
+
+        self.assertEqual(stdout.getvalue(), "Deactivated users: 3.\n")
+        self.assertEqual(User.objects.filter(is_active=False).count(), 4)
+
+
+class DeactivateDormantUsersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.now = timezone.now()
+        long_ago = self.now - datetime.timedelta(days=400)
+
+        self.dormant_users = [
+            User.objects.create_user(f'dormant{i}@example.com', last_login=long_ago)
+            for i in range(3)
+        ]
+        self.recent_user = User.objects.create_user(
+            'recent@example.com', last_login=self.now - datetime.timedelta(days=1),
+        )
+        self.never_logged_in_user = User.objects.create_user('never@example.com')
+
+        self.deactivated_user = User.objects.create_user(
+            'deactivated@example.com', last_login=long_ago,
+        )
+        self.deactivated_user.deactivate()
+
+    def test_deactivate_dormant_users(self) -> None:
+        last_login_before = self.now - datetime.timedelta(days=365)
+        counts = list(deactivate_dormant_users(last_login_before, batch_size=2))
+        self.assertEqual(counts, [2, 1])
+
+        for user in self.dormant_users:
+            user.refresh_from_db()
+            self.assertFalse(user.is_active)
+            self.assertIsNotNone(user.deactivated_at)
+
+        self.recent_user.refresh_from_db()
+        self.assertTrue(self.recent_user.is_active)
+        self.never_logged_in_user.refresh_from_db()
+        self.assertTrue(self.never_logged_in_user.is_active)
+
+        deactivated_at = self.deactivated_user.deactivated_at
+        self.deactivated_user.refresh_from_db()
+        self.assertEqual(self.deactivated_user.deactivated_at, deactivated_at)
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command(
+            'deactivate_dormant_users', '--inactive-for', '365', '--dry-run', stdout=stdout,
+        )
+        self.assertEqual(stdout.getvalue(), "Dormant users to deactivate: 3.\n")
+        self.assertEqual(User.objects.filter(is_active=False).count(), 1)
+
+        stdout = io.StringIO()
+        call_command(
+            'deactivate_dormant_users', '--inactive-for', '365', '--batch-size', '2', stdout=stdout,
+        )
+        self.assertRegex(
+            stdout.getvalue(),
+            r"^Deactivated dormant users: 3 \(last login before .+; 2 batches in [0-9.]+ s\)\.\n$",
+        )
+        self.assertEqual(User.objects.filter(is_active=False).count(), 4)
@@ -0,0 +1,111 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from fd_dj_accounts import diagnostics
+from fd_dj_accounts.models import User, get_or_create_system_user
+
+
+class DiagnosticsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+
+    def test_get_canonical_queries(self) -> None:
+        queries = diagnostics.get_canonical_queries()
+
+        self.assertEqual(
+            list(queries),
+            [
+                'login',
+                'get_user',
+                'admin_changelist',
+                'created_by',
+                'created_by_descendants',
+                'duplicate_users',
+            ],
+        )
+        self.assertEqual(list(queries['login']), [self.system_user])
+        self.assertEqual(list(queries['get_user']), [self.system_user])
+        self.assertEqual(list(queries['admin_changelist']), [])
+        for queryset in queries.values():
+            self.assertTrue(diagnostics.explain_query(queryset, analyze=True))
+
+    def test_find_sequential_scans(self) -> None:
+        self.assertEqual(
+            diagnostics.find_sequential_scans(
+                'Limit  (cost=0.00..1.02 rows=1 width=8)\n'
+                '  ->  Seq Scan on fd_dj_accounts_user  (cost=0.00..1.02 rows=1 width=8)\n'
+                '        Filter: is_staff',
+                'postgresql',
+            ),
+            ['fd_dj_accounts_user'],
+        )
+        self.assertEqual(
+            diagnostics.find_sequential_scans(
+                '2 0 0 SCAN fd_dj_accounts_user\n'
+                '3 0 0 SCAN other USING INDEX other_idx\n'
+                '4 0 0 SCAN TABLE another',
+                'sqlite',
+            ),
+            ['another', 'fd_dj_accounts_user'],
+        )
+        self.assertEqual(diagnostics.find_sequential_scans('Seq Scan on user', 'other'), [])
+
+    def test_get_missing_indexes(self) -> None:
+        self.assertEqual(diagnostics.get_missing_indexes(), [])
+
+        with mock.patch.object(connection.introspection, 'get_constraints', return_value={}):
+            missing_indexes = diagnostics.get_missing_indexes()
+        self.assertIn('fd_dj_acc_user_last_login_idx', missing_indexes)
+        self.assertIn('email_address (email_address)', missing_indexes)
+        self.assertIn('created_by (created_by_id)', missing_indexes)
+
+    def test_get_table_stats(self) -> None:
+        if connection.vendor == 'postgresql':
+            table_stats = diagnostics.get_table_stats()
+            assert table_stats is not None
+            self.assertGreater(table_stats.indexes_size, 0)
+        else:
+            self.assertIsNone(diagnostics.get_table_stats())
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command('accounts_diagnostics', '--query', 'login', stdout=stdout)
+
+        output = stdout.getvalue()
+        self.assertTrue(output.startswith("Query 'login':\n"))
+        self.assertIn("Missing indexes: none.\n", output)
+        self.assertNotIn("Query 'get_user':", output)
+
+        with self.assertRaisesMessage(CommandError, "Unknown queries: unknown."):
+            call_command('accounts_diagnostics', '--query', 'unknown', stdout=stdout)
+
+    def test_command_check_informational_queries(self) -> None:
+        stdout = io.StringIO()
+        with mock.patch(
+            'fd_dj_accounts.management.commands.accounts_diagnostics.find_sequential_scans',
+            return_value=[User._meta.db_table],
+        ):
+            call_command(
+                'accounts_diagnostics', '--check', '--query', 'admin_changelist', stdout=stdout,
+            )
+            with self.assertRaisesMessage(CommandError, "Query plan diagnostics failed."):
+                call_command('accounts_diagnostics', '--check', '--query', 'login', stdout=stdout)
+
+        self.assertIn("(Informational query: sequential scans are expected.)", stdout.getvalue())
+
+    def test_command_check(self) -> None:
+        stdout = io.StringIO()
+        with mock.patch(
+            'fd_dj_accounts.management.commands.accounts_diagnostics.get_missing_indexes',
+            return_value=['some_idx'],
+        ):
+            call_command('accounts_diagnostics', stdout=stdout)
+            with self.assertRaisesMessage(CommandError, "Query plan diagnostics failed."):
+                call_command('accounts_diagnostics', '--check', stdout=stdout)
+        self.assertIn("Missing indexes: some_idx.\n", stdout.getvalue())
@@ -0,0 +1,136 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from fd_dj_accounts import email_availability
+from fd_dj_accounts.email_availability import BloomFilter
+from fd_dj_accounts.models import User, get_or_create_system_user
+
+
+class BloomFilterTestCase(TestCase):
+
+    def test_no_false_negatives(self) -> None:
+        bloom_filter = BloomFilter(1000, 0.01)
+        items = [f'user-{i}@example.com' for i in range(1000)]
+        for item in items:
+            bloom_filter.add(item)
+
+        self.assertTrue(all(item in bloom_filter for item in items))
+        self.assertEqual(bloom_filter.count, 1000)
+
+    def test_false_positive_rate(self) -> None:
+        bloom_filter = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom_filter.add(f'user-{i}@example.com')
+
+        false_positive_count = sum(
+            f'other-{i}@example.com' in bloom_filter for i in range(10000)
+        )
+        self.assertLess(false_positive_count, 300)
+
+    def test_invalid_arguments(self) -> None:
+        with self.assertRaises(ValueError):
+            BloomFilter(0, 0.01)
+        with self.assertRaises(ValueError):
+            BloomFilter(1000, 1)
+
+
+@override_settings(APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_ENABLED=True)
+class EmailAvailabilityTestCase(TestCase):
+
+    def setUp(self) -> None:
+        email_availability.clear_filter()
+        self.addCleanup(email_availability.clear_filter)
+        self.user = User.objects.create_user('foo@example.com')
+
+    def test_is_email_address_available(self) -> None:
+        email_availability.get_filter()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(email_availability.is_email_address_available('bar@example.com'))
+        with self.assertNumQueries(1):
+            self.assertFalse(email_availability.is_email_address_available('Foo@example.com'))
+
+    @override_settings(APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_ENABLED=False)
+    def test_disabled(self) -> None:
+        with self.assertNumQueries(1):
+            self.assertTrue(email_availability.is_email_address_available('bar@example.com'))
+        with self.assertNumQueries(1):
+            self.assertFalse(email_availability.is_email_address_available('foo@example.com'))
+
+    def test_build_filter_computes_missing_canonical_email_addresses(self) -> None:
+        User._base_manager.filter(pk=self.user.pk).update(canonical_email_address=None)
+
+        self.assertIn('foo@example.com', email_availability.build_filter(chunk_size=1))
+
+    def test_missing_canonical_email_address_is_not_available(self) -> None:
+        User._base_manager.filter(pk=self.user.pk).update(canonical_email_address=None)
+
+        for enabled in (True, False):
+            with self.settings(APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_ENABLED=enabled):
+                email_availability.clear_filter()
+                self.assertFalse(email_availability.is_email_address_available('foo@example.com'))
+                self.assertFalse(email_availability.is_email_address_available('FOO@example.com'))
+
+    def test_filter_updated_on_writes(self) -> None:
+        bloom_filter = email_availability.get_filter()
+
+        User.objects.create_user('bar@example.com')
+        User.objects.bulk_create([
+            User(email_address='baz@example.com', created_by=get_or_create_system_user()),
+        ])
+        User.objects.filter(pk=self.user.pk).update(email_address='qux@example.com')
+
+        self.assertIs(email_availability.get_filter(), bloom_filter)
+        for email_address in ('bar@example.com', 'baz@example.com', 'qux@example.com'):
+            self.assertIn(email_address, bloom_filter)
+            self.assertFalse(email_availability.is_email_address_available(email_address))
+
+    def test_filter_rebuilt_when_stale(self) -> None:
+        bloom_filter = email_availability.get_filter()
+        self.assertIs(email_availability.get_filter(), bloom_filter)
+
+        with override_settings(APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_MAX_AGE=0):
+            self.assertIsNot(email_availability.get_filter(), bloom_filter)
+
+    def test_stale_filter_used_while_rebuilt(self) -> None:
+        bloom_filter = email_availability.get_filter()
+
+        # Another thread is rebuilding the filter.
+        with email_availability._filter_lock, override_settings(
+            APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_MAX_AGE=0,
+        ):
+            with self.assertNumQueries(0):
+                self.assertIs(email_availability.get_filter(), bloom_filter)
+                self.assertTrue(email_availability.is_email_address_available('bar@example.com'))
+
+
+@override_settings(APP_ACCOUNTS_EMAIL_AVAILABILITY_FILTER_ENABLED=True)
+class EmailAddressAvailabilityViewTestCase(TestCase):
+
+    url = reverse('fd_dj_accounts:email_address_availability')
+
+    def setUp(self) -> None:
+        email_availability.clear_filter()
+        self.addCleanup(email_availability.clear_filter)
+        User.objects.create_user('foo@example.com')
+
+    def test_get(self) -> None:
+        response = self.client.get(self.url, {'email_address': 'bar@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), {'email_address': 'bar@example.com', 'available': True},
+        )
+
+        response = self.client.get(self.url, {'email_address': 'foo@example.com'})
+        self.assertEqual(response.json()['available'], False)
+
+    def test_get_invalid_email_address(self) -> None:
+        response = self.client.get(self.url, {'email_address': 'foo'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_post_not_allowed(self) -> None:
+        response = self.client.post(self.url, {'email_address': 'bar@example.com'})
+
+        self.assertEqual(response.status_code, 405)
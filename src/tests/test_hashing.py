@@ -0,0 +1,161 @@
+import threading
+from typing import Any, List
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from fd_dj_accounts import hashing
+from fd_dj_accounts.auth_backends import AuthUserModelAuthBackend
+from fd_dj_accounts.models import User
+from fd_dj_accounts.signals import password_hashing_rejected
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 2
+
+
+class UpgradedFastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 3
+
+
+class HashingExecutorTestCase(SimpleTestCase):
+
+    def setUp(self) -> None:
+        self.executor = hashing.HashingExecutor(max_concurrency=1, queue_timeout=0.01)
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.addCleanup(self.executor.shutdown)
+
+    def _block(self) -> str:
+        self.started.set()
+        self.release.wait(5)
+        return 'blocked'
+
+    def _saturate(self) -> threading.Thread:
+        thread = threading.Thread(target=self.executor.run, args=(self._block,))
+        thread.start()
+        self.started.wait(5)
+        self.addCleanup(thread.join)
+        self.addCleanup(self.release.set)
+        return thread
+
+    def test_run(self) -> None:
+        self.assertEqual(self.executor.run(str.upper, 'a'), 'A')
+
+    def test_run_capacity_exceeded(self) -> None:
+        rejections: List[Any] = []
+
+        def receiver(**kwargs: Any) -> None:
+            rejections.append(kwargs)
+
+        password_hashing_rejected.connect(receiver)
+        self.addCleanup(password_hashing_rejected.disconnect, receiver)
+        self._saturate()
+
+        with self.assertRaises(hashing.HashingCapacityExceeded) as cm:
+            self.executor.run(str.upper, 'a')
+        self.assertEqual(cm.exception.max_concurrency, 1)
+        self.assertEqual(len(rejections), 1)
+        self.assertEqual(rejections[0]['queue_timeout'], 0.01)
+
+        self.release.set()
+        self.assertEqual(self.executor.run(str.upper, 'a'), 'A')
+
+    def test_run_started_function_is_not_cancelled(self) -> None:
+        self.executor.queue_timeout = 0
+        self.release.set()
+
+        self.assertEqual(self.executor.run(self._block), 'blocked')
+
+    def test_arun(self) -> None:
+        self.assertEqual(async_to_sync(self.executor.arun)(str.upper, 'a'), 'A')
+
+    def test_arun_capacity_exceeded(self) -> None:
+        self._saturate()
+
+        with self.assertRaises(hashing.HashingCapacityExceeded):
+            async_to_sync(self.executor.arun)(str.upper, 'a')
+
+    def test_invalid_max_concurrency(self) -> None:
+        with self.assertRaisesMessage(ValueError, 'max_concurrency must be a positive integer.'):
+            hashing.HashingExecutor(max_concurrency=0, queue_timeout=1)
+
+
+@override_settings(
+    APP_ACCOUNTS_PASSWORD_HASHING_LIMIT_ENABLED=True,
+    APP_ACCOUNTS_PASSWORD_HASHING_MAX_CONCURRENCY=2,
+    PASSWORD_HASHERS=['tests.test_hashing.FastPBKDF2PasswordHasher'],
+)
+class BoundedHashingAuthenticationTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user('user@example.com', 'test')
+        self.backend = AuthUserModelAuthBackend()
+
+    def test_get_executor(self) -> None:
+        executor = hashing.get_executor()
+
+        self.assertEqual(executor.max_concurrency, 2)
+        self.assertEqual(executor.queue_timeout, 1)
+        self.assertIs(hashing.get_executor(), executor)
+        with self.settings(APP_ACCOUNTS_PASSWORD_HASHING_QUEUE_TIMEOUT=0.5):
+            self.assertIsNot(hashing.get_executor(), executor)
+            self.assertEqual(hashing.get_executor().queue_timeout, 0.5)
+
+    def test_authenticate(self) -> None:
+        self.assertEqual(
+            authenticate(None, username='user@example.com', password='test'), self.user,
+        )
+        self.assertIsNone(authenticate(None, username='user@example.com', password='wrong'))
+        self.assertIsNone(authenticate(None, username='other@example.com', password='test'))
+
+    def test_authenticate_capacity_exceeded(self) -> None:
+        exception = hashing.HashingCapacityExceeded(max_concurrency=2, queue_timeout=1)
+
+        with mock.patch.object(hashing.HashingExecutor, 'run', side_effect=exception):
+            with self.assertRaises(hashing.HashingCapacityExceeded):
+                authenticate(None, username='user@example.com', password='test')
+
+    def test_authenticate_inactive_user(self) -> None:
+        self.user.deactivate()
+
+        self.assertIsNone(
+            self.backend.authenticate(None, username='user@example.com', password='test'),
+        )
+
+    @override_settings(PASSWORD_HASHERS=['tests.test_hashing.UpgradedFastPBKDF2PasswordHasher'])
+    def test_authenticate_outdated_password_hash(self) -> None:
+        self.assertTrue(hashing.must_update(self.user.password))
+
+        user = self.backend.authenticate(None, username='user@example.com', password='test')
+
+        self.assertEqual(user, self.user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$3$'))
+        self.assertFalse(hashing.must_update(self.user.password))
+
+    def test_aauthenticate(self) -> None:
+        aauthenticate = async_to_sync(self.backend.aauthenticate)
+
+        self.assertEqual(
+            aauthenticate(None, username='user@example.com', password='test'), self.user,
+        )
+        self.assertIsNone(aauthenticate(None, username='user@example.com', password='wrong'))
+        self.assertIsNone(aauthenticate(None, username='other@example.com', password='test'))
+        self.assertIsNone(aauthenticate(None, username='user@example.com'))
+
+    @override_settings(APP_ACCOUNTS_PASSWORD_HASHING_LIMIT_ENABLED=False)
+    def test_aauthenticate_disabled(self) -> None:
+        aauthenticate = async_to_sync(self.backend.aauthenticate)
+
+        self.assertEqual(
+            aauthenticate(None, username='user@example.com', password='test'), self.user,
+        )
+
+    def test_must_update(self) -> None:
+        self.assertFalse(hashing.must_update(self.user.password))
+        self.assertFalse(hashing.must_update('!unusable'))
+        self.assertFalse(hashing.must_update('unknown$hash'))
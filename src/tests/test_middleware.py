@@ -0,0 +1,52 @@
+from django.contrib.auth.models import AnonymousUser as DjangoAnonymousUser
+from django.http import HttpRequest, HttpResponse
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+
+from fd_dj_accounts.middleware import ApiTokenMiddleware
+from fd_dj_accounts.models import ApiToken, User
+
+
+@override_settings(
+    AUTHENTICATION_BACKENDS=[
+        'fd_dj_accounts.auth_backends.AuthUserModelAuthBackend',
+        'fd_dj_accounts.auth_backends.ApiTokenAuthBackend',
+    ],
+)
+class ApiTokenMiddlewareTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email_address='user@example.com')
+        self.token, self.raw_token = ApiToken.objects.create_token(self.user)
+        self.middleware = ApiTokenMiddleware(self.get_response)
+
+    def get_response(self, request: HttpRequest) -> HttpResponse:
+        return HttpResponse(str(request.user))
+
+    def _get_request(self, **headers: str) -> HttpRequest:
+        request = RequestFactory().get('/', headers=headers)
+        request.user = DjangoAnonymousUser()
+        return request
+
+    def test_valid_token(self) -> None:
+        for keyword in ApiTokenMiddleware.keywords:
+            request = self._get_request(Authorization=f'{keyword} {self.raw_token}')
+            response = self.middleware(request)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(request.user, self.user)
+
+    def test_invalid_token(self) -> None:
+        request = self._get_request(Authorization=f'Token {self.raw_token}x')
+        response = self.middleware(request)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_no_token(self) -> None:
+        for headers in [{}, {'Authorization': 'Basic abc'}, {'Authorization': 'Token '}]:
+            request = self._get_request(**headers)
+            response = self.middleware(request)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(request.user.is_anonymous)
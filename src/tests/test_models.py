@@ -1,8 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import threading
+from typing import Tuple
+from unittest import mock
 from uuid import UUID
 
-from django.test import SimpleTestCase, TestCase
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 
-from fd_dj_accounts.models import AnonymousUser, User, UserManager, get_or_create_system_user
+from fd_dj_accounts.models import (
+    AnonymousUser, ApiToken, User, UserManager, UserVersionConflict, get_or_create_system_user,
+)
 
 
 class FunctionsTestCase(TestCase):
@@ -19,6 +29,66 @@ class FunctionsTestCase(TestCase):
         self.assertEqual(system_user.email_address, system_user_email_address)
         self.assertEqual(get_or_create_system_user(), system_user)
 
+    def test_get_or_create_system_user_queries(self):  # type: ignore
+        # Create: lookup, conflict-ignoring insert.
+        with self.assertNumQueries(2):
+            system_user = get_or_create_system_user()
+        # Get: lookup.
+        with self.assertNumQueries(1):
+            self.assertEqual(get_or_create_system_user(), system_user)
+
+        system_user.refresh_from_db()
+        self.assertTrue(system_user.is_active)
+        self.assertTrue(system_user.is_staff)
+        self.assertTrue(system_user.is_superuser)
+        self.assertFalse(system_user.has_usable_password())
+
+    def test_get_or_create_system_user_using(self):  # type: ignore
+        system_user = get_or_create_system_user(using='default')
+        self.assertEqual(system_user._state.db, 'default')
+        self.assertEqual(get_or_create_system_user(using='default'), system_user)
+
+
+class ConcurrentFunctionsTestCase(TransactionTestCase):
+
+    def test_get_or_create_system_user_concurrent(self):  # type: ignore
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def worker() -> User:
+            try:
+                barrier.wait()
+                return get_or_create_system_user()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker) for _ in range(workers)]
+            system_users = [future.result() for future in futures]
+
+        self.assertEqual(len({system_user.pk for system_user in system_users}), 1)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_get_or_create_user_concurrent(self):  # type: ignore
+        get_or_create_system_user()
+        workers = 8
+        barrier = threading.Barrier(workers)
+
+        def worker() -> Tuple[User, bool]:
+            try:
+                barrier.wait()
+                return User.objects.get_or_create_user('user@example.com')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker) for _ in range(workers)]
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len({user.pk for user, _ in results}), 1)
+        self.assertEqual([created for _, created in results].count(True), 1)
+        self.assertEqual(User.objects.filter(email_address='user@example.com').count(), 1)
+
 
 class NaturalKeysTestCase(TestCase):
 
@@ -53,6 +123,78 @@ class UserManagerTestCase(TestCase):
         self.assertEqual(user2.username, user2_email_address)
         self.assertFalse(user2.has_usable_password())
 
+    def test_get_or_create_user(self):  # type: ignore
+        system_user = get_or_create_system_user()
+
+        # Lookup, system user lookup, conflict-ignoring insert, lookup.
+        with self.assertNumQueries(4):
+            user, created = User.objects.get_or_create_user(
+                'user@EXAMPLE.com', defaults={'is_staff': True, 'password': 'test'},
+            )
+        self.assertTrue(created)
+        self.assertEqual(user.email_address, 'user@example.com')
+        self.assertTrue(user.is_staff)
+        self.assertFalse(user.is_superuser)
+        self.assertEqual(user.created_by, system_user)
+        self.assertTrue(user.check_password('test'))
+
+        # The existing user is fetched, and the password is not hashed.
+        with self.assertNumQueries(1), mock.patch.object(User, 'set_password') as set_password:
+            user2, created = User.objects.get_or_create_user(
+                'user@example.com', defaults={'is_superuser': True, 'password': 'other'},
+            )
+        set_password.assert_not_called()
+        self.assertFalse(created)
+        self.assertEqual(user2, user)
+        self.assertFalse(user2.is_superuser)
+
+    def test_get_or_create_user_created_by(self):  # type: ignore
+        creator = User.objects.create_user('creator@example.com')
+        user, created = User.objects.get_or_create_user(
+            'user@example.com', defaults={'created_by': creator},
+        )
+        self.assertTrue(created)
+        self.assertEqual(user.created_by, creator)
+        self.assertFalse(user.has_usable_password())
+
+    def test_get_or_create_user_invalid(self):  # type: ignore
+        with self.assertRaisesMessage(ValueError, 'The given email address must be set'):
+            User.objects.get_or_create_user('')
+        with self.assertRaises(ValidationError):
+            User.objects.get_or_create_user('not-an-email-address')
+
+    def test_get_many_by_email(self):  # type: ignore
+        user1 = User.objects.create_user('user1@example.com')
+        user2 = User.objects.create_user('user2@example.com')
+
+        with self.assertNumQueries(2):
+            users, missing = User.objects.get_many_by_email(
+                [
+                    'user1@example.com',
+                    'user2@EXAMPLE.com',
+                    'missing@example.com',
+                    'user1@example.com',
+                    'USER1@example.com',
+                ],
+                chunk_size=2,
+            )
+
+        self.assertEqual(
+            users,
+            {
+                'user1@example.com': user1,
+                'user2@EXAMPLE.com': user2,
+            },
+        )
+        self.assertEqual(missing, ['missing@example.com', 'USER1@example.com'])
+
+    def test_get_many_by_email_empty(self):  # type: ignore
+        with self.assertNumQueries(0):
+            self.assertEqual(User.objects.get_many_by_email([]), ({}, []))
+
+        with self.assertRaisesMessage(ValueError, 'chunk_size must be a positive integer.'):
+            User.objects.get_many_by_email(['user@example.com'], chunk_size=0)
+
     def test_empty_username(self):  # type: ignore
         with self.assertRaisesMessage(ValueError, 'The given email address must be set'):
             User.objects.create_user(email_address='')
@@ -85,6 +227,66 @@ class UserManagerTestCase(TestCase):
             )
 
 
+class CreatorTreeTestCase(TestCase):
+
+    def setUp(self):  # type: ignore
+        self.system_user = get_or_create_system_user()
+        self.admin = User.objects.create_user('admin@example.com')
+        self.user_a = User.objects.create_user('a@example.com', created_by=self.admin)
+        self.user_b = User.objects.create_user('b@example.com', created_by=self.admin)
+        self.user_c = User.objects.create_user('c@example.com', created_by=self.user_a)
+        self.other = User.objects.create_user('other@example.com')
+
+    def _test_creator_tree(self) -> None:
+        self.assertCountEqual(
+            User.objects.created_by_descendants(self.admin),
+            [self.user_a, self.user_b, self.user_c],
+        )
+        self.assertCountEqual(
+            User.objects.created_by_descendants(self.admin, max_depth=1, include_self=True),
+            [self.admin, self.user_a, self.user_b],
+        )
+        self.assertCountEqual(
+            User.objects.created_by_descendants(self.system_user).filter(is_staff=False),
+            [self.admin, self.user_a, self.user_b, self.user_c, self.other],
+        )
+        self.assertCountEqual(User.objects.created_by_descendants(self.user_c), [])
+
+        self.assertCountEqual(
+            User.objects.created_by_ancestors(self.user_c),
+            [self.user_a, self.admin, self.system_user],
+        )
+        self.assertCountEqual(
+            User.objects.created_by_ancestors(self.system_user, include_self=True),
+            [self.system_user],
+        )
+
+        tree = User.objects.get_created_by_tree(self.admin)
+        self.assertEqual(tree, [self.admin, self.user_a, self.user_b, self.user_c])
+        self.assertEqual([user.created_by_depth for user in tree], [0, 1, 1, 2])
+        self.assertEqual([user.users_created_count for user in tree], [2, 1, 0, 0])
+
+        tree = User.objects.get_created_by_tree(self.system_user, max_depth=1)
+        self.assertEqual(tree, [self.system_user, self.admin, self.other])
+        self.assertEqual([user.users_created_count for user in tree], [2, 2, 0])
+
+    def test_creator_tree(self):  # type: ignore
+        self._test_creator_tree()
+
+        with self.assertNumQueries(1):
+            User.objects.get_created_by_tree(self.system_user)
+        with self.assertNumQueries(1):
+            list(User.objects.created_by_descendants(self.system_user))
+
+    def test_creator_tree_without_recursive_cte(self):  # type: ignore
+        with mock.patch('fd_dj_accounts.models._supports_recursive_cte', return_value=False):
+            self._test_creator_tree()
+
+    def test_creator_tree_invalid_max_depth(self):  # type: ignore
+        with self.assertRaisesMessage(ValueError, 'max_depth must be a non-negative integer.'):
+            User.objects.created_by_descendants(self.admin, max_depth=-1)
+
+
 class UserTestCase(TestCase):
 
     def test_repr(self) -> None:
@@ -210,6 +412,68 @@ class UserTestCase(TestCase):
         self.assertTrue(callable(user.has_perms))
 
 
+class UserVersionTestCase(TestCase):
+
+    def setUp(self):  # type: ignore
+        self.user = User.objects.create_user('user@example.com')
+
+    def test_version(self):  # type: ignore
+        self.assertEqual(self.user.version, 1)
+        self.assertEqual(self.user.cache_key, f'fd_dj_accounts:user:{self.user.pk}:1')
+
+        # Validation (2 queries) and update.
+        self.user.is_staff = True
+        with self.assertNumQueries(3):
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.user.version, 2)
+
+        # The version is not deferred, so the next save does not fetch it.
+        with self.assertNumQueries(3):
+            self.user.save(update_fields=['is_staff'])
+        self.assertEqual(self.user.version, 3)
+        self.assertEqual(User.objects.get(pk=self.user.pk).version, 3)
+
+        self.assertEqual(User.objects.filter(pk=self.user.pk).deactivate(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.version, 4)
+        self.assertEqual(self.user.cache_key, f'fd_dj_accounts:user:{self.user.pk}:4')
+
+    def test_without_version_check(self):  # type: ignore
+        stale_user = User.objects.get(pk=self.user.pk)
+        self.user.deactivate()
+
+        stale_user.is_staff = True
+        stale_user.save()
+        self.assertEqual(stale_user.version, 3)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertEqual(self.user.version, 3)
+
+    @override_settings(APP_ACCOUNTS_USER_VERSION_CHECK_ENABLED=True)
+    def test_version_check(self):  # type: ignore
+        stale_user = User.objects.get(pk=self.user.pk)
+        self.user.deactivate()
+        self.assertEqual(self.user.version, 2)
+
+        stale_user.is_staff = True
+        with self.assertRaises(UserVersionConflict), transaction.atomic():
+            stale_user.save()
+        with self.assertRaises(UserVersionConflict), transaction.atomic():
+            stale_user.deactivate()
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_staff)
+        self.assertEqual(self.user.version, 2)
+
+        stale_user.refresh_from_db()
+        stale_user.is_staff = True
+        stale_user.save()
+        self.assertEqual(stale_user.version, 3)
+        self.assertEqual(User.objects.get(pk=self.user.pk).version, 3)
+
+
 class IsActiveTestCase(TestCase):
     """
     Tests the behavior of the guaranteed is_active attribute
@@ -305,3 +569,54 @@ class AnonymousUserTests(SimpleTestCase):
 
         self.assertTrue(hasattr(user, 'has_perms'))
         self.assertTrue(callable(user.has_perms))
+
+
+class ApiTokenTestCase(TestCase):
+
+    def setUp(self):  # type: ignore
+        self.user = User.objects.create_user(email_address='user@example.com')
+
+    def test_create_token(self) -> None:
+        token, raw_token = ApiToken.objects.create_token(self.user, name='CI')
+
+        prefix, secret = raw_token.split('.')
+        self.assertEqual(token.prefix, prefix)
+        self.assertEqual(len(prefix), ApiToken.PREFIX_LENGTH)
+        self.assertNotIn(secret, token.digest)
+        self.assertEqual(token.digest, ApiToken.compute_digest(raw_token))
+        self.assertEqual(list(self.user.api_tokens.all()), [token])
+
+    def test_get_for_raw_token(self) -> None:
+        token, raw_token = ApiToken.objects.create_token(self.user)
+
+        with self.assertNumQueries(1):
+            found_token = ApiToken.objects.get_for_raw_token(raw_token)
+            self.assertEqual(found_token, token)
+            assert found_token is not None
+            self.assertEqual(found_token.user, self.user)
+
+    def test_get_for_raw_token_invalid(self) -> None:
+        token, raw_token = ApiToken.objects.create_token(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(ApiToken.objects.get_for_raw_token(''))
+            self.assertIsNone(ApiToken.objects.get_for_raw_token('no-separator'))
+            self.assertIsNone(ApiToken.objects.get_for_raw_token('short.secret'))
+        self.assertIsNone(ApiToken.objects.get_for_raw_token(raw_token + 'x'))
+        self.assertIsNone(ApiToken.objects.get_for_raw_token('0' * 12 + '.secret'))
+
+    def test_revoke(self) -> None:
+        token, raw_token = ApiToken.objects.create_token(self.user)
+        token.revoke()
+
+        token.refresh_from_db()
+        self.assertIsNotNone(token.revoked_at)
+        self.assertFalse(token.is_valid())
+        self.assertIsNone(ApiToken.objects.get_for_raw_token(raw_token))
+
+    def test_expired(self) -> None:
+        token, raw_token = ApiToken.objects.create_token(
+            self.user, expires_at=timezone.now() - datetime.timedelta(seconds=1),
+        )
+        self.assertFalse(token.is_valid())
+        self.assertIsNone(ApiToken.objects.get_for_raw_token(raw_token))
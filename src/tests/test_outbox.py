@@ -0,0 +1,151 @@
+import io
+from typing import Any, List
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+
+from fd_dj_accounts import outbox
+from fd_dj_accounts.models import User, UserEvent, get_or_create_system_user
+
+
+delivered_events: List[Any] = []
+
+
+def list_sink(events: List[Any]) -> None:
+    delivered_events.extend((event.event_type, event.user_id, event.payload) for event in events)
+
+
+def failing_sink(events: List[Any]) -> None:
+    raise RuntimeError("Sink is unavailable.")
+
+
+def disconnecting_sink(events: List[Any]) -> None:
+    # E.g. the session was terminated because of 'idle_in_transaction_session_timeout'.
+    raise OperationalError("terminating connection due to idle-in-transaction timeout")
+
+
+@override_settings(APP_ACCOUNTS_OUTBOX_ENABLED=True)
+class OutboxTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+        UserEvent.objects.all().delete()
+        delivered_events.clear()
+
+    def _get_events(self) -> List[Any]:
+        return list(
+            UserEvent.objects.order_by('id').values_list('event_type', 'user_id', 'payload'),
+        )
+
+    def test_record_events_on_save(self) -> None:
+        user = User.objects.create_user('user@example.com')
+        user.is_staff = True
+        user.save()
+        user.save()
+        user.deactivate()
+
+        self.assertEqual(
+            self._get_events(),
+            [
+                (
+                    outbox.USER_CREATED,
+                    user.pk,
+                    {
+                        'email_address': 'user@example.com',
+                        'is_active': True,
+                        'is_staff': False,
+                        'is_superuser': False,
+                    },
+                ),
+                (outbox.USER_FLAGS_CHANGED, user.pk, {'is_staff': True}),
+                (outbox.USER_DEACTIVATED, user.pk, {}),
+            ],
+        )
+
+    def test_record_events_on_bulk_writes(self) -> None:
+        user_a = User(email_address='a@example.com', created_by=self.system_user)
+        user_b = User(email_address='b@example.com', created_by=self.system_user, is_staff=True)
+        User.objects.bulk_create([user_a, user_b])
+        User.objects.get_or_create_user('a@example.com')
+        UserEvent.objects.all().delete()
+
+        User.objects.filter(pk__in=[user_a.pk, user_b.pk]).update(is_staff=True)
+        User.objects.filter(pk__in=[user_a.pk, user_b.pk]).deactivate()
+
+        self.assertCountEqual(
+            self._get_events(),
+            [
+                (outbox.USER_FLAGS_CHANGED, user_a.pk, {'is_staff': True}),
+                (outbox.USER_DEACTIVATED, user_a.pk, {}),
+                (outbox.USER_DEACTIVATED, user_b.pk, {}),
+            ],
+        )
+
+    @override_settings(APP_ACCOUNTS_OUTBOX_ENABLED=False)
+    def test_disabled(self) -> None:
+        User.objects.create_user('user@example.com').deactivate()
+
+        self.assertEqual(self._get_events(), [])
+
+    def test_relay_events(self) -> None:
+        users = [User.objects.create_user(f'user{i}@example.com') for i in range(3)]
+
+        self.assertEqual(list(outbox.relay_events(list_sink, batch_size=2)), [2, 1])
+        self.assertEqual(
+            [(event_type, user_id) for event_type, user_id, _ in delivered_events],
+            [(outbox.USER_CREATED, user.pk) for user in users],
+        )
+        self.assertFalse(UserEvent.objects.exists())
+
+    def test_relay_events_failing_sink(self) -> None:
+        User.objects.create_user('user@example.com')
+
+        with self.assertRaisesMessage(RuntimeError, "Sink is unavailable."):
+            list(outbox.relay_events(failing_sink))
+        # The events are delivered later.
+        self.assertEqual(UserEvent.objects.count(), 1)
+
+    def test_relay_events_connection_lost(self) -> None:
+        User.objects.create_user('user@example.com')
+
+        with mock.patch.object(connection, 'close') as close_mock:
+            with self.assertRaises(OperationalError):
+                list(outbox.relay_events(disconnecting_sink))
+            close_mock.assert_called_once_with()
+
+            with self.assertRaisesMessage(CommandError, "Database error after relaying 0 events"):
+                call_command(
+                    'relay_user_events', '--sink', 'tests.test_outbox.disconnecting_sink',
+                    stdout=io.StringIO(),
+                )
+        # The events are delivered later.
+        self.assertEqual(UserEvent.objects.count(), 1)
+
+    def test_relay_events_slow_sink(self) -> None:
+        User.objects.create_user('user@example.com')
+
+        with mock.patch.object(outbox.time, 'monotonic', side_effect=[0.0, 2.0]):
+            with self.assertLogs('fd_dj_accounts.outbox', 'WARNING') as logs:
+                self.assertEqual(list(outbox.relay_events(list_sink, sink_timeout=1)), [1])
+
+        self.assertIn("took 2.0 s (sink timeout: 1 s)", logs.output[0])
+        self.assertFalse(UserEvent.objects.exists())
+
+    def test_relay_events_invalid_sink_timeout(self) -> None:
+        with self.assertRaises(ValueError):
+            list(outbox.relay_events(list_sink, sink_timeout=0))
+
+    def test_command(self) -> None:
+        User.objects.create_user('user@example.com')
+
+        stdout = io.StringIO()
+        with self.assertLogs('fd_dj_accounts.outbox', 'INFO'):
+            call_command('relay_user_events', stdout=stdout)
+
+        self.assertRegex(stdout.getvalue(), r"^Relayed events: 1 \([0-9.]+ events/s\)\.\n$")
+        self.assertFalse(UserEvent.objects.exists())
+
+        call_command('relay_user_events', '--sink', 'tests.test_outbox.list_sink', stdout=stdout)
+        self.assertEqual(delivered_events, [])
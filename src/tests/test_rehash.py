@@ -0,0 +1,153 @@
+from typing import Any, List
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from fd_dj_accounts import rehash
+from fd_dj_accounts.models import User
+
+
+enqueued_tasks: List[Any] = []
+task_results: List[Any] = []
+
+
+def enqueue(task: Any) -> None:
+    enqueued_tasks.append(task)
+
+
+def run(task: Any) -> None:
+    task_results.append(task())
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 2
+
+
+class UpgradedFastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 3
+
+
+@override_settings(
+    APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENABLED=True,
+    APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENQUEUE='tests.test_rehash.enqueue',
+    PASSWORD_HASHERS=['tests.test_rehash.UpgradedFastPBKDF2PasswordHasher'],
+)
+class DeferredPasswordRehashTestCase(TestCase):
+
+    def setUp(self) -> None:
+        enqueued_tasks.clear()
+        task_results.clear()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with self.settings(PASSWORD_HASHERS=['tests.test_rehash.FastPBKDF2PasswordHasher']):
+            self.user = User.objects.create_user('user@example.com', 'test')
+        self.old_password_hash = self.user.password
+
+    def test_check_password(self) -> None:
+        version = User.objects.get(pk=self.user.pk).version
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.user.check_password('test'))
+        self.assertEqual(self.user.password, self.old_password_hash)
+        self.assertEqual(len(enqueued_tasks), 1)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(enqueued_tasks[0]())
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$3$'))
+        # The version is not incremented (see 'test_login_with_version_check').
+        self.assertEqual(user.version, version)
+        self.assertTrue(user.check_password('test'))
+        self.assertEqual(len(enqueued_tasks), 1)
+
+    def test_check_password_incorrect(self) -> None:
+        self.assertFalse(self.user.check_password('wrong'))
+        self.assertEqual(enqueued_tasks, [])
+
+    def test_check_password_current_hash(self) -> None:
+        self.user.set_password('test')
+        self.user.save()
+
+        self.assertTrue(self.user.check_password('test'))
+        self.assertEqual(enqueued_tasks, [])
+
+    def test_password_changed_before_rehash(self) -> None:
+        self.assertTrue(self.user.check_password('test'))
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new')
+        user.save()
+
+        self.assertFalse(enqueued_tasks[0]())
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password('new'))
+
+    def _get_request_user(self, client: Client) -> Any:
+        response = client.get(reverse('fd_dj_accounts:email_address_availability'))
+        return response.wsgi_request.user
+
+    def test_session_login(self) -> None:
+        client = Client()
+        self.assertTrue(client.login(username='user@example.com', password='test'))
+        self.assertEqual(len(enqueued_tasks), 1)
+
+        self.assertTrue(enqueued_tasks[0]())
+
+        # The session authenticated with the old password hash is still valid.
+        user = self._get_request_user(client)
+        self.assertTrue(user.is_authenticated)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$3$'))
+
+    def test_session_login_password_changed_after_rehash(self) -> None:
+        client = Client()
+        self.assertTrue(client.login(username='user@example.com', password='test'))
+        self.assertTrue(enqueued_tasks[0]())
+
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('new')
+        user.save()
+
+        self.assertFalse(self._get_request_user(client).is_authenticated)
+
+    @override_settings(
+        APP_ACCOUNTS_USER_VERSION_CHECK_ENABLED=True,
+        APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENQUEUE='tests.test_rehash.run',
+    )
+    def test_login_with_version_check(self) -> None:
+        # note: the rehash runs before 'login()' saves the user (see 'update_last_login').
+        client = Client()
+        self.assertTrue(client.login(username='user@example.com', password='test'))
+        self.assertEqual(task_results, [True])
+
+        user = User.objects.get(pk=self.user.pk)
+        self.assertIsNotNone(user.last_login)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$3$'))
+        self.assertTrue(self._get_request_user(client).is_authenticated)
+
+    def test_authenticate(self) -> None:
+        user = authenticate(None, username='user@example.com', password='test')
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(enqueued_tasks), 1)
+
+    @override_settings(APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENABLED=False)
+    def test_disabled(self) -> None:
+        self.assertTrue(self.user.check_password('test'))
+
+        self.assertEqual(enqueued_tasks, [])
+        self.assertTrue(User.objects.get(pk=self.user.pk).password.startswith('pbkdf2_sha256$3$'))
+
+    @override_settings(
+        APP_ACCOUNTS_DEFERRED_PASSWORD_REHASH_ENQUEUE='fd_dj_accounts.rehash.thread_pool_enqueue',
+    )
+    def test_thread_pool_enqueue(self) -> None:
+        calls: List[Any] = []
+        rehash.get_enqueue()(lambda: calls.append(None))
+        with self.assertLogs('fd_dj_accounts.rehash', 'ERROR'):
+            rehash.get_enqueue()(lambda: 1 / 0)
+            assert rehash._executor is not None
+            rehash._executor.submit(lambda: None).result()
+
+        self.assertEqual(calls, [None])
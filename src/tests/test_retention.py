@@ -0,0 +1,144 @@
+import datetime
+import io
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from fd_dj_accounts.models import ApiToken, User, get_or_create_system_user
+from fd_dj_accounts.retention import anonymize_deactivated_users, purge_deactivated_users
+
+
+class PurgeDeactivatedUsersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+        self.now = timezone.now()
+        long_ago = self.now - datetime.timedelta(days=100)
+
+        self.old_users = []
+        for i in range(5):
+            user = User.objects.create_user(f'old{i}@example.com')
+            user.deactivate()
+            User.objects.filter(pk=user.pk).update(deactivated_at=long_ago)
+            self.old_users.append(user)
+
+        self.recent_user = User.objects.create_user('recent@example.com')
+        self.recent_user.deactivate()
+        self.active_user = User.objects.create_user('active@example.com')
+        # Users created by users to purge are reassigned to the system user.
+        self.created_user = User.objects.create_user(
+            'created@example.com', created_by=self.old_users[0],
+        )
+        self.nested_user = User.objects.create_user(
+            'nested@example.com', created_by=self.old_users[1],
+        )
+        User.objects.filter(pk=self.old_users[1].pk).update(created_by=self.old_users[2])
+        ApiToken.objects.create_token(self.old_users[3])
+
+    def test_purge_deactivated_users(self) -> None:
+        counts = list(purge_deactivated_users(
+            self.now - datetime.timedelta(days=30), chunk_size=2,
+        ))
+
+        self.assertEqual(counts, [2, 2, 1])
+        self.assertCountEqual(
+            User.objects.all(),
+            [
+                self.system_user, self.recent_user, self.active_user,
+                self.created_user, self.nested_user,
+            ],
+        )
+        self.assertFalse(ApiToken.objects.exists())
+        self.created_user.refresh_from_db()
+        self.assertEqual(self.created_user.created_by, self.system_user)
+        self.nested_user.refresh_from_db()
+        self.assertEqual(self.nested_user.created_by, self.system_user)
+
+    def test_system_user_is_not_purged(self) -> None:
+        User.objects.filter(pk=self.system_user.pk).update(
+            is_active=False, deactivated_at=self.now - datetime.timedelta(days=100),
+        )
+
+        self.assertEqual(sum(purge_deactivated_users(self.now)), 5)
+        self.assertTrue(User.objects.filter(pk=self.system_user.pk).exists())
+
+    def test_invalid_chunk_size(self) -> None:
+        with self.assertRaisesMessage(ValueError, 'chunk_size must be a positive integer.'):
+            list(purge_deactivated_users(self.now, chunk_size=0))
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command(
+            'purge_deactivated_users', '--older-than', '30', '--chunk-size', '3', stdout=stdout,
+        )
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("Deleted 3 users (3 in total, "))
+        self.assertTrue(lines[1].startswith("Deleted 2 users (5 in total, "))
+        self.assertEqual(lines[2], "Deleted users: 5.")
+        self.assertTrue(User.objects.filter(pk=self.recent_user.pk).exists())
+
+        with self.assertRaises(CommandError):
+            call_command('purge_deactivated_users', '--older-than', '-1', stdout=stdout)
+
+
+class AnonymizeDeactivatedUsersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+        self.now = timezone.now()
+
+        self.old_users = []
+        for i in range(3):
+            user = User.objects.create_user(f'old{i}@example.com', password='secret')
+            user.deactivate()
+            self.old_users.append(user)
+        User.objects.filter(pk__in=[user.pk for user in self.old_users]).update(
+            deactivated_at=self.now - datetime.timedelta(days=100),
+        )
+
+        self.recent_user = User.objects.create_user('recent@example.com')
+        self.recent_user.deactivate()
+        self.active_user = User.objects.create_user('active@example.com')
+
+    def test_anonymize_deactivated_users(self) -> None:
+        deactivated_before = self.now - datetime.timedelta(days=30)
+        counts = list(anonymize_deactivated_users(deactivated_before, chunk_size=2))
+        self.assertEqual(counts, [2, 1])
+
+        for user in self.old_users:
+            user.refresh_from_db()
+            # note: the format of the UUID depends on the database backend.
+            self.assertIn(
+                user.email_address,
+                [
+                    f'anonymized-{user.pk}@anonymized.invalid',
+                    f'anonymized-{user.pk.hex}@anonymized.invalid',
+                ],
+            )
+            self.assertFalse(user.has_usable_password())
+            self.assertIsNotNone(user.deactivated_at)
+            user.full_clean()
+
+        self.recent_user.refresh_from_db()
+        self.assertEqual(self.recent_user.email_address, 'recent@example.com')
+
+        # It is resumable (and idempotent).
+        self.assertEqual(list(anonymize_deactivated_users(deactivated_before)), [])
+
+    def test_queryset_anonymize(self) -> None:
+        self.assertEqual(User.objects.all().anonymize(), 4)
+        self.assertEqual(User.objects.all().anonymize(), 0)
+
+        self.active_user.refresh_from_db()
+        self.assertEqual(self.active_user.email_address, 'active@example.com')
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command('anonymize_deactivated_users', '--older-than', '30', stdout=stdout)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("Anonymized 3 users (3 in total, "))
+        self.assertEqual(lines[1], "Anonymized users: 3.")
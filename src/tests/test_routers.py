@@ -0,0 +1,143 @@
+import time
+
+from django.contrib.sessions.backends.base import SessionBase
+from django.http import HttpRequest, HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+
+from fd_dj_accounts import routers
+from fd_dj_accounts.middleware import ReplicaPinningMiddleware
+from fd_dj_accounts.models import ApiToken, User
+from fd_dj_accounts.routers import ReplicaRouter
+
+
+@override_settings(
+    APP_ACCOUNTS_PRIMARY_DATABASE='primary',
+    APP_ACCOUNTS_REPLICA_DATABASES=['replica1', 'replica2'],
+    APP_ACCOUNTS_REPLICA_STICKY_SECONDS=60,
+)
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self) -> None:
+        self.router = ReplicaRouter()
+        token = routers.set_pinned_until(0.0)
+        self.addCleanup(routers.reset_pinned_until, token)
+
+    def test_db_for_read(self) -> None:
+        for _ in range(10):
+            self.assertIn(self.router.db_for_read(User), ['replica1', 'replica2'])
+
+    def test_db_for_read_instance(self) -> None:
+        user = User()
+        user._state.db = 'replica2'
+        self.assertEqual(self.router.db_for_read(User, instance=user), 'replica2')
+
+    def test_db_for_read_other_app(self) -> None:
+        from django.contrib.sessions.models import Session
+
+        self.assertIsNone(self.router.db_for_read(Session))
+        self.assertIsNone(self.router.db_for_write(Session))
+        self.assertFalse(routers.is_pinned_to_primary())
+
+    def test_db_for_write_other_app_instance_from_replica(self) -> None:
+        from django.contrib.admin.models import LogEntry
+
+        log_entry = LogEntry()
+        log_entry._state.db = 'replica1'
+        self.assertEqual(self.router.db_for_write(LogEntry, instance=log_entry), 'primary')
+
+        log_entry._state.db = 'other'
+        self.assertIsNone(self.router.db_for_write(LogEntry, instance=log_entry))
+
+    @override_settings(APP_ACCOUNTS_REPLICA_DATABASES=[])
+    def test_db_for_read_no_replicas(self) -> None:
+        self.assertEqual(self.router.db_for_read(User), 'primary')
+
+    def test_db_for_write_does_not_pin_reads(self) -> None:
+        self.assertEqual(self.router.db_for_write(ApiToken), 'primary')
+        self.assertFalse(routers.is_pinned_to_primary())
+
+    def test_write_pins_reads(self) -> None:
+        routers.pin_to_primary_on_write(ApiToken)
+        self.assertTrue(routers.is_pinned_to_primary())
+        self.assertEqual(self.router.db_for_read(User), 'primary')
+
+        routers.set_pinned_until(time.time() - 1)
+        self.assertIn(self.router.db_for_read(User), ['replica1', 'replica2'])
+
+    def test_write_of_other_app_does_not_pin_reads(self) -> None:
+        from django.contrib.sessions.models import Session
+
+        routers.pin_to_primary_on_write(Session)
+        self.assertFalse(routers.is_pinned_to_primary())
+
+    @override_settings(APP_ACCOUNTS_REPLICA_DATABASES=[])
+    def test_write_without_replicas_does_not_pin_reads(self) -> None:
+        routers.pin_to_primary_on_write(ApiToken)
+        self.assertFalse(routers.is_pinned_to_primary())
+
+    def test_pinning_scope(self) -> None:
+        with routers.pinning_scope():
+            routers.pin_to_primary()
+            self.assertTrue(routers.is_pinned_to_primary())
+        self.assertFalse(routers.is_pinned_to_primary())
+
+    def test_allow_relation(self) -> None:
+        from django.contrib.sessions.models import Session
+
+        self.assertIs(self.router.allow_relation(User(), ApiToken()), True)
+        self.assertIsNone(self.router.allow_relation(User(), Session()))
+
+        user = User()
+        user._state.db = 'replica1'
+        session = Session()
+        session._state.db = 'primary'
+        self.assertIs(self.router.allow_relation(user, session), True)
+        session._state.db = 'other'
+        self.assertIsNone(self.router.allow_relation(user, session))
+
+    def test_allow_migrate(self) -> None:
+        self.assertIsNone(self.router.allow_migrate('primary', 'fd_dj_accounts'))
+        self.assertIs(self.router.allow_migrate('replica1', 'fd_dj_accounts'), False)
+        self.assertIsNone(self.router.allow_migrate('replica1', 'sessions'))
+
+
+@override_settings(
+    APP_ACCOUNTS_REPLICA_DATABASES=['replica1'],
+    APP_ACCOUNTS_REPLICA_STICKY_SECONDS=60,
+)
+class ReplicaPinningMiddlewareTestCase(SimpleTestCase):
+
+    def setUp(self) -> None:
+        token = routers.set_pinned_until(0.0)
+        self.addCleanup(routers.reset_pinned_until, token)
+
+    def _get_request(self, session: SessionBase) -> HttpRequest:
+        request = RequestFactory().get('/')
+        request.session = session
+        return request
+
+    def test_pinning_is_kept_in_session(self) -> None:
+        session = SessionBase()
+
+        def writing_view(request: HttpRequest) -> HttpResponse:
+            routers.pin_to_primary_on_write(User)
+            return HttpResponse()
+
+        ReplicaPinningMiddleware(writing_view)(self._get_request(session))
+        self.assertGreater(session[ReplicaPinningMiddleware.session_key], time.time())
+        self.assertFalse(routers.is_pinned_to_primary())
+
+        pinned = []
+
+        def reading_view(request: HttpRequest) -> HttpResponse:
+            pinned.append(routers.is_pinned_to_primary())
+            return HttpResponse()
+
+        ReplicaPinningMiddleware(reading_view)(self._get_request(session))
+        self.assertEqual(pinned, [True])
+
+        session[ReplicaPinningMiddleware.session_key] = time.time() - 1
+        ReplicaPinningMiddleware(reading_view)(self._get_request(session))
+        self.assertEqual(pinned, [True, False])
+        self.assertNotIn(ReplicaPinningMiddleware.session_key, session)
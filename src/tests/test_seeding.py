@@ -0,0 +1,134 @@
+import datetime
+import io
+import uuid
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from fd_dj_accounts import seeding, stats
+from fd_dj_accounts.models import User, get_or_create_system_user
+from fd_dj_accounts.stats import UserStats
+
+
+class SeedUsersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+
+    def _seed_users(self, count: int, **kwargs: object) -> list:
+        return list(seeding.seed_users(count, **kwargs))  # type: ignore[arg-type]
+
+    def test_seed_users(self) -> None:
+        self.assertEqual(self._seed_users(250, batch_size=100, password='test'), [100, 100, 50])
+
+        users = User.objects.exclude(pk=self.system_user.pk)
+        self.assertEqual(users.count(), 250)
+        user_pks = set(users.values_list('pk', flat=True))
+        for user in users:
+            user.full_clean()
+            self.assertTrue(
+                user.created_by_id == self.system_user.pk or user.created_by_id in user_pks,
+            )
+            self.assertLessEqual(user.created_at, timezone.now())
+            if user.last_login is not None:
+                self.assertGreaterEqual(user.last_login, user.created_at)
+            if user.is_superuser:
+                self.assertTrue(user.is_staff)
+            self.assertEqual(user.is_active, user.deactivated_at is None)
+        self.assertTrue(users.filter(created_by=self.system_user).exists())
+        self.assertTrue(users.exclude(created_by=self.system_user).exists())
+        self.assertTrue(users.filter(is_active=False).exists())
+        self.assertTrue(users.filter(last_login__isnull=True).exists())
+        self.assertTrue(users.first().check_password('test'))  # type: ignore[union-attr]
+
+    def test_seed_users_deterministic(self) -> None:
+        kwargs = dict(
+            count=10,
+            seed=1,
+            password_hash='!',
+            system_user_id=self.system_user.pk,
+            now=timezone.now(),
+            days=10,
+            inactive_ratio=0.5,
+            staff_ratio=0.5,
+            superuser_ratio=0.5,
+            never_logged_in_ratio=0.5,
+            system_created_ratio=0.5,
+        )
+
+        rows = list(seeding.generate_user_rows(**kwargs))  # type: ignore[arg-type]
+        self.assertEqual(list(seeding.generate_user_rows(**kwargs)), rows)  # type: ignore[arg-type]
+        self.assertNotEqual(
+            list(seeding.generate_user_rows(**{**kwargs, 'seed': 2})),  # type: ignore[arg-type]
+            rows,
+        )
+
+    def test_seed_users_ratios(self) -> None:
+        self._seed_users(
+            20,
+            inactive_ratio=1,
+            staff_ratio=1,
+            superuser_ratio=0,
+            never_logged_in_ratio=1,
+            system_created_ratio=1,
+        )
+
+        users = User.objects.exclude(pk=self.system_user.pk)
+        self.assertEqual(
+            users.filter(is_active=False, is_staff=True, is_superuser=False).count(), 20,
+        )
+        self.assertFalse(users.filter(last_login__isnull=False).exists())
+        self.assertEqual(users.filter(created_by=self.system_user).count(), 20)
+        self.assertFalse(users.first().has_usable_password())  # type: ignore[union-attr]
+
+    def test_seed_users_seeds(self) -> None:
+        self._seed_users(10, seed=1)
+        self._seed_users(10, seed=2)
+
+        self.assertEqual(User.objects.count(), 21)
+
+    @override_settings(APP_ACCOUNTS_USER_COUNTERS_ENABLED=True)
+    def test_seed_users_counters(self) -> None:
+        stats.reconcile_user_counters()
+
+        self._seed_users(10, inactive_ratio=0, staff_ratio=0, superuser_ratio=0)
+
+        self.assertEqual(stats.get_user_stats(), UserStats(11, 11, 1, 1))
+
+    def test_seed_users_invalid(self) -> None:
+        with self.assertRaisesMessage(ValueError, 'batch_size must be a positive integer.'):
+            self._seed_users(10, batch_size=0)
+        with self.assertRaisesMessage(ValueError, 'staff_ratio must be between 0 and 1.'):
+            self._seed_users(10, staff_ratio=2)
+
+    def test_get_copy_data(self) -> None:
+        data = seeding._get_copy_data(iter([
+            [
+                uuid.UUID(int=1),
+                'a\tb\\c',
+                None,
+                True,
+                datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+                1,
+            ],
+        ]))
+
+        self.assertEqual(
+            data,
+            '00000000-0000-0000-0000-000000000001\ta\\tb\\\\c\t\\N\tt'
+            '\t2020-01-02T03:04:05+00:00\t1\n',
+        )
+
+    def test_command(self) -> None:
+        stdout = io.StringIO()
+        call_command('seed_users', '--count', '3', '--batch-size', '2', stdout=stdout)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertRegex(lines[0], r"^Inserted 2 users \(2 in total, [0-9.]+ users/s\)\.$")
+        self.assertEqual(lines[-1], "Inserted users: 3.")
+        self.assertEqual(User.objects.count(), 4)
+
+        with self.assertRaisesMessage(CommandError, 'count must not be negative.'):
+            call_command('seed_users', '--count', '-1', stdout=stdout)
@@ -0,0 +1,127 @@
+from importlib import import_module
+from typing import Any
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import login, update_session_auth_hash
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+
+from fd_dj_accounts import session_snapshots
+from fd_dj_accounts.middleware import SessionSnapshotAuthenticationMiddleware
+from fd_dj_accounts.models import User
+
+
+@override_settings(APP_ACCOUNTS_SESSION_SNAPSHOTS_ENABLED=True)
+class SessionSnapshotsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = User.objects.create_user(email_address='user@example.com', password='test')
+        self.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+        request = self._get_request()
+        login(request, self.user, backend='fd_dj_accounts.auth_backends.AuthUserModelAuthBackend')
+        self.session.save()
+
+    def _get_request(self) -> HttpRequest:
+        request = RequestFactory().get('/')
+        request.session = self.session
+        return request
+
+    def _get_request_user(self) -> Any:
+        request = self._get_request()
+        middleware = SessionSnapshotAuthenticationMiddleware(lambda request: HttpResponse())
+        middleware.process_request(request)
+        return request.user
+
+    def test_login_stores_snapshot(self) -> None:
+        self.assertIn(session_snapshots.SNAPSHOT_SESSION_KEY, self.session)
+
+    def test_user_from_snapshot(self) -> None:
+        with self.assertNumQueries(0):
+            user = self._get_request_user()
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.email_address, 'user@example.com')
+            self.assertIs(user.is_authenticated, True)
+            self.assertIs(user.is_active, True)
+            self.assertIs(user.is_staff, False)
+            self.assertIs(user.is_superuser, False)
+
+        # Other fields are deferred.
+        with self.assertNumQueries(1):
+            self.assertEqual(user.created_by_id, self.user.created_by_id)
+
+    def test_user_changed(self) -> None:
+        self.user.is_staff = True
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            user = self._get_request_user()
+            self.assertIs(user.is_staff, True)
+
+        # The snapshot is refreshed.
+        with self.assertNumQueries(0):
+            self.assertIs(self._get_request_user().is_staff, True)
+
+    def test_user_deactivated(self) -> None:
+        self.user.deactivate()
+
+        self.assertIs(self._get_request_user().is_authenticated, False)
+
+    def test_users_deactivated(self) -> None:
+        self.assertIs(self._get_request_user().is_authenticated, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).deactivate()
+
+        self.assertIs(self._get_request_user().is_authenticated, False)
+
+    def test_users_updated(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_staff=True)
+
+        with self.assertNumQueries(1):
+            self.assertIs(self._get_request_user().is_staff, True)
+
+    def test_password_changed(self) -> None:
+        self.user.set_password('new password')
+        self.user.save()
+
+        self.assertIs(self._get_request_user().is_authenticated, False)
+
+    def test_password_changed_session_hash_updated(self) -> None:
+        self.user.set_password('new password')
+        self.user.save()
+        request = self._get_request()
+        request.user = self.user
+        update_session_auth_hash(request, self.user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get_request_user(), self.user)
+
+    def test_snapshot_expired(self) -> None:
+        with mock.patch('django.core.signing.time.time', return_value=2 ** 40):
+            with self.assertNumQueries(1):
+                self.assertEqual(self._get_request_user(), self.user)
+
+    def test_version_evicted(self) -> None:
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get_request_user(), self.user)
+
+    def test_tampered_snapshot(self) -> None:
+        self.session[session_snapshots.SNAPSHOT_SESSION_KEY] += 'x'
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get_request_user(), self.user)
+
+    @override_settings(APP_ACCOUNTS_SESSION_SNAPSHOTS_ENABLED=False)
+    def test_disabled(self) -> None:
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get_request_user(), self.user)
@@ -0,0 +1,100 @@
+import json
+import pickle
+import uuid
+
+from django.test import SimpleTestCase, TestCase
+
+from fd_dj_accounts.models import User
+from fd_dj_accounts.snapshots import UserSnapshot
+
+
+class UserSnapshotTestCase(SimpleTestCase):
+
+    def setUp(self) -> None:
+        self.snapshot = UserSnapshot(
+            id=uuid.UUID('2b7a5f5e-1c1f-4c7e-9d1b-6f0c1e2d3a4b'),
+            email_address='user@example.com',
+            is_active=True,
+            is_staff=True,
+            is_superuser=False,
+        )
+
+    def test_user_interface(self) -> None:
+        self.assertEqual(self.snapshot.pk, self.snapshot.id)
+        self.assertIs(self.snapshot.is_authenticated, True)
+        self.assertIs(self.snapshot.is_anonymous, False)
+        self.assertEqual(self.snapshot.get_username(), 'user@example.com')
+        self.assertEqual(self.snapshot.username, 'user@example.com')
+        self.assertEqual(str(self.snapshot), 'user@example.com')
+        self.assertEqual(
+            repr(self.snapshot),
+            "<UserSnapshot(id=UUID('2b7a5f5e-1c1f-4c7e-9d1b-6f0c1e2d3a4b'),"
+            " email_address='user@example.com')>",
+        )
+
+    def test_has_perm(self) -> None:
+        self.assertIs(self.snapshot.has_perm('fd_dj_accounts.view_user'), False)
+        self.assertIs(self.snapshot.has_perms(['fd_dj_accounts.view_user']), False)
+        self.assertIs(self.snapshot.has_module_perms('fd_dj_accounts'), False)
+
+        superuser = UserSnapshot(uuid.uuid4(), 'admin@example.com', True, True, True)
+        self.assertIs(superuser.has_perm('fd_dj_accounts.view_user'), True)
+        self.assertIs(superuser.has_perms(['fd_dj_accounts.view_user']), True)
+        self.assertIs(superuser.has_module_perms('fd_dj_accounts'), True)
+
+        inactive_superuser = UserSnapshot(uuid.uuid4(), 'admin@example.com', False, True, True)
+        self.assertIs(inactive_superuser.has_perm('fd_dj_accounts.view_user'), False)
+
+        with self.assertRaises(ValueError):
+            superuser.has_perms('fd_dj_accounts.view_user')
+
+    def test_read_only(self) -> None:
+        with self.assertRaisesMessage(AttributeError, 'UserSnapshot is read-only.'):
+            self.snapshot.is_superuser = True  # type: ignore[misc]
+        with self.assertRaisesMessage(AttributeError, 'UserSnapshot is read-only.'):
+            del self.snapshot.email_address
+        with self.assertRaises(AttributeError):
+            self.snapshot.other = 1  # type: ignore[attr-defined]
+
+    def test_bytes(self) -> None:
+        data = self.snapshot.to_bytes()
+        self.assertEqual(len(data), 18 + len('user@example.com'))
+        self.assertEqual(UserSnapshot.from_bytes(data), self.snapshot)
+
+        with self.assertRaisesMessage(ValueError, 'Invalid user snapshot data.'):
+            UserSnapshot.from_bytes(data[:10])
+        with self.assertRaisesMessage(ValueError, 'Unsupported user snapshot format version: 2.'):
+            UserSnapshot.from_bytes(b'\x02' + data[1:])
+
+    def test_json(self) -> None:
+        data = json.loads(json.dumps(self.snapshot.to_json()))
+        self.assertEqual(UserSnapshot.from_json(data), self.snapshot)
+
+        with self.assertRaisesMessage(ValueError, 'Invalid user snapshot data.'):
+            UserSnapshot.from_json({})
+        with self.assertRaisesMessage(ValueError, 'Invalid user snapshot data.'):
+            UserSnapshot.from_json(data[:3])
+        with self.assertRaisesMessage(ValueError, 'Unsupported user snapshot format version: 0.'):
+            UserSnapshot.from_json([0] + data[1:])
+
+    def test_pickle(self) -> None:
+        data = pickle.dumps(self.snapshot)
+        self.assertEqual(pickle.loads(data), self.snapshot)
+        self.assertEqual(hash(pickle.loads(data)), hash(self.snapshot))
+
+
+class UserSnapshotFromUserTestCase(TestCase):
+
+    def test_from_user(self) -> None:
+        user = User.objects.create_user('user@example.com', is_staff=True)
+        snapshot = UserSnapshot.from_user(user)
+
+        self.assertEqual(snapshot.id, user.id)
+        self.assertEqual(snapshot.email_address, 'user@example.com')
+        self.assertEqual(
+            (snapshot.is_active, snapshot.is_staff, snapshot.is_superuser), (True, True, False),
+        )
+        self.assertLess(len(pickle.dumps(snapshot)), len(pickle.dumps(user)) / 4)
+
+        values = User.objects.values(*UserSnapshot.FIELD_NAMES).get(pk=user.pk)
+        self.assertEqual(UserSnapshot.from_values(values), snapshot)
@@ -0,0 +1,173 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+
+from fd_dj_accounts import stats
+from fd_dj_accounts.models import User, UserCounter, UserQuerySet, get_or_create_system_user
+from fd_dj_accounts.stats import UserStats
+
+
+@override_settings(APP_ACCOUNTS_USER_COUNTERS_ENABLED=True)
+class SystemUserCountersTestCase(TestCase):
+
+    def test_get_or_create_system_user(self) -> None:
+        stats.reconcile_user_counters()
+        get_or_create_system_user()
+        get_or_create_system_user()
+        self.assertEqual(stats.get_user_stats(), UserStats(1, 1, 1, 1))
+        self.assertEqual(stats.get_user_stats(), stats.count_users())
+
+
+@override_settings(APP_ACCOUNTS_USER_COUNTERS_ENABLED=True)
+class UserCountersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+        self.user = User.objects.create_user('user@example.com')
+        stats.reconcile_user_counters()
+
+    def assertCountersCorrect(self) -> None:
+        counters = stats.get_user_stats()
+        self.assertEqual(counters, stats.count_users())
+
+    def test_get_user_stats(self) -> None:
+        with self.assertNumQueries(1):
+            self.assertEqual(stats.get_user_stats(), UserStats(2, 2, 1, 1))
+
+    def test_save(self) -> None:
+        user = User.objects.create_user('staff@example.com', is_staff=True)
+        self.assertEqual(stats.get_user_stats(), UserStats(3, 3, 2, 1))
+
+        user.is_superuser = True
+        user.save()
+        self.assertEqual(stats.get_user_stats(), UserStats(3, 3, 2, 2))
+
+        # Saving without changes does not change the counters.
+        user = User.objects.get(pk=user.pk)
+        user.save()
+        self.assertEqual(stats.get_user_stats(), UserStats(3, 3, 2, 2))
+
+        user.deactivate()
+        self.assertEqual(stats.get_user_stats(), UserStats(3, 2, 2, 2))
+
+        user.delete()
+        self.assertEqual(stats.get_user_stats(), UserStats(2, 2, 1, 1))
+        self.assertCountersCorrect()
+
+    def test_save_stale_instance(self) -> None:
+        user_1 = User.objects.get(pk=self.user.pk)
+        user_2 = User.objects.get(pk=self.user.pk)
+        user_1.is_staff = True
+        user_1.save()
+        user_2.is_staff = True
+        user_2.save()
+
+        self.assertEqual(stats.get_user_stats(), UserStats(2, 2, 2, 1))
+        self.assertCountersCorrect()
+
+    def test_refresh_from_db(self) -> None:
+        user = User.objects.get(pk=self.user.pk)
+        User.objects.filter(pk=user.pk).deactivate()
+        user.refresh_from_db()
+        user.save()
+
+        self.assertEqual(stats.get_user_stats(), UserStats(2, 1, 1, 1))
+        self.assertCountersCorrect()
+
+    def test_bulk_operations(self) -> None:
+        User.objects.bulk_create([
+            User(email_address='a@example.com', created_by=self.system_user, is_staff=True),
+            User(email_address='b@example.com', created_by=self.system_user, is_active=False),
+        ])
+        self.assertEqual(stats.get_user_stats(), UserStats(4, 3, 2, 1))
+
+        User.objects.get_or_create_user('a@example.com')
+        User.objects.get_or_create_user('c@example.com')
+        self.assertEqual(stats.get_user_stats(), UserStats(5, 4, 2, 1))
+
+        self.assertEqual(User.objects.filter(is_superuser=False).update(is_staff=True), 4)
+        self.assertEqual(stats.get_user_stats(), UserStats(5, 4, 5, 1))
+
+        self.assertEqual(User.objects.filter(is_superuser=False).deactivate(), 3)
+        self.assertEqual(stats.get_user_stats(), UserStats(5, 1, 5, 1))
+
+        User.objects.filter(is_superuser=False).delete()
+        self.assertEqual(stats.get_user_stats(), UserStats(1, 1, 1, 1))
+        self.assertCountersCorrect()
+
+    def test_update_locks_users(self) -> None:
+        select_for_update = UserQuerySet.select_for_update
+        with mock.patch.object(
+            UserQuerySet, 'select_for_update', autospec=True, side_effect=select_for_update,
+        ) as mock_select_for_update:
+            User.objects.filter(pk=self.user.pk).update(is_staff=True)
+
+        mock_select_for_update.assert_called_once()
+        self.assertEqual(stats.get_user_stats(), UserStats(2, 2, 2, 1))
+
+    def test_reconcile(self) -> None:
+        UserCounter.objects.filter(name=stats.ACTIVE).update(value=100)
+        UserCounter.objects.filter(name=stats.STAFF).delete()
+
+        stdout = io.StringIO()
+        call_command('reconcile_user_counters', stdout=stdout)
+
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            ["active: 100 -> 2", "staff: None -> 1", "Changed counters: 2."],
+        )
+        self.assertCountersCorrect()
+
+    @override_settings(APP_ACCOUNTS_USER_COUNTERS_ENABLED=False)
+    def test_disabled(self) -> None:
+        User.objects.create_user('other@example.com')
+
+        self.assertEqual(stats.get_user_stats(), UserStats(3, 3, 1, 1))
+        self.assertEqual(UserCounter.objects.get(name=stats.TOTAL).value, 2)
+
+
+@override_settings(APP_ACCOUNTS_USER_COUNTERS_ENABLED=True)
+class UserCountersTransactionTestCase(TransactionTestCase):
+
+    def test_save_is_atomic(self) -> None:
+        get_or_create_system_user()
+        user = User.objects.create_user('user@example.com')
+        stats.reconcile_user_counters()
+
+        user.is_staff = True
+        with mock.patch.object(stats, 'update_counters', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                user.save()
+
+        # The user and the counters are unchanged.
+        self.assertIs(User.objects.get(pk=user.pk).is_staff, False)
+        self.assertEqual(stats.get_user_stats(), stats.count_users())
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_save_concurrent(self) -> None:
+        get_or_create_system_user()
+        user = User.objects.create_user('user@example.com')
+        stats.reconcile_user_counters()
+        workers = 4
+        barrier = threading.Barrier(workers)
+
+        def worker() -> None:
+            try:
+                instance = User.objects.get(pk=user.pk)
+                instance.is_staff = True
+                barrier.wait()
+                instance.save()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(worker) for _ in range(workers)]:
+                future.result()
+
+        self.assertEqual(stats.get_user_stats(), UserStats(2, 2, 2, 1))
+        self.assertEqual(stats.get_user_stats(), stats.count_users())
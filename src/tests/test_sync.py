@@ -0,0 +1,172 @@
+import io
+import json
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from fd_dj_accounts import routers
+from fd_dj_accounts.models import User, get_or_create_system_user
+from fd_dj_accounts.sync import (
+    CREATE, DEACTIVATE, UPDATE, DesiredUser, UserSyncChange, iter_user_sync_changes, sync_users,
+)
+
+
+class SyncUsersTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.system_user = get_or_create_system_user()
+        self.user_a = User.objects.create_user('a@example.com')
+        self.user_b = User.objects.create_user('b@example.com', is_staff=True)
+        self.user_c = User.objects.create_user('c@example.com')
+        self.user_d = User.objects.create_user('d@example.com', is_active=False)
+
+        self.desired_users = [
+            DesiredUser('a@example.com'),
+            DesiredUser('aa@EXAMPLE.com', is_staff=True),
+            DesiredUser('b@example.com', is_superuser=True),
+            DesiredUser('d@example.com'),
+            DesiredUser('e@example.com', is_active=False),
+        ]
+
+    def test_iter_user_sync_changes(self) -> None:
+        changes = list(iter_user_sync_changes(self.desired_users))
+
+        self.assertEqual(
+            changes,
+            [
+                UserSyncChange(
+                    CREATE, 'aa@example.com',
+                    {'is_active': True, 'is_staff': True, 'is_superuser': False},
+                ),
+                UserSyncChange(UPDATE, 'b@example.com', {'is_staff': False, 'is_superuser': True}),
+                UserSyncChange(DEACTIVATE, 'c@example.com', {}),
+                UserSyncChange(
+                    UPDATE, 'd@example.com', {'is_active': True, 'deactivated_at': None},
+                ),
+                UserSyncChange(
+                    CREATE, 'e@example.com',
+                    {'is_active': False, 'is_staff': False, 'is_superuser': False},
+                ),
+            ],
+        )
+
+    @override_settings(
+        DATABASE_ROUTERS=['fd_dj_accounts.routers.ReplicaRouter'],
+        APP_ACCOUNTS_REPLICA_DATABASES=['replica'],
+    )
+    def test_iter_user_sync_changes_reads_primary(self) -> None:
+        token = routers.set_pinned_until(0.0)
+        self.addCleanup(routers.reset_pinned_until, token)
+
+        # note: database 'replica' does not exist, so reading from it would fail.
+        changes = list(iter_user_sync_changes(self.desired_users))
+
+        self.assertEqual(len(changes), 5)
+
+    def test_iter_user_sync_changes_keep_missing(self) -> None:
+        changes = list(iter_user_sync_changes([], deactivate_missing=False))
+        self.assertEqual(changes, [])
+
+        # The system user is never deactivated.
+        changes = list(iter_user_sync_changes([]))
+        self.assertEqual(
+            [change.email_address for change in changes],
+            ['a@example.com', 'b@example.com', 'c@example.com'],
+        )
+
+    def test_iter_user_sync_changes_unsorted(self) -> None:
+        desired_users = [DesiredUser('b@example.com'), DesiredUser('a@example.com')]
+        with self.assertRaisesMessage(ValueError, "must be sorted by email address"):
+            list(iter_user_sync_changes(desired_users))
+
+        desired_users = [DesiredUser('a@example.com'), DesiredUser('a@EXAMPLE.com')]
+        with self.assertRaisesMessage(ValueError, "without duplicates"):
+            list(iter_user_sync_changes(desired_users))
+
+    def test_sync_users(self) -> None:
+        counts = sync_users(self.desired_users, batch_size=2)
+        self.assertEqual(counts, {CREATE: 2, UPDATE: 2, DEACTIVATE: 1})
+
+        new_user = User.objects.get(email_address='aa@example.com')
+        self.assertTrue(new_user.is_staff)
+        self.assertEqual(new_user.created_by, self.system_user)
+        self.assertFalse(new_user.has_usable_password())
+        new_user.full_clean()
+
+        inactive_new_user = User.objects.get(email_address='e@example.com')
+        self.assertFalse(inactive_new_user.is_active)
+        self.assertIsNotNone(inactive_new_user.deactivated_at)
+
+        self.user_b.refresh_from_db()
+        self.assertFalse(self.user_b.is_staff)
+        self.assertTrue(self.user_b.is_superuser)
+
+        self.user_c.refresh_from_db()
+        self.assertFalse(self.user_c.is_active)
+        self.assertIsNotNone(self.user_c.deactivated_at)
+
+        self.user_d.refresh_from_db()
+        self.assertTrue(self.user_d.is_active)
+        self.assertIsNone(self.user_d.deactivated_at)
+
+        # Nothing changes the second time.
+        self.assertEqual(list(iter_user_sync_changes(self.desired_users)), [])
+
+
+class SyncUsersCommandTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user('a@example.com')
+
+    def _write_file(self, *lines: str) -> str:
+        file = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        self.addCleanup(file.close)
+        file.write('\n'.join(lines))
+        file.flush()
+        return file.name
+
+    def test_dry_run(self) -> None:
+        path = self._write_file(json.dumps({'email_address': 'b@example.com', 'is_staff': True}))
+        stdout = io.StringIO()
+
+        call_command('sync_users', path, '--dry-run', stdout=stdout)
+
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            [
+                "deactivate a@example.com {}",
+                "create b@example.com {'is_active': True, 'is_staff': True, 'is_superuser': False}",
+                "Planned changes: create: 1, update: 0, deactivate: 1.",
+            ],
+        )
+        self.assertFalse(User.objects.filter(email_address='b@example.com').exists())
+
+    def test_apply(self) -> None:
+        path = self._write_file(json.dumps({'email_address': 'b@example.com'}), '')
+        stdout = io.StringIO()
+
+        call_command('sync_users', path, '--keep-missing', stdout=stdout)
+
+        self.assertEqual(
+            stdout.getvalue(), "Applied changes: create: 1, update: 0, deactivate: 0.\n",
+        )
+        self.assertTrue(User.objects.filter(email_address='b@example.com').exists())
+
+    def test_invalid(self) -> None:
+        for line in ['{"email": "b@example.com"}', '{"email_address": "b"}', 'not json']:
+            with self.assertRaises(CommandError):
+                call_command('sync_users', self._write_file(line), stdout=io.StringIO())
+
+    def test_unreadable_file(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            for path in [f'{directory}/missing.jsonl', directory]:
+                with self.assertRaisesMessage(CommandError, 'Cannot open'):
+                    call_command('sync_users', path, stdout=io.StringIO())
+
+        with tempfile.NamedTemporaryFile('wb', suffix='.jsonl') as file:
+            file.write('{"email_address": "\u00e9@example.com"}'.encode('latin-1'))
+            file.flush()
+            with self.assertRaises(CommandError):
+                call_command('sync_users', file.name, stdout=io.StringIO())
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
@@ -0,0 +1,80 @@
+from typing import Any, List
+
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.test.client import RequestFactory
+
+from fd_dj_accounts import throttling
+from fd_dj_accounts.auth_backends import AuthUserModelAuthBackend
+from fd_dj_accounts.models import User
+from fd_dj_accounts.signals import login_throttled
+
+from .test_auth_backends import CountingMD5PasswordHasher
+
+
+@override_settings(
+    APP_ACCOUNTS_LOGIN_THROTTLE_ENABLED=True,
+    APP_ACCOUNTS_LOGIN_THROTTLE_IDENTIFIER_LIMIT=2,
+    APP_ACCOUNTS_LOGIN_THROTTLE_IP_LIMIT=3,
+    PASSWORD_HASHERS=['tests.test_auth_backends.CountingMD5PasswordHasher'],
+)
+class LoginThrottleTestCase(TestCase):
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.user = User.objects.create_user(email_address='user@example.com', password='test')
+        self.throttled_signals: List[Any] = []
+
+        def receiver(**kwargs: Any) -> None:
+            self.throttled_signals.append(kwargs)
+
+        login_throttled.connect(receiver)
+        self.addCleanup(login_throttled.disconnect, receiver)
+
+    def _authenticate(self, username: str, password: str, ip_address: str = '10.0.0.1') -> Any:
+        request = RequestFactory().post('/login', REMOTE_ADDR=ip_address)
+        return authenticate(request, username=username, password=password)
+
+    def test_identifier_limit(self) -> None:
+        self.assertEqual(self._authenticate('user@example.com', 'test', '10.0.0.1'), self.user)
+        self.assertIsNone(self._authenticate('USER@example.com', 'bad', '10.0.0.2'))
+
+        CountingMD5PasswordHasher.calls = 0
+        self.assertIsNone(self._authenticate('user@example.com', 'test', '10.0.0.3'))
+        self.assertEqual(CountingMD5PasswordHasher.calls, 0)
+
+        self.assertEqual(len(self.throttled_signals), 1)
+        self.assertEqual(self.throttled_signals[0]['scope'], 'identifier')
+        self.assertEqual(self.throttled_signals[0]['identifier'], 'user@example.com')
+        self.assertEqual(self.throttled_signals[0]['limit'], 2)
+        self.assertIs(self.throttled_signals[0]['sender'], AuthUserModelAuthBackend)
+
+        throttling.reset('identifier', 'user@example.com')
+        self.assertEqual(self._authenticate('user@example.com', 'test', '10.0.0.4'), self.user)
+
+    def test_ip_limit(self) -> None:
+        for i in range(3):
+            self.assertIsNone(self._authenticate(f'user-{i}@example.com', 'test'))
+
+        CountingMD5PasswordHasher.calls = 0
+        self.assertIsNone(self._authenticate('user@example.com', 'test'))
+        self.assertEqual(CountingMD5PasswordHasher.calls, 0)
+        self.assertEqual(self.throttled_signals[-1]['scope'], 'ip')
+
+        self.assertEqual(self._authenticate('user@example.com', 'test', '10.0.0.2'), self.user)
+
+    def test_no_request(self) -> None:
+        self.assertIsNone(authenticate(username='user@example.com', password='bad'))
+        self.assertIsNone(authenticate(username='user@example.com', password='bad'))
+        self.assertIsNone(authenticate(username='user@example.com', password='test'))
+        self.assertEqual(self.throttled_signals[0]['scope'], 'identifier')
+
+    @override_settings(APP_ACCOUNTS_LOGIN_THROTTLE_ENABLED=False)
+    def test_disabled(self) -> None:
+        for _ in range(5):
+            self.assertIsNone(self._authenticate('user@example.com', 'bad'))
+        self.assertEqual(self._authenticate('user@example.com', 'test'), self.user)
+        self.assertEqual(self.throttled_signals, [])
@@ -0,0 +1,122 @@
+from typing import List
+
+from django.test import SimpleTestCase, TestCase
+
+from fd_dj_accounts import tracing
+from fd_dj_accounts.auth_backends import AuthUserModelAuthBackend
+from fd_dj_accounts.models import User
+
+
+class RecordingTracer(tracing.Tracer):
+
+    def __init__(self) -> None:
+        self.started: List[tracing.Span] = []
+        self.ended: List[tracing.Span] = []
+
+    def on_start(self, span: tracing.Span) -> None:
+        self.started.append(span)
+
+    def on_end(self, span: tracing.Span) -> None:
+        self.ended.append(span)
+
+    def names(self) -> List[str]:
+        return [span.name for span in self.ended]
+
+
+class TracingTestCase(SimpleTestCase):
+
+    def setUp(self) -> None:
+        self.tracer = RecordingTracer()
+        tracing.add_tracer(self.tracer)
+        self.addCleanup(tracing.remove_tracer, self.tracer)
+
+    def test_span(self) -> None:
+        with tracing.span('outer', foo='bar') as outer:
+            with tracing.span('inner') as inner:
+                pass
+
+        assert outer is not None and inner is not None
+        self.assertEqual(self.tracer.names(), ['inner', 'outer'])
+        self.assertIs(inner.parent, outer)
+        self.assertIsNone(outer.parent)
+        self.assertEqual(outer.attributes, {'foo': 'bar'})
+        self.assertGreaterEqual(outer.duration, inner.duration)  # type: ignore[operator]
+        self.assertEqual(outer.sql_count, 0)
+
+    def test_span_error(self) -> None:
+        with self.assertRaises(ValueError):
+            with tracing.span('failing'):
+                raise ValueError('boom')
+
+        self.assertEqual(self.tracer.names(), ['failing'])
+        self.assertIsInstance(self.tracer.ended[0].error, ValueError)
+
+    def test_add_tracer_is_idempotent(self) -> None:
+        tracing.add_tracer(self.tracer)
+        with tracing.span('name'):
+            pass
+        self.assertEqual(len(self.tracer.ended), 1)
+
+    def test_disabled(self) -> None:
+        tracing.remove_tracer(self.tracer)
+        self.assertFalse(tracing.is_enabled())
+
+        with tracing.span('name') as span:
+            self.assertIsNone(span)
+
+        @tracing.traced('func')
+        def func() -> int:
+            return 1
+
+        self.assertEqual(func(), 1)
+        self.assertEqual(self.tracer.ended, [])
+
+
+class InstrumentationTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.tracer = RecordingTracer()
+        tracing.add_tracer(self.tracer)
+        self.addCleanup(tracing.remove_tracer, self.tracer)
+
+    def test_create_user(self) -> None:
+        User.objects.create_user(email_address='user@example.com', password='password')
+
+        names = self.tracer.names()
+        self.assertIn('fd_dj_accounts.UserManager.create_user', names)
+        self.assertIn('fd_dj_accounts.User.set_password', names)
+        self.assertIn('fd_dj_accounts.User.full_clean', names)
+        self.assertIn('fd_dj_accounts.User.save', names)
+        self.assertIn('fd_dj_accounts.get_or_create_system_user', names)
+
+        create_user_span = self.tracer.ended[-1]
+        self.assertEqual(create_user_span.name, 'fd_dj_accounts.UserManager.create_user')
+        self.assertGreater(create_user_span.sql_count, 0)
+
+    def test_authenticate(self) -> None:
+        user = User.objects.create_user(email_address='user@example.com', password='password')
+        self.tracer.ended.clear()
+
+        backend = AuthUserModelAuthBackend()
+        backend.authenticate(None, username='user@example.com', password='password')
+        backend.get_user(user.pk)
+
+        self.assertEqual(
+            self.tracer.names(),
+            [
+                'fd_dj_accounts.User.check_password',
+                'fd_dj_accounts.AuthUserModelAuthBackend.authenticate',
+                'fd_dj_accounts.AuthUserModelAuthBackend.get_user',
+            ],
+        )
+        self.assertEqual(self.tracer.ended[1].sql_count, 1)
+        self.assertEqual(self.tracer.ended[2].sql_count, 1)
+
+    def test_deactivate(self) -> None:
+        user = User.objects.create_user(email_address='user@example.com')
+        self.tracer.ended.clear()
+
+        user.deactivate()
+
+        self.assertEqual(self.tracer.ended[-1].name, 'fd_dj_accounts.User.deactivate')
+        self.assertEqual(self.tracer.ended[-1].sql_count, self.tracer.ended[-2].sql_count)
@@ -0,0 +1,120 @@
+import io
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from fd_dj_accounts import user_sessions
+from fd_dj_accounts.models import User, UserSession
+
+
+@override_settings(APP_ACCOUNTS_USER_SESSIONS_ENABLED=True)
+class UserSessionsTestCase(TestCase):
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user('user@example.com')
+        self.other_user = User.objects.create_user('other@example.com')
+
+    def _login(self, user: User) -> Client:
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def _session_exists(self, client: Client) -> bool:
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore()
+        return session_store.exists(client.session.session_key)  # type: ignore[no-any-return]
+
+    def test_login_logout(self) -> None:
+        client = self._login(self.user)
+
+        self.assertEqual(
+            list(UserSession.objects.values_list('session_key', 'user')),
+            [(client.session.session_key, self.user.pk)],
+        )
+
+        client.logout()
+        self.assertFalse(UserSession.objects.exists())
+
+    @override_settings(APP_ACCOUNTS_USER_SESSIONS_ENABLED=False)
+    def test_disabled(self) -> None:
+        self._login(self.user)
+
+        self.assertFalse(UserSession.objects.exists())
+
+    def test_deactivate_revoke_sessions(self) -> None:
+        clients = [self._login(self.user), self._login(self.user)]
+        other_client = self._login(self.other_user)
+
+        self.user.deactivate(revoke_sessions=True)
+
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(any(self._session_exists(client) for client in clients))
+        self.assertTrue(self._session_exists(other_client))
+        self.assertEqual(
+            list(UserSession.objects.values_list('user', flat=True)), [self.other_user.pk],
+        )
+
+    def test_deactivate_without_revoking_sessions(self) -> None:
+        client = self._login(self.user)
+
+        self.user.deactivate()
+
+        self.assertTrue(self._session_exists(client))
+
+    def test_queryset_deactivate_revoke_sessions(self) -> None:
+        clients = [self._login(self.user), self._login(self.other_user)]
+        third_user_client = self._login(User.objects.create_user('third@example.com'))
+
+        count = User.objects.filter(
+            is_active=True, pk__in=[self.user.pk, self.other_user.pk],
+        ).deactivate(revoke_sessions=True)
+
+        self.assertEqual(count, 2)
+        self.assertFalse(any(self._session_exists(client) for client in clients))
+        self.assertTrue(self._session_exists(third_user_client))
+        self.assertEqual(UserSession.objects.count(), 1)
+
+    def test_revoke_sessions(self) -> None:
+        for _ in range(3):
+            self._login(self.user)
+
+        count = user_sessions.revoke_sessions(User.objects.filter(pk=self.user.pk))
+
+        self.assertEqual(count, 3)
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(UserSession.objects.exists())
+        self.assertEqual(user_sessions.revoke_sessions(User.objects.filter(pk=self.user.pk)), 0)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_revoke_sessions_cache_engine(self) -> None:
+        client = self._login(self.user)
+        self.assertTrue(self._session_exists(client))
+
+        self.assertEqual(user_sessions.revoke_sessions(User.objects.filter(pk=self.user.pk)), 1)
+        self.assertFalse(self._session_exists(client))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_revoke_sessions_signed_cookies_engine(self) -> None:
+        with self.assertRaisesMessage(ImproperlyConfigured, 'cookie-based session engine'):
+            user_sessions.revoke_sessions(User.objects.filter(pk=self.user.pk))
+
+        # The deactivation is rolled back too.
+        with self.assertRaises(ImproperlyConfigured):
+            self.user.deactivate(revoke_sessions=True)
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_clear_user_sessions_command(self) -> None:
+        client = self._login(self.user)
+        UserSession.objects.create(session_key='expired', user=self.user)
+
+        stdout = io.StringIO()
+        call_command('clear_user_sessions', '--chunk-size', '1', stdout=stdout)
+
+        self.assertEqual(stdout.getvalue(), "Removed entries: 1.\n")
+        self.assertEqual(
+            list(UserSession.objects.values_list('session_key', flat=True)),
+            [client.session.session_key],
+        )